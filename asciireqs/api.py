@@ -0,0 +1,202 @@
+"""api - parsing and rendering in memory, for embedding AsciiReqs in other programs
+
+The functions in this module have no side effects: They read specifications through
+a source (a mapping or a function from path to text, or files on disk), never print,
+and return the errors found as diagnostics instead. They can be called from several
+threads at once, as long as each project is only used by one thread at a time.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from asciireqs.diagnostics import Diagnostic, collect_diagnostics
+from asciireqs.discovery import find_files, match_paths
+from asciireqs.docparser import (
+    BlockLimits,
+    Project,
+    SpecRegistry,
+    project_from_tree,
+    read_file,
+)
+from asciireqs.reporting import generate_report_line, line_numbers_for_requirements
+from asciireqs.reqdocument import ReqDocument, walk_documents
+from asciireqs.templates import load_template, render_template
+
+# The text of specifications by path, or a function that returns the text for a path:
+Sources = Union[Mapping[str, str], Callable[[str], str]]
+
+
+@dataclass
+class ParseResult:
+    """A parsed project, the text of its specifications and the errors found"""
+
+    project: Project
+    # The text of each specification, by document name:
+    texts: Dict[str, str] = field(default_factory=dict)
+    diagnostics: List[Diagnostic] = field(default_factory=list)
+
+    def document(self, name: Optional[str] = None) -> Optional[ReqDocument]:
+        """Returns a document by name (the top level document if no name is given)"""
+        if name is None:
+            return self.project.root_document
+        for doc in walk_documents(self.project.root_document):
+            if doc.name == name:
+                return doc
+        return None
+
+
+@dataclass
+class Rendering:
+    """
+    Rendered AsciiDoc text. The lines are generated as they are iterated over,
+    and the errors found while generating them are added to the diagnostics.
+    """
+
+    lines: Iterator[str]
+    diagnostics: List[Diagnostic] = field(default_factory=list)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.lines
+
+    def text(self) -> str:
+        """Generates all the lines and returns them as one string"""
+        return "".join(self.lines)
+
+
+def parse_project(
+    root_path: str,
+    sources: Optional[Sources] = None,
+    limits: Optional[BlockLimits] = None,
+) -> ParseResult:
+    """
+    Parses a top level specification and all its child specifications.
+    :param root_path: The path (or name) of the top level specification
+    :param sources: The text of the specifications by path, or a function returning it.
+    Child specification paths are relative to their parent, like for files, and glob
+    patterns in req-children match the paths of a mapping. The default is to read files.
+    :param limits: The maximum size of YAML blocks
+    :return: The project, the text of its specifications and the errors found
+    """
+    texts: Dict[str, str] = {}
+    read: Callable[[str], str] = (
+        sources.__getitem__ if isinstance(sources, Mapping) else sources or read_file
+    )
+
+    def source(path: str) -> str:
+        texts[path] = read(path)
+        return texts[path]
+
+    def discover(directory: str, pattern: str) -> List[str]:
+        if isinstance(sources, Mapping):
+            return match_paths(sources, directory, pattern)
+        return find_files(directory, pattern)
+
+    with collect_diagnostics() as diagnostics:
+        registry = SpecRegistry(limits, source, discover)
+        root_document = registry.parse_tree(root_path)
+        project = project_from_tree(root_document, registry.limits)
+    return ParseResult(project, texts, diagnostics)
+
+
+def parse_text(
+    text: str,
+    name: str = "document.adoc",
+    limits: Optional[BlockLimits] = None,
+) -> ParseResult:
+    """Parses a specification given as text (with no child specifications)"""
+    return parse_project(name, {name: text}, limits)
+
+
+def parse_stream(
+    stream: TextIO,
+    name: str = "document.adoc",
+    limits: Optional[BlockLimits] = None,
+) -> ParseResult:
+    """Parses a specification read from a text stream (with no child specifications)"""
+    return parse_text(stream.read(), name, limits)
+
+
+def _collecting(lines: Iterable[str], diagnostics: List[Diagnostic]) -> Iterator[str]:
+    """
+    Generates lines, collecting the errors reported while generating each one.
+    Diagnostics are only collected while the next line is generated, so the caller
+    can do other work between lines.
+    """
+    iterator = iter(lines)
+    while True:
+        with collect_diagnostics() as collected:
+            line = next(iterator, None)
+        diagnostics.extend(collected)
+        if line is None:
+            return
+        yield line
+
+
+def render_document(result: ParseResult, name: Optional[str] = None) -> Rendering:
+    """
+    Renders a specification of a parsed project: Links are inserted and report
+    generating macros are expanded, as when AsciiReqs writes the output documents.
+    :param result: The parsed project
+    :param name: The name of the document (the top level document if not given)
+    :return: The rendered text
+    """
+    doc = result.document(name)
+    if doc is None:
+        return Rendering(iter(()), [Diagnostic(f"Error: Unknown document {name}")])
+    diagnostics: List[Diagnostic] = []
+    lines = generate_report_line(
+        enumerate(result.texts.get(doc.name, "").splitlines(keepends=True), start=1),
+        result.project,
+        doc.reqs,
+        doc,
+        line_numbers_for_requirements(doc.reqs),
+    )
+    return Rendering(_collecting(lines, diagnostics), diagnostics)
+
+
+def render_template_text(result: ParseResult, template_text: str) -> Rendering:
+    """
+    Renders a report template for a parsed project
+    :param result: The parsed project
+    :param template_text: The text of the report template
+    :return: The rendered report
+    """
+    diagnostics: List[Diagnostic] = []
+    lines = render_template(load_template(template_text), result.project)
+    return Rendering(_collecting(lines, diagnostics), diagnostics)
+
+
+def parse_projects(
+    projects: Sequence[Tuple[str, Optional[Sources]]],
+    max_workers: Optional[int] = None,
+    limits: Optional[BlockLimits] = None,
+) -> List[ParseResult]:
+    """
+    Parses several projects at once, with a pool of threads.
+    The projects are independent (specifications shared by several projects are parsed
+    for each of them), so they can be used from different threads afterwards.
+    :param projects: The top level specification path and the sources of each project
+    :param max_workers: The maximum number of threads (default as for ThreadPoolExecutor)
+    :param limits: The maximum size of YAML blocks
+    :return: The parse results, in the order of the projects
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                lambda project: parse_project(project[0], project[1], limits),
+                projects,
+            )
+        )
@@ -4,49 +4,181 @@
 import argparse
 import os
 import sys
+from typing import Dict, List, Optional, Sequence
 
-from asciireqs.docparser import read_and_parse_project
-from asciireqs.reporting import generate_report_line, post_process_hierarchically
+from asciireqs.columnar import build_column_store
+from asciireqs.docparser import (
+    Project,
+    add_block_limit_arguments,
+    block_limits,
+    read_and_parse_workspace,
+)
+from asciireqs.fragments import FragmentCache, set_fragment_cache
+from asciireqs.linkgraph import get_link_problems
+from asciireqs.output import WriteStatistics, write_if_changed
+from asciireqs.reporting import post_process_hierarchically
+from asciireqs.templates import load_template_file, render_template
 
 
-def main() -> None:
-    """Parses AsciiDoc documents, finds the requirements and generates reports"""
+def create_arg_parser(prog: Optional[str] = None) -> argparse.ArgumentParser:
+    """Creates the command line argument parser"""
     parser = argparse.ArgumentParser(
-        description="Get requirements from an asciidoc file"
+        prog=prog, description="Get requirements from an asciidoc file"
     )
     parser.add_argument(
-        "-t", "--template", dest="report_template", type=str, help="Report template"
+        "-t",
+        "--template",
+        dest="report_templates",
+        action="append",
+        default=[],
+        type=str,
+        help="Report template (can be given several times)",
     )
     parser.add_argument(
         "-o", "--outputdir", dest="output_dir", type=str, help="Output directory"
     )
-    parser.add_argument("reqdoc", help="File to parse")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        dest="columnar",
+        help="Evaluate table filters using a column-oriented view of the requirements "
+        "(faster for large projects)",
+    )
+    parser.add_argument(
+        "--template-cache",
+        dest="template_cache",
+        type=str,
+        help="Folder to cache compiled report templates in",
+    )
+    parser.add_argument(
+        "--fragment-cache",
+        dest="fragment_cache",
+        type=str,
+        help="Folder to cache rendered table rows and requirements in, between runs",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        dest="check_links",
+        help="Check for link cycles, orphans, dangling and asymmetric links, "
+        "and exit with an error if there are any",
+    )
+    add_block_limit_arguments(parser)
+    parser.add_argument(
+        "reqdocs",
+        nargs="+",
+        metavar="reqdoc",
+        help="File to parse. With several files, each is the root of a project, "
+        "and the output of each project goes to a sub-folder of the output directory",
+    )
+    return parser
 
-    project = read_and_parse_project(args.reqdoc)
 
+def main(
+    argv: Optional[Sequence[str]] = None, prog: Optional[str] = None
+) -> None:
+    """Parses AsciiDoc documents, finds the requirements and generates reports"""
+    args = create_arg_parser(prog).parse_args(argv)
+    if args.report_templates and not args.output_dir:
+        sys.exit("--outputdir required when using --template")
+    try:
+        output_dirs = project_output_dirs(args.output_dir, args.reqdocs)
+    except ValueError as exception:
+        sys.exit(str(exception))
+    projects = read_and_parse_workspace(args.reqdocs, block_limits(args))
+    statistics = WriteStatistics()
+    fragments = FragmentCache(cache_dir=args.fragment_cache)
+    link_problems = 0
+    for output_dir, project in zip(output_dirs, projects):
+        set_fragment_cache(project, fragments)
+        if args.columnar:
+            build_column_store(project)
+        if args.check_links:
+            link_problems += _print_link_problems(project)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            write_output(
+                project,
+                output_dir,
+                args.report_templates,
+                args.template_cache,
+                statistics,
+            )
+    fragments.save()
     if args.output_dir:
-        post_process_hierarchically(project, project.root_document, args.output_dir)
-
-    if args.report_template:
-        if not args.output_dir:
-            sys.exit("--outputdir required when using --template")
-        _, output_file_name = os.path.split(args.report_template)
-        output_path = (
-            os.path.join(args.output_dir, output_file_name)
-            if args.output_dir
-            else args.report
-        )
-        with open(args.report_template, "r", encoding="utf-8") as template_file:
-            with open(output_path, "w", encoding="utf-8") as report_file:
-                for line in generate_report_line(
-                    enumerate(template_file, start=1),
-                    project,
-                    project.requirements,
-                    None,
-                    {},
-                ):
-                    report_file.write(line)
+        print(f"Output: {statistics}")
+    if link_problems:
+        sys.exit(f"{link_problems} link problems found")
+
+
+def _print_link_problems(project: Project) -> int:
+    """Prints the link problems of a project, and returns the number of problems"""
+    problems = get_link_problems(project)
+    for line in problems.lines():
+        print(f"Error: {line}")
+    return len(problems)
+
+
+def project_output_dirs(
+    output_dir: Optional[str], reqdocs: Sequence[str]
+) -> List[Optional[str]]:
+    """
+    Returns the folder to write the output of each project to. With several projects
+    (a workspace), each is written to a sub-folder of the output folder.
+    Raises ValueError if two projects would write to the same sub-folder.
+    :param output_dir: The output folder (None if no output is written)
+    :param reqdocs: The top level documents of the projects
+    :return: The output folder of each project (None if no output is written)
+    """
+    if not output_dir:
+        return [None for _ in reqdocs]
+    if len(reqdocs) == 1:
+        return [output_dir]
+    return [os.path.join(output_dir, name) for name in project_folder_names(reqdocs)]
+
+
+def project_folder_names(reqdocs: Sequence[str]) -> List[str]:
+    """
+    Returns the name of the output sub-folder of each project in a workspace: The name
+    of its top level document without extension.
+    Raises ValueError if two projects would write to the same sub-folder.
+    :param reqdocs: The top level documents of the projects
+    :return: The sub-folder names, in the same order
+    """
+    names = [os.path.splitext(os.path.basename(reqdoc))[0] for reqdoc in reqdocs]
+    # Compared without case, as folder names are not case sensitive on all systems:
+    used: Dict[str, str] = {}
+    for reqdoc, name in zip(reqdocs, names):
+        other = used.setdefault(name.lower(), reqdoc)
+        if other != reqdoc:
+            raise ValueError(
+                f"The output of {other} and {reqdoc} would both be written to the "
+                f"sub-folder {name}: Rename one of them"
+            )
+    return names
+
+
+def write_output(
+    project: Project,
+    output_dir: str,
+    report_templates: Sequence[str] = (),
+    template_cache: Optional[str] = None,
+    statistics: Optional[WriteStatistics] = None,
+) -> None:
+    """
+    Writes the processed documents and the reports of a project
+    :param project: The project
+    :param output_dir: The folder to write to
+    :param report_templates: The paths of the report templates
+    :param template_cache: The folder to cache compiled templates in (if any)
+    :param statistics: Updated with the number of files written and skipped
+    """
+    post_process_hierarchically(project, project.root_document, output_dir, statistics)
+    for report_template in report_templates:
+        _, output_file_name = os.path.split(report_template)
+        output_path = os.path.join(output_dir, output_file_name)
+        template = load_template_file(report_template, template_cache)
+        write_if_changed(output_path, render_template(template, project), statistics)
 
 
 if __name__ == "__main__":
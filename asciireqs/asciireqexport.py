@@ -1,49 +1,190 @@
 #!/usr/bin/env python3
-"""Export requirements to CVS format"""
+"""Export requirements to CVS, Excel, SQLite or JSON Lines format"""
 
 import argparse
 import os
-from typing import List, Dict, Iterable
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, List, Dict, Iterable, Optional, Sequence, Set, Tuple
 import sys
-import openpyxl
 
-from asciireqs.docparser import read_and_parse_project
+from asciireqs.columnar import ColumnStore, build_column_store
+from asciireqs.docparser import (
+    Project,
+    add_block_limit_arguments,
+    block_limits,
+    read_and_parse_project,
+)
+from asciireqs.fields import CHILD, ID, PARENT
+from asciireqs.jsonlexport import export_to_jsonl
+from asciireqs.reporting import compile_filter, filter_variables
+from asciireqs.reqdocument import ReqDocument, Requirement, walk_documents
+from asciireqs.sqliteexport import export_to_sqlite
 
+# Excel limits sheet names to 31 characters, without any of these:
+_MAX_SHEET_NAME_LENGTH = 31
+_INVALID_SHEET_NAME_CHARACTERS = re.compile(r"[\\/*?:\[\]]")
 
-def export_to_csv(
-    outputpath: str, attributes: List[str], reqs: Iterable[Dict[str, str]]
+
+def _req_values(
+    attributes: List[str], reqs: Iterable[Dict[str, str]]
+) -> Iterable[List[str]]:
+    for req in reqs:
+        yield [req[key] if key in req else "" for key in attributes]
+
+
+def export_rows_to_csv(
+    outputpath: str, attributes: List[str], rows: Iterable[List[str]]
 ) -> None:
-    """Exports the requirements to a CSV file"""
+    """Exports rows of attribute values to a CSV file"""
     with open(outputpath, "w", encoding="utf-8") as csv_file:
         csv_file.write(",".join(attributes))
         csv_file.write("\n")
-        for req in reqs:
-            csv_file.write(
-                ",".join(req[key] if key in req else "" for key in attributes)
-            )
+        for row in rows:
+            csv_file.write(",".join(row))
             csv_file.write("\n")
 
 
+def export_to_csv(
+    outputpath: str, attributes: List[str], reqs: Iterable[Dict[str, str]]
+) -> None:
+    """Exports the requirements to a CSV file"""
+    export_rows_to_csv(outputpath, attributes, _req_values(attributes, reqs))
+
+
+def export_rows_to_excel(
+    outputpath: str, attributes: List[str], rows: Iterable[List[str]]
+) -> None:
+    """
+    Exports rows of attribute values to an XSLX Excel file.
+    The workbook is written in write-only mode, so rows are streamed to the file
+    instead of being kept in memory until the workbook is saved.
+    """
+    # openpyxl is slow to import, so it is only imported for Excel exports:
+    import openpyxl  # pylint: disable=C0415
+
+    workbook = openpyxl.Workbook(write_only=True)
+    try:
+        worksheet = workbook.create_sheet("Requirements")
+        worksheet.append(attributes)
+        for row in rows:
+            worksheet.append(row)
+    except Exception:
+        _close_sheets(workbook)
+        raise
+    workbook.save(outputpath)
+    workbook.close()
+
+
+def _close_sheets(workbook: Any) -> None:
+    """
+    Closes the sheets of a write-only workbook that will not be saved, so that their
+    temporary files are not written to after they have been closed
+    """
+    for worksheet in workbook.worksheets:
+        worksheet.close()
+    workbook.close()
+
+
 def export_to_excel(
     outputpath: str, attributes: List[str], reqs: Iterable[Dict[str, str]]
 ) -> None:
     """Exports the requirements to an XSLX Excel file"""
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
+    export_rows_to_excel(outputpath, attributes, _req_values(attributes, reqs))
+
+
+def sheet_name(name: str, used_names: Set[str]) -> str:
+    """
+    Converts a document name to a valid and unique Excel sheet name
+    :param name: The document name
+    :param used_names: The (lower case) names of the sheets already in the workbook
+    :return: The sheet name
+    """
+    base = _INVALID_SHEET_NAME_CHARACTERS.sub(
+        "_", os.path.splitext(os.path.basename(name))[0]
+    )
+    base = base[:_MAX_SHEET_NAME_LENGTH] or "Document"
+    candidate = base
+    number = 1
+    while candidate.lower() in used_names:
+        number += 1
+        suffix = f" ({number})"
+        candidate = base[: _MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+    used_names.add(candidate.lower())
+    return candidate
+
+
+def _append_document(
+    worksheet: Any,
+    doc: ReqDocument,
+    req_filter: Callable[[Requirement], bool],
+    attributes: List[str],
+) -> List[Requirement]:
+    """Appends the requirements of a document to a sheet, and returns them"""
     worksheet.append(attributes)
+    exported = [req for req in doc.reqs.values() if req_filter(req)]
+    for req in exported:
+        worksheet.append([req.get(name, "") for name in attributes])
+    return exported
+
+
+def _append_links(
+    worksheet: Any, project: Project, reqs: Iterable[Requirement]
+) -> None:
+    """Appends the Parent and Child links of requirements to a sheet"""
+    worksheet.append([ID, "Link", "Linked ID"])
     for req in reqs:
-        worksheet.append([req[key] if key in req else "" for key in attributes])
+        for attribute in (PARENT, CHILD):
+            for linked_id in project.schema.list_value(req, attribute):
+                worksheet.append([req[ID], attribute, linked_id])
+
+
+def export_documents_to_excel(
+    outputpath: str,
+    project: Project,
+    documents: Iterable[ReqDocument],
+    req_filter: Callable[[Requirement], bool],
+    attributes: Optional[List[str]] = None,
+) -> None:
+    """
+    Exports the requirements to an XSLX Excel file with a sheet per document,
+    and a sheet with all Parent and Child links. The workbook is written in write-only
+    mode, so rows are streamed to the file while iterating over the project.
+    :param outputpath: The path of the Excel file
+    :param project: The project
+    :param documents: The documents to export
+    :param req_filter: Returns True for the requirements to export
+    :param attributes: The attributes to export (default: those used by each document)
+    """
+    # openpyxl is slow to import, so it is only imported for Excel exports:
+    import openpyxl  # pylint: disable=C0415
+
+    workbook = openpyxl.Workbook(write_only=True)
+    used_names: Set[str] = {"links"}
+    exported: List[Requirement] = []
+    try:
+        for doc in documents:
+            exported += _append_document(
+                workbook.create_sheet(sheet_name(doc.name, used_names)),
+                doc,
+                req_filter,
+                attributes or doc.attribute_names,
+            )
+        _append_links(workbook.create_sheet("Links"), project, exported)
+    except Exception:
+        _close_sheets(workbook)
+        raise
     workbook.save(outputpath)
     workbook.close()
 
 
-def create_arg_parser() -> argparse.ArgumentParser:
+def create_arg_parser(prog: Optional[str] = None) -> argparse.ArgumentParser:
     """
     Creates a command line argument parser.
     The return value has variables named reqdoc and outputpath.
     """
     parser = argparse.ArgumentParser(
-        description="Get requirements from an asciidoc file"
+        prog=prog, description="Get requirements from an asciidoc file"
     )
     parser.add_argument("reqdoc", help="File to parse")
     parser.add_argument("outputpath", help="Path for the output file")
@@ -54,34 +195,240 @@ def create_arg_parser() -> argparse.ArgumentParser:
         dest="recursive",
         help="Parse specifications recursively and output all requirements",
     )
+    parser.add_argument(
+        "-f",
+        "--filter",
+        dest="filter",
+        type=str,
+        default="",
+        help="Export only requirements matching a filter expression (as for asciireq-table)",
+    )
+    parser.add_argument(
+        "-c",
+        "--columns",
+        dest="columns",
+        type=str,
+        help="Comma separated list of attributes to export (default: all attributes)",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        dest="columnar",
+        help="Filter and export using a column-oriented view of the requirements "
+        "(faster for large projects)",
+    )
+    parser.add_argument(
+        "--sheet-per-document",
+        action="store_true",
+        dest="sheet_per_document",
+        help="Excel only: Put the requirements of each document on a separate sheet, "
+        "and add a sheet with all Parent and Child links",
+    )
+    add_block_limit_arguments(parser)
     return parser
 
 
-def main() -> None:
-    """main - main function"""
+def export_format(outputpath: str) -> Tuple[str, bool]:
+    """
+    Returns the format (extension) of an export file, and whether it is compressed.
+    Raises ValueError if the format is not supported.
+    """
+    base_path, extension = os.path.splitext(outputpath)
+    compress = extension == ".gz"
+    if compress:
+        extension = os.path.splitext(base_path)[1]
+    if extension not in [".cvs", ".xlsx", ".sqlite", ".db", ".jsonl"] or (
+        compress and extension != ".jsonl"
+    ):
+        raise ValueError(
+            "Supported output formats are CVS, XLSX, SQLite (.sqlite or .db) "
+            "and JSON Lines (.jsonl or .jsonl.gz), "
+            f"but {extension + '.gz' if compress else extension} was specified"
+        )
+    return extension, compress
 
-    # Parse and validate arguments:
-    args = create_arg_parser().parse_args()
-    extension = os.path.splitext(args.outputpath)[1]
-    if extension not in [".cvs", ".xlsx"]:
-        sys.exit(
-            f"Supported output formats are CVS and XLSX, but {extension} was specified"
+
+@dataclass
+class ExportOptions:
+    """The requirements and attributes to export (see export_project)"""
+
+    # Export the requirements of all documents (not just the top level):
+    recursive: bool = False
+    # Export only the requirements matching this filter:
+    filter_expression: str = ""
+    # The attributes to export (default: all attributes):
+    columns: Optional[List[str]] = None
+    # Filter and export using a column-oriented view of the requirements:
+    columnar: bool = False
+    # Excel only: Put each document on a separate sheet:
+    sheet_per_document: bool = False
+
+
+@dataclass
+class _Selection:
+    """The requirements of a project selected for an export"""
+
+    project: Project
+    options: ExportOptions
+    req_filter: Callable[[Requirement], bool]
+    store: Optional[ColumnStore] = None
+    # The rows of the selected requirements in the column store, if it was used:
+    rows: Optional[List[int]] = None
+
+    @property
+    def candidates(self) -> Dict[str, Requirement]:
+        """The requirements to select from"""
+        if self.options.recursive:
+            return self.project.requirements
+        return self.project.root_document.reqs
+
+    @property
+    def attributes(self) -> List[str]:
+        """The attributes to export"""
+        if self.options.columns:
+            return self.options.columns
+        if self.options.recursive:
+            return self.project.schema.attribute_names
+        return self.project.root_document.attribute_names
+
+    def documents(self) -> Iterable[ReqDocument]:
+        """Returns the documents to export the requirements of"""
+        if self.options.recursive:
+            return walk_documents(self.project.root_document)
+        return [self.project.root_document]
+
+    def reqs(self) -> Iterable[Dict[str, str]]:
+        """Returns the selected requirements"""
+        if self.store and self.rows is not None:
+            store = self.store
+            return (store.requirements[row] for row in self.rows)
+        return (req for req in self.candidates.values() if self.req_filter(req))
+
+    def values(self) -> Iterable[List[str]]:
+        """Returns the values of the attributes to export of the selected requirements"""
+        if self.store and self.rows is not None:
+            return self.store.values(self.attributes, self.rows)
+        return _req_values(self.attributes, self.reqs())
+
+
+def _select(project: Project, options: ExportOptions) -> _Selection:
+    """
+    Selects the requirements to export.
+    Raises ValueError if the filter is not valid.
+    """
+    try:
+        selection = _Selection(
+            project, options, compile_filter(options.filter_expression, project)
         )
+        if options.columnar:
+            selection.store = build_column_store(project)
+            selection.rows = selection.store.select(
+                selection.candidates,
+                options.filter_expression,
+                filter_variables(project),
+                lambda: selection.req_filter,
+            )
+    except (NameError, SyntaxError, KeyError) as exception:
+        raise ValueError(f"Error in filter expression: {exception}") from exception
+    return selection
+
+
+def _export_csv(outputpath: str, selection: _Selection) -> None:
+    export_rows_to_csv(outputpath, selection.attributes, selection.values())
+
+
+def _export_excel(outputpath: str, selection: _Selection) -> None:
+    if selection.options.sheet_per_document:
+        export_documents_to_excel(
+            outputpath,
+            selection.project,
+            selection.documents(),
+            selection.req_filter,
+            selection.options.columns or None,
+        )
+    else:
+        export_rows_to_excel(outputpath, selection.attributes, selection.values())
 
-    # Parse the requirements and select the data for export:
-    project = read_and_parse_project(args.reqdoc)
-    reqs = (
-        project.requirements.values()
-        if args.recursive
-        else project.root_document.reqs.values()
+
+def _export_sqlite(outputpath: str, selection: _Selection) -> None:
+    export_to_sqlite(outputpath, selection.project, selection.reqs())
+
+
+def _export_jsonl(outputpath: str, selection: _Selection) -> None:
+    export_to_jsonl(
+        outputpath,
+        selection.project,
+        selection.documents(),
+        selection.req_filter,
+        selection.options.columns or None,
     )
-    attributes = project.root_document.attribute_names
 
-    # Export to the correct format:
-    if extension == ".cvs":
-        export_to_csv(args.outputpath, attributes, reqs)
-    elif extension == ".xlsx":
-        export_to_excel(args.outputpath, attributes, reqs)
+
+# The export function for each format:
+_EXPORTERS: Dict[str, Callable[[str, _Selection], None]] = {
+    ".cvs": _export_csv,
+    ".xlsx": _export_excel,
+    ".sqlite": _export_sqlite,
+    ".db": _export_sqlite,
+    ".jsonl": _export_jsonl,
+}
+
+
+def export_project(
+    project: Project, outputpath: str, options: Optional[ExportOptions] = None
+) -> None:
+    """
+    Exports the requirements of a project, in the format given by the file extension.
+    Raises ValueError if the format is not supported or the filter is not valid.
+    :param project: The project
+    :param outputpath: The path of the output file
+    :param options: The requirements and attributes to export (default: all
+                    requirements of the top level document, with all attributes)
+    """
+    exporter = _EXPORTERS[export_format(outputpath)[0]]
+    selection = _select(project, options or ExportOptions())
+    try:
+        exporter(outputpath, selection)
+    except (NameError, KeyError) as exception:
+        # The filter is evaluated while the file is written, so it is incomplete:
+        if os.path.exists(outputpath):
+            os.remove(outputpath)
+        raise ValueError(f"Error in filter expression: {exception}") from exception
+
+
+def main(
+    argv: Optional[Sequence[str]] = None, prog: Optional[str] = None
+) -> None:
+    """main - main function"""
+
+    # Parse and validate arguments:
+    args = create_arg_parser(prog).parse_args(argv)
+    try:
+        export_format(args.outputpath)
+    except ValueError as exception:
+        sys.exit(str(exception))
+
+    # Parse the requirements and export them:
+    project = read_and_parse_project(args.reqdoc, block_limits(args))
+    columns = (
+        [name.strip() for name in args.columns.split(",") if name.strip()]
+        if args.columns
+        else None
+    )
+    try:
+        export_project(
+            project,
+            args.outputpath,
+            ExportOptions(
+                args.recursive,
+                args.filter,
+                columns,
+                args.columnar,
+                args.sheet_per_document,
+            ),
+        )
+    except ValueError as exception:
+        sys.exit(str(exception))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""batch - renders and exports many projects, listed in a manifest, in one process"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence
+
+from asciireqs.asciireq import write_output
+from asciireqs.asciireqexport import ExportOptions, export_format, export_project
+from asciireqs.diagnostics import Diagnostic, collect_diagnostics
+from asciireqs.docparser import (
+    BlockLimits,
+    Project,
+    SpecRegistry,
+    add_block_limit_arguments,
+    block_limits,
+    project_from_tree,
+    read_file,
+)
+
+
+@dataclass
+class ExportJob:
+    """An export of the requirements of a project (see asciireqexport.export_project)"""
+
+    path: str
+    recursive: bool = False
+    filter_expression: str = ""
+    columns: Optional[List[str]] = None
+    sheet_per_document: bool = False
+
+
+@dataclass
+class ProjectJob:
+    """A project in a batch manifest: The specification, the output and the exports"""
+
+    name: str
+    spec: str
+    output_dir: Optional[str] = None
+    templates: List[str] = field(default_factory=list)
+    exports: List[ExportJob] = field(default_factory=list)
+
+
+@dataclass
+class Manifest:
+    """The projects to process in a batch"""
+
+    projects: List[ProjectJob]
+    workers: int = 1
+    template_cache: Optional[str] = None
+
+
+@dataclass
+class ProjectTiming:
+    """The time spent on each phase of processing a project in a batch"""
+
+    name: str
+    requirements: int = 0
+    parse_seconds: float = 0.0
+    render_seconds: float = 0.0
+    export_seconds: float = 0.0
+    diagnostics: List[Diagnostic] = field(default_factory=list)
+    # The error that stopped the processing of the project, if any:
+    error: Optional[str] = None
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<24} {self.requirements:>8} "
+            f"{self.parse_seconds:>9.3f} {self.render_seconds:>9.3f} "
+            f"{self.export_seconds:>9.3f} {len(self.diagnostics):>6}  "
+            f"{self.error or 'OK'}"
+        )
+
+
+SUMMARY_HEADER = (
+    f"{'Project':<24} {'Reqs':>8} {'Parse s':>9} {'Render s':>9} "
+    f"{'Export s':>9} {'Errors':>6}  Status"
+)
+
+
+def _string_list(value: Any, what: str) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{what} must be a string or a list of strings")
+    return value
+
+
+def _export_job(value: Any, base_dir: str) -> ExportJob:
+    if isinstance(value, str):
+        value = {"path": value}
+    if not isinstance(value, dict) or "path" not in value:
+        raise ValueError("Each export must be a path, or have a path")
+    export_format(value["path"])
+    columns = value.get("columns")
+    return ExportJob(
+        os.path.join(base_dir, value["path"]),
+        bool(value.get("recursive", False)),
+        str(value.get("filter", "")),
+        _string_list(columns, "columns") if columns is not None else None,
+        bool(value.get("sheet_per_document", False)),
+    )
+
+
+def parse_manifest(data: Any, base_dir: str = "") -> Manifest:
+    """
+    Takes the contents of a batch manifest and returns the projects to process.
+    Raises ValueError if the manifest is not valid.
+    :param data: The manifest (as loaded from YAML)
+    :param base_dir: The folder that paths in the manifest are relative to
+    :return: The manifest
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("projects"), list):
+        raise ValueError("The manifest must have a list of projects")
+    projects: List[ProjectJob] = []
+    names = set()
+    for number, project in enumerate(data["projects"], start=1):
+        if not isinstance(project, dict) or "spec" not in project:
+            raise ValueError(f"Project {number} has no spec")
+        spec = os.path.join(base_dir, project["spec"])
+        name = str(
+            project.get("name", os.path.splitext(os.path.basename(spec))[0])
+        )
+        if name in names:
+            raise ValueError(f"Project name {name} is used more than once")
+        names.add(name)
+        output_dir = project.get("output")
+        projects.append(
+            ProjectJob(
+                name,
+                spec,
+                os.path.join(base_dir, output_dir) if output_dir else None,
+                [
+                    os.path.join(base_dir, template)
+                    for template in _string_list(
+                        project.get("templates", []), "templates"
+                    )
+                ],
+                [
+                    _export_job(export, base_dir)
+                    for export in project.get("exports", [])
+                ],
+            )
+        )
+    template_cache = data.get("template_cache")
+    return Manifest(
+        projects,
+        int(data.get("workers", 1)),
+        os.path.join(base_dir, template_cache) if template_cache else None,
+    )
+
+
+def read_manifest(manifest_path: str) -> Manifest:
+    """Reads a batch manifest (a YAML file, see parse_manifest)"""
+    # pylint: disable=C0415
+    import yaml
+
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        try:
+            data = yaml.safe_load(manifest_file)
+        except yaml.YAMLError as exception:
+            raise ValueError(f"Invalid manifest: {exception}") from exception
+    return parse_manifest(data, os.path.dirname(manifest_path))
+
+
+def _parse(
+    job: ProjectJob, registry: SpecRegistry, timing: ProjectTiming
+) -> Optional[Project]:
+    if not os.path.isfile(job.spec):
+        timing.error = f"Cannot read {job.spec}"
+        return None
+    start = time.perf_counter()
+    with collect_diagnostics() as diagnostics:
+        try:
+            project: Optional[Project] = project_from_tree(
+                registry.parse_tree(job.spec), registry.limits
+            )
+        except Exception as exception:  # pylint: disable=W0703
+            # Whatever stops the parsing of one project must not stop the others:
+            timing.error = f"Cannot parse {job.spec}: {exception}"
+            project = None
+    timing.parse_seconds = time.perf_counter() - start
+    timing.diagnostics.extend(diagnostics)
+    timing.requirements = len(project.requirements) if project else 0
+    return project
+
+
+def _render_and_export(
+    job: ProjectJob,
+    project: Project,
+    template_cache: Optional[str],
+    timing: ProjectTiming,
+) -> None:
+    with collect_diagnostics() as diagnostics:
+        try:
+            start = time.perf_counter()
+            if job.output_dir:
+                os.makedirs(job.output_dir, exist_ok=True)
+                write_output(project, job.output_dir, job.templates, template_cache)
+            timing.render_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            for export in job.exports:
+                export_project(
+                    project,
+                    export.path,
+                    ExportOptions(
+                        export.recursive,
+                        export.filter_expression,
+                        export.columns,
+                        sheet_per_document=export.sheet_per_document,
+                    ),
+                )
+            timing.export_seconds = time.perf_counter() - start
+        except Exception as exception:  # pylint: disable=W0703
+            # Whatever stops the rendering or export of one project must not stop
+            # the others:
+            timing.error = str(exception) or type(exception).__name__
+    timing.diagnostics.extend(diagnostics)
+
+
+def run_batch(
+    manifest: Manifest,
+    workers: Optional[int] = None,
+    limits: Optional[BlockLimits] = None,
+) -> List[ProjectTiming]:
+    """
+    Processes the projects of a batch. The projects are parsed one at a time with a
+    shared registry, so specifications used by several projects are only parsed once,
+    and then rendered and exported by a pool of worker threads. Compiled regular
+    expressions and templates are cached for the whole batch.
+    Errors are collected for each project, and do not stop the other projects.
+    :param manifest: The projects to process
+    :param workers: The number of worker threads (default: as given by the manifest)
+    :param limits: The maximum size of YAML blocks
+    :return: The time spent on each project, in the order of the manifest
+    """
+    registry = SpecRegistry(limits, read_file)
+    timings = [ProjectTiming(job.name) for job in manifest.projects]
+    parsed: List[Optional[Project]] = [
+        _parse(job, registry, timing)
+        for job, timing in zip(manifest.projects, timings)
+    ]
+    with ThreadPoolExecutor(max_workers=max(workers or manifest.workers, 1)) as pool:
+        for future in [
+            pool.submit(
+                _render_and_export, job, project, manifest.template_cache, timing
+            )
+            for job, project, timing in zip(manifest.projects, parsed, timings)
+            if project is not None
+        ]:
+            future.result()
+    return timings
+
+
+def main(
+    argv: Optional[Sequence[str]] = None, prog: Optional[str] = None
+) -> None:
+    """Processes the projects listed in a manifest and prints the time spent on each"""
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Render and export the projects listed in a manifest, "
+        "in one process",
+    )
+    parser.add_argument("manifest", help="The manifest (YAML) listing the projects")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        dest="workers",
+        type=int,
+        help="Number of worker threads (default: as given by the manifest, or 1)",
+    )
+    add_block_limit_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        manifest = read_manifest(args.manifest)
+    except (OSError, ValueError) as exception:
+        sys.exit(f"Error: {exception}")
+
+    start = time.perf_counter()
+    timings = run_batch(manifest, args.workers, block_limits(args))
+    for timing in timings:
+        for diagnostic in timing.diagnostics:
+            print(f"{timing.name}: {diagnostic.message}")
+    print(SUMMARY_HEADER)
+    for timing in timings:
+        print(timing)
+    print(f"{len(timings)} projects in {time.perf_counter() - start:.3f} s")
+    failed = [timing.name for timing in timings if timing.error]
+    if failed:
+        sys.exit(f"Failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
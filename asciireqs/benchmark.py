@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+"""benchmark - measures the memory used by each phase of processing a project"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from asciireqs.docparser import Project, read_and_parse_project
+from asciireqs.jsonlexport import export_to_jsonl
+from asciireqs.output import write_if_changed
+from asciireqs.reporting import post_process_hierarchically
+from asciireqs.reqdocument import walk_documents
+from asciireqs.sqliteexport import export_to_sqlite
+from asciireqs.templates import compile_template, render_template
+
+PHASES = (
+    "parse",
+    "render",
+    "export-csv",
+    "export-excel",
+    "export-sqlite",
+    "export-jsonl",
+)
+
+# The modules the command line tools start with, and the slow packages they must only
+# import when they are needed:
+STARTUP_MODULES = ("asciireqs.cli", "asciireqs.asciireq", "asciireqs.asciireqexport")
+DEFERRED_IMPORTS = ("yaml", "openpyxl", "numpy")
+
+# Change this when the baseline format changes, so that old baselines are not used:
+BASELINE_VERSION = 1
+
+_USER_SPEC = "bench-user-reqs.adoc"
+_SW_SPEC = "bench-sw-reqs.adoc"
+
+_REPORT_TEMPLATE = """= Benchmark report
+
+`asciireq-hierarchy`
+
+`asciireq-table: ID, Text, Tags; "Rel-1" in elements(Tags)`
+
+`asciireq-table: ID, Parent, Child; has_invalid_link()`
+
+`asciireq-count: "Rel-2" in elements(Tags)`
+
+`asciireq-coverage`
+"""
+
+
+@dataclass
+class PhaseMemory:
+    """The memory allocated by one phase of processing a project"""
+
+    phase: str
+    requirements: int
+    # The most memory allocated at any time during the phase:
+    peak_bytes: int
+    # The memory allocated during the phase and still in use after it:
+    retained_bytes: int
+
+    @property
+    def peak_per_requirement(self) -> float:
+        """Peak bytes per requirement"""
+        return self.peak_bytes / max(self.requirements, 1)
+
+    @property
+    def retained_per_requirement(self) -> float:
+        """Retained bytes per requirement"""
+        return self.retained_bytes / max(self.requirements, 1)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.phase:<14} peak {self.peak_bytes:>12,} B "
+            f"({self.peak_per_requirement:>9,.0f} B/req)   "
+            f"retained {self.retained_bytes:>12,} B "
+            f"({self.retained_per_requirement:>9,.0f} B/req)"
+        )
+
+
+@dataclass
+class PhaseTiming:
+    """The time taken by one phase of processing a project (the best of several runs)"""
+
+    phase: str
+    requirements: int
+    seconds: float
+
+    @property
+    def requirements_per_second(self) -> float:
+        """Requirements processed per second"""
+        return self.requirements / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.phase:<14} time {self.seconds:>10.4f} s "
+            f"({self.requirements_per_second:>12,.0f} req/s)"
+        )
+
+
+@dataclass
+class ImportTime:
+    """The time it takes to import a module in a new interpreter"""
+
+    module: str
+    microseconds: int
+    # All the modules imported with it:
+    imported: List[str]
+
+    @property
+    def deferred_imports(self) -> List[str]:
+        """The slow packages that were imported, but should only be imported when needed"""
+        return [name for name in DEFERRED_IMPORTS if name in self.imported]
+
+    def __str__(self) -> str:
+        return f"{self.module:<26} import {self.microseconds / 1000:>8.1f} ms"
+
+
+def measure_import(module: str) -> ImportTime:
+    """
+    Imports a module in a new Python interpreter, and returns the time it took
+    (as reported by python -X importtime) and the modules imported with it
+    :param module: The name of the module
+    :return: The import time
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    microseconds = 0
+    imported: List[str] = []
+    # Lines are like "import time:  self [us] | cumulative | imported package":
+    for line in completed.stderr.splitlines():
+        _, _, timing = line.partition("import time:")
+        fields = [field.strip() for field in timing.split("|")]
+        if len(fields) != 3 or not fields[1].isdigit():
+            continue
+        imported.append(fields[2])
+        if fields[2] == module:
+            microseconds = int(fields[1])
+    return ImportTime(module, microseconds, imported)
+
+
+def generate_project(directory: str, requirement_count: int) -> str:
+    """
+    Writes a project with a user requirement specification and a child software
+    requirement specification, with Parent and Child links between them.
+    :param directory: The folder to write the specifications to
+    :param requirement_count: The total number of requirements
+    :return: The path of the top level specification
+    """
+    user_count = max(requirement_count // 4, 1)
+    sw_count = max(requirement_count - user_count, 0)
+    children: Dict[int, List[str]] = {number: [] for number in range(1, user_count + 1)}
+    for number in range(1, sw_count + 1):
+        children[number % user_count + 1].append(f"SW-{number}")
+
+    def requirement(req_id: str, number: int, link: str) -> str:
+        return (
+            f"{req_id}::\n"
+            f"Requirement title {number}:\n"
+            "+\n"
+            f"The system shall handle case number {number}.\n"
+            f"The text continues on a second line for requirement {number}.\n"
+            "+\n"
+            f"Tags: Rel-{number % 3 + 1};\n"
+            f"{link}\n\n"
+        )
+
+    with open(os.path.join(directory, _USER_SPEC), "w", encoding="utf-8") as spec:
+        spec.write("= Generated user requirements\n:req_regex: UR-\\d+\n")
+        spec.write(f":req-children: {_SW_SPEC}\n\n")
+        for number in range(1, user_count + 1):
+            spec.write(
+                requirement(
+                    f"UR-{number}", number, "Child: " + ", ".join(children[number])
+                )
+            )
+    with open(os.path.join(directory, _SW_SPEC), "w", encoding="utf-8") as spec:
+        spec.write("= Generated software requirements\n:req_regex: SW-\\d+\n\n")
+        for number in range(1, sw_count + 1):
+            spec.write(
+                requirement(
+                    f"SW-{number}", number, f"Parent: UR-{number % user_count + 1}"
+                )
+            )
+    return os.path.join(directory, _USER_SPEC)
+
+
+def measure(
+    phase: str, requirements: int, function: Callable[[], Any]
+) -> Tuple[PhaseMemory, Any]:
+    """
+    Runs a function with tracemalloc and returns the memory it allocated.
+    Retained memory includes the return value of the function.
+    :param phase: The name of the phase
+    :param requirements: The number of requirements processed
+    :param function: The work to measure
+    :return: The memory used, and the return value of the function
+    """
+    tracemalloc.start()
+    try:
+        result = function()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return PhaseMemory(phase, requirements, peak, retained), result
+
+
+def _render(project: Project, output_dir: str) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    post_process_hierarchically(project, project.root_document, output_dir)
+    write_if_changed(
+        os.path.join(output_dir, "report.adoc"),
+        render_template(compile_template(_REPORT_TEMPLATE), project),
+    )
+
+
+def _export_csv(project: Project, output_path: str) -> None:
+    # pylint: disable=C0415
+    from asciireqs.asciireqexport import export_to_csv
+
+    export_to_csv(
+        output_path, project.schema.attribute_names, project.requirements.values()
+    )
+
+
+def _export_excel(project: Project, output_path: str) -> None:
+    # pylint: disable=C0415
+    from asciireqs.asciireqexport import export_to_excel
+
+    export_to_excel(
+        output_path, project.schema.attribute_names, project.requirements.values()
+    )
+
+
+def _phase_work(work_dir: str, output_name: str) -> Dict[str, Callable[[Project], Any]]:
+    """Returns the work done by each phase after parsing, writing to a work folder"""
+    return {
+        "render": lambda project: _render(project, os.path.join(work_dir, output_name)),
+        "export-csv": lambda project: _export_csv(
+            project, os.path.join(work_dir, "export.cvs")
+        ),
+        "export-excel": lambda project: _export_excel(
+            project, os.path.join(work_dir, "export.xlsx")
+        ),
+        "export-sqlite": lambda project: export_to_sqlite(
+            os.path.join(work_dir, "export.sqlite"),
+            project,
+            project.requirements.values(),
+        ),
+        "export-jsonl": lambda project: export_to_jsonl(
+            os.path.join(work_dir, "export.jsonl"),
+            project,
+            walk_documents(project.root_document),
+            lambda req: True,
+        ),
+    }
+
+
+def run_benchmark(
+    requirement_count: int, work_dir: str, phases: Iterable[str] = PHASES
+) -> List[PhaseMemory]:
+    """
+    Generates a project and measures the memory used to parse, render and export it.
+    Phases that can not run (because an optional package is missing) are skipped.
+    :param requirement_count: The number of requirements to generate
+    :param work_dir: The folder for the generated specifications and the output
+    :param phases: The phases to report (the project is always parsed)
+    :return: The memory used by each phase
+    """
+    phases = list(phases)
+    root_path = generate_project(work_dir, requirement_count)
+    work = _phase_work(work_dir, "output")
+    results: List[PhaseMemory] = []
+    # The parser prints each requirement, which is not what is measured here:
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(
+        devnull
+    ):
+        parse_memory, project = measure(
+            "parse", requirement_count, lambda: read_and_parse_project(root_path)
+        )
+        if "parse" in phases:
+            results.append(parse_memory)
+        for phase in phases:
+            if phase not in work:
+                continue
+            try:
+                memory, _ = measure(
+                    phase, requirement_count, functools.partial(work[phase], project)
+                )
+            except ImportError as exception:
+                print(f"Skipping {phase}: {exception}", file=sys.stderr)
+                continue
+            results.append(memory)
+    return results
+
+
+def run_timing(
+    requirement_count: int,
+    work_dir: str,
+    phases: Iterable[str] = PHASES,
+    repeats: int = 3,
+) -> List[PhaseTiming]:
+    """
+    Generates a project and measures the time it takes to parse, render and export it.
+    Each phase is run several times, on a newly parsed project each time (so that no
+    phase benefits from the caches filled by an earlier run), and the best time is kept.
+    Phases that can not run (because an optional package is missing) are skipped.
+    :param requirement_count: The number of requirements to generate
+    :param work_dir: The folder for the generated specifications and the output
+    :param phases: The phases to measure
+    :param repeats: The number of times to run each phase
+    :return: The time taken by each phase
+    """
+    root_path = generate_project(work_dir, requirement_count)
+    results: List[PhaseTiming] = []
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(
+        devnull
+    ):
+        for phase in phases:
+            best: Optional[float] = None
+            try:
+                for repeat in range(max(repeats, 1)):
+                    start = time.perf_counter()
+                    project = read_and_parse_project(root_path)
+                    seconds = time.perf_counter() - start
+                    if phase != "parse":
+                        # New output folders, so that all files are written each time:
+                        work = _phase_work(work_dir, f"output-{phase}-{repeat}")
+                        start = time.perf_counter()
+                        work[phase](project)
+                        seconds = time.perf_counter() - start
+                    best = seconds if best is None else min(best, seconds)
+            except ImportError as exception:
+                print(f"Skipping {phase}: {exception}", file=sys.stderr)
+                continue
+            if best is not None:
+                results.append(PhaseTiming(phase, requirement_count, best))
+    return results
+
+
+def baseline_data(
+    timings: Iterable[PhaseTiming], memory: Iterable[PhaseMemory]
+) -> Dict[str, Any]:
+    """
+    Returns the timings and memory use of each phase, as stored in a baseline file
+    :param timings: The time taken by each phase
+    :param memory: The memory used by each phase
+    :return: The baseline (as JSON data)
+    """
+    phases: Dict[str, Dict[str, float]] = {}
+    for timing in timings:
+        phases.setdefault(timing.phase, {}).update(
+            requirements=timing.requirements,
+            seconds=timing.seconds,
+            requirements_per_second=timing.requirements_per_second,
+        )
+    for result in memory:
+        phases.setdefault(result.phase, {}).update(
+            requirements=result.requirements,
+            peak_bytes=result.peak_bytes,
+            retained_bytes=result.retained_bytes,
+        )
+    return {"version": BASELINE_VERSION, "phases": phases}
+
+
+def read_baseline(baseline_path: str) -> Dict[str, Any]:
+    """Reads a baseline file. Raises ValueError if it is not a valid baseline."""
+    with open(baseline_path, "r", encoding="utf-8") as baseline_file:
+        try:
+            data: Dict[str, Any] = json.load(baseline_file)
+        except json.JSONDecodeError as exception:
+            raise ValueError(f"Invalid baseline {baseline_path}: {exception}") from None
+    if not isinstance(data, dict) or data.get("version") != BASELINE_VERSION:
+        raise ValueError(
+            f"{baseline_path} is not a baseline of version {BASELINE_VERSION}"
+        )
+    return data
+
+
+def compare_to_baseline(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    time_tolerance: float = 0.25,
+    memory_tolerance: float = 0.1,
+) -> List[str]:
+    """
+    Compares the time (per requirement) and peak memory (per requirement) of each phase
+    with a baseline. Phases that are missing in either are not compared.
+    :param baseline: The baseline (see baseline_data)
+    :param current: The results of the current run (see baseline_data)
+    :param time_tolerance: The fraction the time may increase by (0.25 is 25%)
+    :param memory_tolerance: The fraction the peak memory may increase by
+    :return: A description of each regression
+    """
+    regressions: List[str] = []
+    for phase, results in current["phases"].items():
+        reference = baseline["phases"].get(phase)
+        if not reference:
+            continue
+        for value, unit, tolerance, scale in (
+            ("seconds", "us/req", time_tolerance, 1e6),
+            ("peak_bytes", "B/req", memory_tolerance, 1.0),
+        ):
+            if value not in results or not reference.get(value):
+                continue
+            now = results[value] * scale / max(results["requirements"], 1)
+            before = reference[value] * scale / max(reference["requirements"], 1)
+            if now > before * (1 + tolerance):
+                regressions.append(
+                    f"{phase}: {value} {now:,.1f} {unit} is {now / before - 1:.0%} "
+                    f"more than the baseline {before:,.1f} {unit} "
+                    f"(tolerance {tolerance:.0%})"
+                )
+    return regressions
+
+
+def parse_threshold(text: str) -> Tuple[Optional[str], float]:
+    """
+    Parses a threshold given as "bytes" (for all phases) or "phase=bytes"
+    :param text: The threshold
+    :return: The phase (None for all phases) and the number of bytes per requirement
+    """
+    phase, separator, value = text.rpartition("=")
+    if separator and phase not in PHASES:
+        raise ValueError(f"Unknown phase {phase}")
+    return (phase if separator else None), float(value)
+
+
+def exceeded_thresholds(
+    results: Iterable[PhaseMemory],
+    max_peak: Sequence[Tuple[Optional[str], float]] = (),
+    max_retained: Sequence[Tuple[Optional[str], float]] = (),
+) -> List[str]:
+    """
+    Checks the memory used against thresholds in bytes per requirement
+    :param results: The memory used by each phase
+    :param max_peak: Thresholds for peak memory (see parse_threshold)
+    :param max_retained: Thresholds for retained memory (see parse_threshold)
+    :return: A description of each threshold that was exceeded
+    """
+    failures: List[str] = []
+    for result in results:
+        for kind, thresholds, value in (
+            ("peak", max_peak, result.peak_per_requirement),
+            ("retained", max_retained, result.retained_per_requirement),
+        ):
+            for phase, limit in thresholds:
+                if phase in (None, result.phase) and value > limit:
+                    failures.append(
+                        f"{result.phase}: {kind} memory {value:,.0f} B/req "
+                        f"exceeds {limit:,.0f} B/req"
+                    )
+    return failures
+
+
+def _check_imports(max_import_ms: Optional[float]) -> None:
+    failures: List[str] = []
+    for module in STARTUP_MODULES:
+        import_time = measure_import(module)
+        print(import_time)
+        if import_time.deferred_imports:
+            failures.append(
+                f"{module} imports {', '.join(import_time.deferred_imports)}"
+            )
+        if max_import_ms is not None and import_time.microseconds > max_import_ms * 1000:
+            failures.append(
+                f"{module}: import time {import_time.microseconds / 1000:.1f} ms "
+                f"exceeds {max_import_ms:.1f} ms"
+            )
+    if failures:
+        sys.exit("Import check failed:\n" + "\n".join(failures))
+
+
+def main(
+    argv: Optional[Sequence[str]] = None, prog: Optional[str] = None
+) -> None:
+    """
+    Measures the memory and time used by each phase, or the import time of the tools,
+    and fails if a threshold or baseline is exceeded
+    """
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Measure the memory and time used to parse, render and export "
+        "a generated project (and compare them with a baseline), or the import time "
+        "of the command line tools"
+    )
+    parser.add_argument(
+        "-n",
+        "--requirements",
+        dest="requirements",
+        type=int,
+        default=10000,
+        help="Number of requirements to generate",
+    )
+    parser.add_argument(
+        "-p",
+        "--phase",
+        dest="phases",
+        action="append",
+        choices=PHASES,
+        help="Phase to measure (can be given several times, default: all)",
+    )
+    parser.add_argument(
+        "--max-peak",
+        dest="max_peak",
+        action="append",
+        default=[],
+        type=parse_threshold,
+        help="Maximum peak bytes per requirement, for all phases or as phase=bytes "
+        "(can be given several times)",
+    )
+    parser.add_argument(
+        "--max-retained",
+        dest="max_retained",
+        action="append",
+        default=[],
+        type=parse_threshold,
+        help="Maximum retained bytes per requirement, for all phases or as phase=bytes "
+        "(can be given several times)",
+    )
+    parser.add_argument(
+        "--imports",
+        action="store_true",
+        dest="imports",
+        help="Measure the import time of the command line tools instead, and fail "
+        f"if they import any of {', '.join(DEFERRED_IMPORTS)} at startup",
+    )
+    parser.add_argument(
+        "--max-import-ms",
+        dest="max_import_ms",
+        type=float,
+        help="Maximum import time in milliseconds (with --imports)",
+    )
+    parser.add_argument(
+        "--record",
+        dest="record",
+        metavar="BASELINE",
+        help="Also measure the time of each phase, and save the results as a baseline "
+        "(JSON)",
+    )
+    parser.add_argument(
+        "--compare",
+        dest="compare",
+        metavar="BASELINE",
+        help="Also measure the time of each phase, and fail if a phase is slower or "
+        "uses more memory (per requirement) than in a baseline",
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        dest="time_tolerance",
+        type=float,
+        default=0.25,
+        help="Fraction the time of a phase may exceed the baseline by (default: 0.25)",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        dest="memory_tolerance",
+        type=float,
+        default=0.1,
+        help="Fraction the peak memory of a phase may exceed the baseline by "
+        "(default: 0.1)",
+    )
+    parser.add_argument(
+        "--repeats",
+        dest="repeats",
+        type=int,
+        default=3,
+        help="Number of times each phase is timed (the best time is used, default: 3)",
+    )
+    parser.add_argument(
+        "--work-dir",
+        dest="work_dir",
+        type=str,
+        help="Folder for the generated project (default: a temporary folder)",
+    )
+    args = parser.parse_args(argv)
+    if args.imports:
+        _check_imports(args.max_import_ms)
+        return
+    baseline: Optional[Dict[str, Any]] = None
+    if args.compare:
+        try:
+            baseline = read_baseline(args.compare)
+        except (OSError, ValueError) as exception:
+            sys.exit(f"Error: {exception}")
+
+    timings: List[PhaseTiming] = []
+    with contextlib.ExitStack() as stack:
+        work_dir = args.work_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        results = run_benchmark(args.requirements, work_dir, args.phases or PHASES)
+        if args.record or args.compare:
+            timings = run_timing(
+                args.requirements, work_dir, args.phases or PHASES, args.repeats
+            )
+    for result in results:
+        print(result)
+    for timing in timings:
+        print(timing)
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline_data(timings, results), baseline_file, indent=2)
+    failures = exceeded_thresholds(results, args.max_peak, args.max_retained)
+    if failures:
+        sys.exit("Memory threshold exceeded:\n" + "\n".join(failures))
+    if baseline is not None:
+        regressions = compare_to_baseline(
+            baseline,
+            baseline_data(timings, results),
+            args.time_tolerance,
+            args.memory_tolerance,
+        )
+        if regressions:
+            sys.exit("Slower than the baseline:\n" + "\n".join(regressions))
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""cli - the asciireq command, with a subcommand for each of the tools"""
+
+import importlib
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_COMMAND = "render"
+
+# The module with the main function of each subcommand, and what the subcommand does.
+# A module is only imported when its subcommand is run, to keep startup fast:
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    "render": (
+        "asciireqs.asciireq",
+        "Parse specifications and write the processed documents and reports",
+    ),
+    "export": (
+        "asciireqs.asciireqexport",
+        "Export requirements to CVS, Excel, SQLite or JSON Lines",
+    ),
+    "batch": (
+        "asciireqs.batch",
+        "Render and export the projects listed in a manifest, in one process",
+    ),
+    "search": (
+        "asciireqs.textindex",
+        "Find the requirements with the given words",
+    ),
+    "bench": (
+        "asciireqs.benchmark",
+        "Measure memory, time and import time, and compare them with a baseline",
+    ),
+    "langserver": (
+        "asciireqs.langserver",
+        "Run the language server for requirement IDs",
+    ),
+}
+
+
+def usage() -> str:
+    """Returns the help text for the asciireq command"""
+    lines: List[str] = [
+        "usage: asciireq [command] [options] ...",
+        "",
+        "commands:",
+    ]
+    for command, (_, description) in COMMANDS.items():
+        lines.append(f"  {command:<12}{description}")
+    lines += [
+        "",
+        f"Without a command, {DEFAULT_COMMAND} is run.",
+        "Run asciireq <command> --help for the options of a command.",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Runs the subcommand given by the first argument"""
+    arguments = list(sys.argv[1:] if argv is None else argv)
+    if arguments and arguments[0] in ("-h", "--help"):
+        print(usage())
+        return
+    command = DEFAULT_COMMAND
+    if arguments and arguments[0] in COMMANDS:
+        command = arguments.pop(0)
+    module = importlib.import_module(COMMANDS[command][0])
+    module.main(arguments, f"asciireq {command}")
+
+
+if __name__ == "__main__":
+    main()
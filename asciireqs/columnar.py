@@ -0,0 +1,296 @@
+"""columnar - a column-oriented view of the requirements, for fast filtering and export"""
+
+import ast
+import functools
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from asciireqs.docparser import Project
+from asciireqs.filtercompiler import cached_regex, regex_function
+from asciireqs.fields import ID
+from asciireqs.reqdocument import Requirement, Requirements
+
+
+@functools.lru_cache(maxsize=None)
+def _import_numpy() -> Any:
+    """Returns the NumPy module, or None if it is not installed (imported on first use)"""
+    try:
+        # pylint: disable=C0415
+        import numpy
+
+        return numpy
+    except ImportError:  # pragma: no cover - NumPy is optional
+        return None
+
+
+_CACHE_KEY = "column_store"
+
+# A boolean per row. A NumPy array if NumPy is available, otherwise a list:
+Mask = Any
+
+
+class _NotVectorisable(Exception):
+    """Signals that an expression must be evaluated one requirement at a time"""
+
+
+def _elements(text: str) -> Tuple[str, ...]:
+    """The same splitting as the 'elements' filter function"""
+    return tuple(element.strip() for element in text.split(",") if element)
+
+
+class ColumnStore:
+    """
+    This class holds the values of all requirements in a project as one column
+    (sequence of values) per attribute, with an empty string for missing values.
+    Simple filter expressions are evaluated for all rows at once, using NumPy if installed.
+    """
+
+    def __init__(self, project: Project, use_numpy: bool = True) -> None:
+        # NumPy is only imported when a column store is used, as it is slow to import:
+        numpy = _import_numpy() if use_numpy else None
+        self.numpy: Any = numpy
+        self.requirements: List[Requirement] = list(project.requirements.values())
+        self.ids: List[str] = [req[ID] for req in self.requirements]
+        self._row_of: Dict[str, int] = {
+            req_id: row for row, req_id in enumerate(self.ids)
+        }
+        self._schema = project.schema
+        self.columns: Dict[str, Sequence[str]] = {}
+        self._list_columns: Dict[str, List[Tuple[str, ...]]] = {}
+        for name in project.schema.attribute_names:
+            values = [req.get(name, "") for req in self.requirements]
+            self.columns[name] = (
+                numpy.array(values, dtype=object) if numpy is not None else values
+            )
+
+    @property
+    def use_numpy(self) -> bool:
+        """True if NumPy is used for the columns and masks"""
+        return self.numpy is not None
+
+    @property
+    def size(self) -> int:
+        """The number of rows (requirements)"""
+        return len(self.ids)
+
+    def list_column(self, name: str) -> List[Tuple[str, ...]]:
+        """Returns the values of an attribute split as lists (computed on first use)"""
+        if name not in self._list_columns:
+            if name in self._schema.list_attributes:
+                self._list_columns[name] = [
+                    self._schema.list_value(req, name) for req in self.requirements
+                ]
+            else:
+                self._list_columns[name] = [
+                    _elements(value) for value in self.columns[name]
+                ]
+        return self._list_columns[name]
+
+    def mask(self, values: Iterable[bool]) -> Mask:
+        """Makes a mask from a boolean for each row"""
+        if self.use_numpy:
+            return self.numpy.fromiter(values, dtype=bool, count=self.size)
+        return list(values)
+
+    def evaluate(
+        self, filter_expression: str, variables: Mapping[str, str]
+    ) -> Optional[Mask]:
+        """
+        Evaluates a filter expression for all rows at once.
+        Returns None if the expression is not simple enough to be evaluated column-wise
+        (the caller must then evaluate it one requirement at a time).
+        :param filter_expression: The filter expression
+        :param variables: The attribute names for the variable names in filters
+        :return: A mask with True for each matching row
+        """
+        if not filter_expression.strip():
+            return self.mask(True for _ in range(self.size))
+        try:
+            tree = ast.parse(filter_expression.strip(), "<filter>", "eval")
+            return _Vectoriser(self, variables).mask(tree.body)
+        except (_NotVectorisable, SyntaxError):
+            return None
+
+    def select(
+        self,
+        requirements: Requirements,
+        filter_expression: str,
+        variables: Mapping[str, str],
+        fallback: Callable[[], Callable[[Requirement], bool]],
+    ) -> Optional[List[int]]:
+        """
+        Returns the rows of the requirements that match a filter, in the order of 'requirements'.
+        Returns None if some of the requirements are not in the store.
+        :param requirements: The requirements to select from
+        :param filter_expression: The filter expression
+        :param variables: The attribute names for the variable names in filters
+        :param fallback: Returns a function that evaluates the filter for a single requirement
+        :return: The matching rows
+        """
+        rows = [self._row_of.get(req_id, -1) for req_id in requirements]
+        if any(
+            row < 0 or self.requirements[row] is not requirements[self.ids[row]]
+            for row in rows
+        ):
+            return None
+        mask = self.evaluate(filter_expression, variables)
+        if mask is None:
+            # Only the requirements selected from are evaluated, as the filter may fail
+            # for others (for example ones in other documents, with other attributes):
+            req_filter = fallback()
+            return [row for row in rows if req_filter(self.requirements[row])]
+        if self.use_numpy and len(rows) == self.size and rows == sorted(rows):
+            return [int(row) for row in self.numpy.flatnonzero(mask)]
+        return [row for row in rows if mask[row]]
+
+    def values(
+        self, attributes: List[str], rows: Iterable[int]
+    ) -> Iterator[List[str]]:
+        """Returns the values of the specified attributes (columns) for each row"""
+        columns = [self.columns.get(name) for name in attributes]
+        for row in rows:
+            yield [column[row] if column is not None else "" for column in columns]
+
+
+class _Vectoriser:  # pylint: disable=R0903
+    """Evaluates the AST of a simple filter expression column-wise"""
+
+    def __init__(self, store: ColumnStore, variables: Mapping[str, str]) -> None:
+        self.store = store
+        self.variables = variables
+
+    def mask(self, node: ast.expr) -> Mask:
+        """Returns the mask for an expression node"""
+        if isinstance(node, ast.BoolOp):
+            masks = [self.mask(value) for value in node.values]
+            result = masks[0]
+            for other in masks[1:]:
+                result = (
+                    self._and(result, other)
+                    if isinstance(node.op, ast.And)
+                    else self._or(result, other)
+                )
+            return result
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return self._not(self.mask(node.operand))
+        if isinstance(node, ast.Compare) and len(node.ops) == 1:
+            return self._compare(node.left, node.ops[0], node.comparators[0])
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        if isinstance(node, ast.Name):
+            column = self._column(node)
+            return self.store.mask(bool(value) for value in column)
+        raise _NotVectorisable()
+
+    def _and(self, left: Mask, right: Mask) -> Mask:
+        if self.store.use_numpy:
+            return left & right
+        return [a and b for a, b in zip(left, right)]
+
+    def _or(self, left: Mask, right: Mask) -> Mask:
+        if self.store.use_numpy:
+            return left | right
+        return [a or b for a, b in zip(left, right)]
+
+    def _not(self, mask: Mask) -> Mask:
+        if self.store.use_numpy:
+            return ~mask
+        return [not a for a in mask]
+
+    def _attribute(self, node: ast.expr) -> str:
+        if isinstance(node, ast.Name) and node.id in self.variables:
+            return self.variables[node.id]
+        raise _NotVectorisable()
+
+    def _column(self, node: ast.expr) -> Sequence[str]:
+        return self.store.columns[self._attribute(node)]
+
+    def _compare(self, left: ast.expr, operator: ast.cmpop, right: ast.expr) -> Mask:
+        if isinstance(operator, (ast.Eq, ast.NotEq)):
+            if isinstance(left, ast.Constant):
+                left, right = right, left
+            column = self._column(left)
+            value = _constant(right)
+            if self.store.use_numpy:
+                mask = self.store.numpy.asarray(column == value, dtype=bool)
+            else:
+                mask = [element == value for element in column]
+            return mask if isinstance(operator, ast.Eq) else self._not(mask)
+        if isinstance(operator, (ast.In, ast.NotIn)):
+            mask = self._contains(left, right)
+            return mask if isinstance(operator, ast.In) else self._not(mask)
+        raise _NotVectorisable()
+
+    def _contains(self, left: ast.expr, right: ast.expr) -> Mask:
+        if isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+            # Attribute in ["a", "b"]:
+            values = {_constant(element) for element in right.elts}
+            column = self._column(left)
+            return self.store.mask(value in values for value in column)
+        value = _constant(left)
+        if (
+            isinstance(right, ast.Call)
+            and isinstance(right.func, ast.Name)
+            and right.func.id == "elements"
+            and len(right.args) == 1
+            and not right.keywords
+        ):
+            # "value" in elements(Attribute):
+            lists = self.store.list_column(self._attribute(right.args[0]))
+            return self.store.mask(value in elements for elements in lists)
+        # "value" in Attribute (substring):
+        column = self._column(right)
+        return self.store.mask(value in text for text in column)
+
+    def _call(self, node: ast.Call) -> Mask:
+        function = node.func
+        if node.keywords:
+            raise _NotVectorisable()
+        if (
+            isinstance(function, ast.Attribute)
+            and function.attr == "startswith"
+            and len(node.args) == 1
+        ):
+            # Attribute.startswith("prefix"):
+            prefix = _constant(node.args[0])
+            column = self._column(function.value)
+            return self.store.mask(text.startswith(prefix) for text in column)
+        method = regex_function(function)
+        if not method or len(node.args) != 2:
+            raise _NotVectorisable()
+        # search("pattern", Attribute) etc.:
+        matcher = getattr(cached_regex(_constant(node.args[0])), method)
+        column = self._column(node.args[1])
+        return self.store.mask(matcher(text) is not None for text in column)
+
+
+def _constant(node: ast.expr) -> str:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    raise _NotVectorisable()
+
+
+def build_column_store(project: Project, use_numpy: bool = True) -> ColumnStore:
+    """
+    Builds the column store for a project. Once built, it is used for all tables
+    and exports of the project.
+    """
+    store = ColumnStore(project, use_numpy)
+    project.cache[_CACHE_KEY] = store
+    return store
+
+
+def get_column_store(project: Project) -> Optional[ColumnStore]:
+    """Returns the column store of a project, or None if it has not been built"""
+    store: Optional[ColumnStore] = project.cache.get(_CACHE_KEY)
+    return store
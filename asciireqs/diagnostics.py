@@ -0,0 +1,49 @@
+"""diagnostics - errors found in the specifications, printed or collected as values"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """An error found in a specification"""
+
+    message: str
+    # The line the error was found on (0 if not known):
+    line: int = 0
+
+
+# The diagnostics being collected (None if they are printed):
+_collected: ContextVar[Optional[List[Diagnostic]]] = ContextVar(
+    "asciireq_diagnostics", default=None
+)
+
+
+def report(message: str, line: int = 0) -> None:
+    """
+    Reports an error. The error is printed, unless diagnostics are being collected
+    (see collect_diagnostics).
+    :param message: The error message
+    :param line: The line the error was found on (0 if not known)
+    """
+    diagnostics = _collected.get()
+    if diagnostics is None:
+        print(message)
+    else:
+        diagnostics.append(Diagnostic(message, line))
+
+
+@contextmanager
+def collect_diagnostics() -> Iterator[List[Diagnostic]]:
+    """
+    Collects the errors reported in the current thread (or asyncio task) in a list,
+    instead of printing them
+    """
+    diagnostics: List[Diagnostic] = []
+    token = _collected.set(diagnostics)
+    try:
+        yield diagnostics
+    finally:
+        _collected.reset(token)
@@ -0,0 +1,302 @@
+"""discovery - finds the child specifications that match glob patterns in req-children"""
+
+import fnmatch
+import os
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+# A pattern component that matches any number of folders:
+_ANY_FOLDERS = "**"
+
+# A pattern component is a name, a regular expression or _ANY_FOLDERS:
+Component = Union[str, Pattern[str]]
+
+_WILDCARDS = re.compile(r"[*?\[]")
+
+# The maximum number of folders scanned at once:
+_MAX_WORKERS = 8
+
+
+def is_pattern(name: str) -> bool:
+    """Returns True if a req-children entry is a glob pattern rather than a file name"""
+    return bool(_WILDCARDS.search(name))
+
+
+@lru_cache(maxsize=256)
+def _components(pattern: str) -> Tuple[Component, ...]:
+    """
+    Splits a glob pattern into its components (separated by /). Components without
+    wildcards are kept as names, so those folders are looked up instead of scanned.
+    """
+    components: List[Component] = []
+    for part in pattern.replace("\\", "/").split("/"):
+        if not part or part == ".":
+            continue
+        if part == _ANY_FOLDERS:
+            if not components or components[-1] != _ANY_FOLDERS:
+                components.append(part)
+        elif is_pattern(part):
+            components.append(re.compile(fnmatch.translate(part)))
+        else:
+            components.append(part)
+    return tuple(components)
+
+
+def _matches(component: Component, name: str) -> bool:
+    if isinstance(component, str):
+        return component == name
+    # As in the shell, wildcards do not match hidden names:
+    return not name.startswith(".") and component.match(name) is not None
+
+
+def _matches_parts(components: Sequence[Component], parts: Sequence[str]) -> bool:
+    """Returns True if the parts of a relative path match the components of a pattern"""
+    if not components:
+        return not parts
+    first = components[0]
+    if first == _ANY_FOLDERS:
+        rest = components[1:]
+        if not rest:
+            return bool(parts) and not any(part.startswith(".") for part in parts)
+        for skip, part in enumerate(parts):
+            if _matches_parts(rest, parts[skip:]):
+                return True
+            if part.startswith("."):
+                return False
+        return False
+    return (
+        bool(parts)
+        and _matches(first, parts[0])
+        and _matches_parts(components[1:], parts[1:])
+    )
+
+
+def _sort_key(name: str) -> Tuple[str, ...]:
+    # Sorted by folder, so that the order does not depend on the path separator:
+    return tuple(name.split(os.sep))
+
+
+def match_paths(paths: Iterable[str], directory: str, pattern: str) -> List[str]:
+    """
+    Returns the paths (for example the keys of in-memory sources) that match a pattern
+    relative to a folder, as used for req-children
+    :param paths: The paths to match
+    :param directory: The folder that the pattern is relative to
+    :param pattern: The glob pattern
+    :return: The matching paths, relative to the folder, in sorted order
+    """
+    components = _components(pattern)
+    base = os.path.normpath(directory or os.curdir)
+    found = set()
+    for path in paths:
+        relative = os.path.relpath(os.path.normpath(path), base)
+        parts = relative.split(os.sep)
+        if parts[0] != os.pardir and _matches_parts(components, parts):
+            found.add(relative)
+    return sorted(found, key=_sort_key)
+
+
+@dataclass
+class _Discovery:
+    """The files found for a pattern, and the folders looked at to find them"""
+
+    files: List[str]
+    # The modification time of each folder looked at (None if it did not exist):
+    folders: Dict[str, Optional[int]]
+
+
+_cache: Dict[Tuple[str, str], _Discovery] = {}
+_cache_lock = threading.Lock()
+
+
+def _modification_time(folder: str) -> Optional[int]:
+    try:
+        return os.stat(folder).st_mtime_ns
+    except OSError:
+        return None
+
+
+# The sub-folders (and whether each is a link) and the files in a folder:
+_Entries = Tuple[List[Tuple[str, bool]], List[str]]
+
+
+def _scan(folder: str) -> _Entries:
+    """Returns the sub-folders (and whether each is a link) and the files in a folder"""
+    folders: List[Tuple[str, bool]] = []
+    files: List[str] = []
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        folders.append((entry.name, entry.is_symlink()))
+                    else:
+                        files.append(entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return folders, files
+
+
+# The folders to visit (relative to the base), and the components to match in each:
+_Level = Dict[Tuple[str, ...], Set[int]]
+
+
+class _Discoverer:  # pylint: disable=R0903
+    """
+    Finds the files matching the components of a pattern, one folder level at a time.
+    Only folders that can contain matches are visited: Components without wildcards
+    are looked up directly, and the folders of each level are scanned in parallel.
+    """
+
+    def __init__(self, base: str, components: Tuple[Component, ...]) -> None:
+        self.base = base
+        self.components = components
+        self.last = len(components) - 1
+        self.discovery = _Discovery([], {})
+        self._next_level: _Level = {}
+        self._executor: Any = None
+
+    def run(self) -> _Discovery:
+        """Visits the folders that can contain matches, and returns the files found"""
+        level: _Level = {(): {0}}
+        try:
+            while level:
+                self._next_level = {}
+                self._visit(level)
+                level = self._next_level
+        finally:
+            if self._executor:
+                self._executor.shutdown()
+        self.discovery.files = sorted(set(self.discovery.files), key=_sort_key)
+        return self.discovery
+
+    def _visit(self, level: _Level) -> None:
+        for indexes in level.values():
+            # Any number of folders includes none:
+            indexes.update(
+                index + 1
+                for index in list(indexes)
+                if self.components[index] == _ANY_FOLDERS and index < self.last
+            )
+        paths = {folder: os.path.join(self.base, *folder) for folder in level}
+        for path in paths.values():
+            self.discovery.folders[path] = _modification_time(path)
+        # Folders with only names to match are looked up, not scanned:
+        to_scan = [
+            folder
+            for folder, indexes in level.items()
+            if any(not self._is_name(index) for index in indexes)
+        ]
+        scanned = dict(
+            zip(to_scan, self._scan_all([paths[folder] for folder in to_scan]))
+        )
+        for folder, indexes in level.items():
+            for index in indexes:
+                if folder not in scanned:
+                    self._look_up(folder, paths[folder], index)
+                elif self.components[index] == _ANY_FOLDERS:
+                    self._match_any_folders(folder, scanned[folder], index)
+                else:
+                    self._match_names(folder, scanned[folder], index)
+
+    def _is_name(self, index: int) -> bool:
+        component = self.components[index]
+        return isinstance(component, str) and component != _ANY_FOLDERS
+
+    def _scan_all(self, paths: List[str]) -> List[_Entries]:
+        if len(paths) > 1 and self._executor is None:
+            # Imported on first use, so that it does not slow down startup:
+            # pylint: disable=C0415
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+        if self._executor:
+            return list(self._executor.map(_scan, paths))
+        return [_scan(path) for path in paths]
+
+    def _add_folder(self, folder: Tuple[str, ...], index: int) -> None:
+        self._next_level.setdefault(folder, set()).add(index)
+
+    def _look_up(self, folder: Tuple[str, ...], path: str, index: int) -> None:
+        name = self.components[index]
+        assert isinstance(name, str)
+        if index == self.last:
+            if os.path.isfile(os.path.join(path, name)):
+                self.discovery.files.append(os.path.join(*folder, name))
+        elif os.path.isdir(os.path.join(path, name)):
+            self._add_folder(folder + (name,), index + 1)
+
+    def _match_any_folders(
+        self, folder: Tuple[str, ...], entries: _Entries, index: int
+    ) -> None:
+        sub_folders, files = entries
+        for name, is_link in sub_folders:
+            # Links are not followed, so that they can not form loops:
+            if not name.startswith(".") and not is_link:
+                self._add_folder(folder + (name,), index)
+        if index == self.last:
+            self.discovery.files.extend(
+                os.path.join(*folder, name)
+                for name in files
+                if not name.startswith(".")
+            )
+
+    def _match_names(
+        self, folder: Tuple[str, ...], entries: _Entries, index: int
+    ) -> None:
+        sub_folders, files = entries
+        component = self.components[index]
+        if index == self.last:
+            self.discovery.files.extend(
+                os.path.join(*folder, name)
+                for name in files
+                if _matches(component, name)
+            )
+            return
+        for name, _ in sub_folders:
+            if _matches(component, name):
+                self._add_folder(folder + (name,), index + 1)
+
+
+def find_files(directory: str, pattern: str) -> List[str]:
+    """
+    Finds the files that match a glob pattern, as used for req-children. Patterns are
+    relative to a folder and use / between folders; ** matches any number of folders
+    and * and ? do not match hidden names. The results are cached, and reused as long
+    as none of the folders looked at have been modified (entries added, removed or
+    renamed), so unchanged trees are not scanned again.
+    :param directory: The folder that the pattern is relative to ("" for the current)
+    :param pattern: The glob pattern, for example specs/**/*.adoc
+    :return: The matching files, relative to the folder, in sorted order
+    """
+    components = _components(pattern)
+    if not components:
+        return []
+    base = os.path.abspath(directory or os.curdir)
+    key = (base, pattern)
+    with _cache_lock:
+        discovery = _cache.get(key)
+    if discovery is None or any(
+        _modification_time(folder) != modified
+        for folder, modified in discovery.folders.items()
+    ):
+        discovery = _Discoverer(base, components).run()
+        with _cache_lock:
+            _cache[key] = discovery
+    return list(discovery.files)
@@ -1,13 +1,23 @@
 """docparser - Contains functions to scan an asciidoc file for requirements"""
 
+import argparse
 import os
 import re
-from copy import copy
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Tuple
-import yaml
-from yaml.scanner import ScannerError
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
+from asciireqs.diagnostics import report
+from asciireqs.discovery import find_files, is_pattern
 from asciireqs.fields import ID, TEXT, LINE_NO, TITLE
 from asciireqs.reqdocument import (
     ReqDocument,
@@ -16,7 +26,40 @@ from asciireqs.reqdocument import (
     ReqParseError,
     add_attribute,
     add_attributes,
+    walk_documents,
 )
+from asciireqs.schema import AttributeSchema
+
+
+@dataclass
+class BlockLimits:
+    """Limits for the size of YAML blocks (larger blocks are reported as errors and skipped)"""
+
+    max_lines: int = 100000
+    max_bytes: int = 10000000
+
+
+def add_block_limit_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the command line options for the limits of YAML blocks to a parser"""
+    parser.add_argument(
+        "--max-yaml-lines",
+        dest="max_yaml_lines",
+        type=int,
+        default=BlockLimits.max_lines,
+        help="Maximum number of lines in a YAML block",
+    )
+    parser.add_argument(
+        "--max-yaml-bytes",
+        dest="max_yaml_bytes",
+        type=int,
+        default=BlockLimits.max_bytes,
+        help="Maximum size of a YAML block in bytes",
+    )
+
+
+def block_limits(args: argparse.Namespace) -> BlockLimits:
+    """Returns the limits of YAML blocks given by the command line options"""
+    return BlockLimits(args.max_yaml_lines, args.max_yaml_bytes)
 
 
 @dataclass
@@ -25,6 +68,16 @@ class Project:
 
     root_document: ReqDocument
     requirements: Requirements
+    schema: AttributeSchema = field(default_factory=AttributeSchema)
+    block_limits: BlockLimits = field(default_factory=BlockLimits)
+    # Derived data (statistics etc.) computed on demand and shared for the whole run:
+    cache: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.requirements and not self.schema.attribute_names:
+            # The project was not built by the parser, so the schema must be populated here:
+            self.schema.add_documents(self.root_document)
+            self.schema.add_requirements(self.requirements.values())
 
 
 @dataclass
@@ -34,21 +87,33 @@ class Location:
     line: int
 
 
-def get_source_block(lines: Iterable[Tuple[int, str]]) -> Tuple[List[str], int]:
+def _skip_rest_of_block(lines: Iterable[Tuple[int, str]]) -> None:
+    """Consumes lines up to and including the end of the current source block"""
+    for _, line in lines:
+        if line.rstrip(" \n") == "----":
+            return
+
+
+def get_source_block(
+    lines: Iterable[Tuple[int, str]], limits: Optional[BlockLimits] = None
+) -> Tuple[List[str], int]:
     """
     Takes AsciiDoc lines of text (starting with a source block) and consumes the source block
     lines and returns them (not including the '----' start and end lines)
     :param lines: The input lines
+    :param limits: The maximum size of the block (BlockLimits() if not specified)
     :return: The contents of the source block
     """
+    limits = limits or BlockLimits()
     is_first = True
     source: List[str] = []
+    size = 0
     first_line_no: int = 0
     for line_no, line in lines:
         if is_first:
             first_line = line.strip(" \n")
             if first_line != "----":
-                print(f"Error: Not a YAML block on line {line_no}")
+                report(f"Error: Not a YAML block on line {line_no}", line_no)
                 return [], 0
             first_line_no = line_no + 1
             is_first = False
@@ -56,23 +121,37 @@ def get_source_block(lines: Iterable[Tuple[int, str]]) -> Tuple[List[str], int]:
             line = line.rstrip(" \n")
             if line == "----":
                 return source, first_line_no
-            source = source + [line]
+            source.append(line)
+            size += len(line) + 1
+            if len(source) > limits.max_lines or size > limits.max_bytes:
+                report(
+                    f"Error: YAML block on line {first_line_no} is larger than "
+                    f"{limits.max_lines} lines or {limits.max_bytes} bytes",
+                    first_line_no,
+                )
+                _skip_rest_of_block(lines)
+                return [], 0
+    if not is_first:
+        report(
+            f"Error: YAML block on line {first_line_no} has no terminating '----'",
+            first_line_no,
+        )
     return [], 0
 
 
 def validate_requirement(req: Requirement, doc: ReqDocument, line_no: int) -> bool:
     """Takes a Requirement and verifies that it contains the required attributes"""
     if not doc.req_regex:
-        print("Error: Document has no req_regex attribute")
+        report("Error: Document has no req_regex attribute", line_no)
         return False
     if ID not in req:
-        print(f"Error: Missing ID attribute on line {line_no}")
+        report(f"Error: Missing ID attribute on line {line_no}", line_no)
         return False
     if TEXT not in req:
-        print(f"Error: Missing Text attribute on line {line_no}")
+        report(f"Error: Missing Text attribute on line {line_no}", line_no)
         return False
     if not re.match(f"{doc.req_regex}", req[ID]):
-        print(f"Error: Wrong ID format on line {line_no}")
+        report(f"Error: Wrong ID format on line {line_no}", line_no)
         return False
     return True
 
@@ -81,51 +160,79 @@ def req_from_yaml_lines(
     lines: List[str], doc: ReqDocument, line_no: int
 ) -> List[Requirement]:
     """Takes a list of YAML source lines and returns the requirement therein"""
+    # PyYAML is slow to import, and only needed by documents with YAML blocks:
+    # pylint: disable=C0415
+    import yaml
+
     try:
         attributes = yaml.safe_load("\n".join(lines))
-    except ScannerError:
-        print(f"Error: Failed to parse YAML on line {line_no}")
+    except yaml.YAMLError:
+        report(f"Error: Failed to parse YAML on line {line_no}", line_no)
         return []
-    if not attributes:
-        print(f"Error: Failed to parse YAML on line {line_no}")
+    if not attributes or not isinstance(attributes, dict):
+        report(f"Error: Failed to parse YAML on line {line_no}", line_no)
         return []
 
     reqs = []
-    if re.match(f"{doc.req_regex}", next(iter(attributes.keys()))):
+    if re.match(f"{doc.req_regex}", str(next(iter(attributes.keys())))):
         # This is dict of requirements:
         for req_id, attrs in attributes.items():
+            if not isinstance(attrs, dict):
+                report(
+                    f"Error: Requirement {req_id} on line {line_no} has no attributes",
+                    line_no,
+                )
+                continue
             req = {name: str(value).strip(" \n") for name, value in attrs.items()}
-            req[ID] = req_id
+            req[ID] = str(req_id)
             if validate_requirement(req, doc, line_no):
                 reqs += [req]
     else:
         # This must be a single requirement:
         req = {}
         for name, value in attributes.items():
-            req[name] = str(value).strip(" \n")
+            req[str(name)] = str(value).strip(" \n")
         if validate_requirement(req, doc, line_no):
             reqs = [req]
 
-    # The line number must be the line the ID is on, so we need to search for it:
+    _add_line_numbers(reqs, lines, line_no)
+    return reqs
+
+
+def _add_line_numbers(
+    reqs: List[Requirement], lines: List[str], line_no: int
+) -> None:
+    """Sets the line number of each requirement from a YAML block to the line its ID is on"""
+    # Requirements in a dict of requirements are defined on lines without indentation:
+    key_lines: Dict[str, int] = {}
+    if len(reqs) > 1:
+        for key_line_no, line in enumerate(lines, start=line_no):
+            if line and not line[0].isspace():
+                key_lines.setdefault(line.split(":")[0].strip(), key_line_no)
     for req in reqs:
         req_id = req[ID]
+        if req_id in key_lines:
+            req[LINE_NO] = str(key_lines[req_id])
+            continue
         for id_line_no, line in enumerate(lines, start=line_no):
             if line.find(req_id) >= 0:
                 req[LINE_NO] = str(id_line_no)
-    return reqs
 
 
 def req_from_yaml_block(
-    lines: Iterable[Tuple[int, str]], doc: ReqDocument
+    lines: Iterable[Tuple[int, str]],
+    doc: ReqDocument,
+    limits: Optional[BlockLimits] = None,
 ) -> List[Requirement]:
     """
     Takes AsciiDoc lines of text (starting with a source block), consumes the source block
     lines, converts to YAML and returns the requirements defined by the YAML
     :param lines: The input lines
     :param doc: The current document
+    :param limits: The maximum size of the block
     :return: The requirements
     """
-    yaml_lines, start_line_no = get_source_block(lines)
+    yaml_lines, start_line_no = get_source_block(lines, limits)
     if yaml_lines:
         return req_from_yaml_lines(yaml_lines, doc, start_line_no)
     return []
@@ -195,7 +302,7 @@ def req_from_term(
                 req[TITLE] = line.rstrip(":")
                 line_no, line = next(line_iter)
                 if line.strip() != "+":
-                    print(f'Error: Expected "+" on line {line_no}')
+                    report(f'Error: Expected "+" on line {line_no}', line_no)
                     return None
                 req[TEXT] = next(line_iter)[1]
             else:
@@ -218,14 +325,16 @@ def req_from_term(
         except StopIteration:
             pass
         except ReqParseError as exception:
-            print(f"Error: {exception} on line {line_no}")
+            report(f"Error: {exception} on line {line_no}", line_no)
             return None
         if validate_requirement(req, doc, line_no):
             return req
     return None
 
 
-def parse_doc(lines: Iterable[Tuple[int, str]]) -> ReqDocument:
+def parse_doc(
+    lines: Iterable[Tuple[int, str]], limits: Optional[BlockLimits] = None
+) -> ReqDocument:
     """Parses lines of AsciiDoc text and returns a ReqDocument with all the requirements etc."""
     doc = ReqDocument()
     for line_no, text in lines:
@@ -234,7 +343,7 @@ def parse_doc(lines: Iterable[Tuple[int, str]]) -> ReqDocument:
         if term_req:
             doc.add_req(term_req)
         elif text == "[.reqy]":
-            for req in req_from_yaml_block(lines, doc):
+            for req in req_from_yaml_block(lines, doc, limits):
                 doc.add_req(req)
         else:
             attribute_value = get_attribute(text, "req-children")
@@ -244,31 +353,177 @@ def parse_doc(lines: Iterable[Tuple[int, str]]) -> ReqDocument:
                 ]
             attribute_value = get_attribute(text, "req_regex")
             if attribute_value:
-                doc.req_regex = attribute_value
+                try:
+                    re.compile(attribute_value)
+                    doc.req_regex = attribute_value
+                except re.error as exception:
+                    report(f"Error: Invalid req_regex: {exception}", line_no)
     return doc
 
 
-def read_and_parse(file_name: str) -> ReqDocument:
+def parse_text(
+    text: str, name: str, limits: Optional[BlockLimits] = None
+) -> ReqDocument:
+    """Parses AsciiDoc text and returns a ReqDocument with the name and all the requirements etc."""
+    doc = parse_doc(enumerate(text.splitlines(keepends=True), start=1), limits)
+    doc.name = name
+    return doc
+
+
+def read_file(path: str) -> str:
+    """Returns the text of a file (the source used for specifications on disk)"""
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def read_and_parse(
+    file_name: str, limits: Optional[BlockLimits] = None
+) -> ReqDocument:
     """Parses an AsciiDoc file and returns a ReqDocument with all the requirements etc."""
     with open(file_name, "r", encoding="utf-8") as file:
-        doc = parse_doc(enumerate(file, start=1))
+        doc = parse_doc(enumerate(file, start=1), limits)
         doc.name = file_name
         for req in doc.reqs.values():
             print(req)
         return doc
 
 
-def read_and_parse_project(file_path: str) -> Project:
-    """Takes the path to the to level specification and returns a complete project model"""
-    path, _ = os.path.split(file_path)
-    doc = read_and_parse(file_path)
-    requirements = copy(doc.reqs)
-    for sub_file_name in doc.child_doc_files:
-        child_doc = read_and_parse(os.path.join(path, sub_file_name))
-        doc.add_child_doc(child_doc)
-        for req_id, req in child_doc.reqs.items():
+def _normalised_path(file_path: str) -> str:
+    """Returns a path that is the same for all the ways a file can be referenced"""
+    return os.path.normcase(os.path.realpath(file_path))
+
+
+class SpecRegistry:
+    """
+    This class holds parsed specifications by normalised path, so that specifications
+    shared by several parents (or several projects) are only parsed once.
+    If a source is given, it returns the text of a specification by its path,
+    and specifications are parsed from that text instead of being read from files
+    (without printing the requirements).
+    Glob patterns in req-children are expanded by the discover function, which returns
+    the matching paths relative to a folder (by default, files found on disk).
+    """
+
+    def __init__(
+        self,
+        limits: Optional[BlockLimits] = None,
+        source: Optional[Callable[[str], str]] = None,
+        discover: Callable[[str, str], List[str]] = find_files,
+    ) -> None:
+        self.limits = limits or BlockLimits()
+        self.source = source
+        self.discover = discover
+        self.documents: Dict[str, ReqDocument] = {}
+
+    def _key(self, file_path: str) -> str:
+        if self.source:
+            # Not necessarily a file, so only the path itself is normalised:
+            return os.path.normpath(file_path)
+        return _normalised_path(file_path)
+
+    def _parse(self, file_path: str) -> ReqDocument:
+        if not self.source:
+            return read_and_parse(file_path, self.limits)
+        try:
+            text = self.source(file_path)
+        except (OSError, KeyError):
+            # An empty document in its place, so that the rest of the tree is parsed:
+            report(f"ERROR: Cannot read {file_path}")
+            text = ""
+        return parse_text(text, file_path, self.limits)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _child_files(self, path: str, doc: ReqDocument) -> Iterator[Tuple[str, bool]]:
+        """Returns the child specification paths, and whether each matched a pattern"""
+        for sub_file_name in doc.child_doc_files:
+            if not is_pattern(sub_file_name):
+                yield os.path.join(path, sub_file_name), False
+                continue
+            matches = self.discover(path, sub_file_name)
+            if not matches:
+                report(
+                    f"ERROR: No files match req-children {sub_file_name} in {doc.name}"
+                )
+            for match in matches:
+                yield os.path.join(path, match), True
+
+    def parse_tree(
+        self, file_path: str, ancestors: FrozenSet[str] = frozenset()
+    ) -> ReqDocument:
+        """
+        Parses a specification and (recursively) all its child specifications,
+        unless it has been parsed before. The files matching a glob pattern in
+        req-children are parsed in sorted order.
+        :param file_path: The path to the specification
+        :param ancestors: Normalised paths of the specifications above this one
+        :return: The document
+        """
+        key = self._key(file_path)
+        if key in self.documents:
+            # Shared sub-specification that has already been parsed:
+            return self.documents[key]
+        doc = self._parse(file_path)
+        self.documents[key] = doc
+        path, _ = os.path.split(file_path)
+        ancestors = ancestors | {key}
+        for sub_file_path, matched in self._child_files(path, doc):
+            if self._key(sub_file_path) in ancestors:
+                if matched:
+                    # Patterns like *.adoc can match the specification itself:
+                    continue
+                report(
+                    "ERROR: Cyclic req-children reference "
+                    f"from {file_path} to {sub_file_path}"
+                )
+                continue
+            doc.add_child_doc(self.parse_tree(sub_file_path, ancestors))
+        return doc
+
+
+def project_from_tree(root_document: ReqDocument, limits: BlockLimits) -> Project:
+    """Builds a project from a parsed hierarchy of documents"""
+    requirements: Requirements = {}
+    schema = AttributeSchema()
+    for doc in walk_documents(root_document):
+        for req_id, req in doc.reqs.items():
             if req_id in requirements:
-                print(f"ERROR: Duplicate requirement {req_id}")
+                report(f"ERROR: Duplicate requirement {req_id}")
             else:
                 requirements[req_id] = req
-    return Project(doc, requirements)
+                schema.add_requirement(req)
+    return Project(root_document, requirements, schema, limits)
+
+
+def read_and_parse_project(
+    file_path: str,
+    limits: Optional[BlockLimits] = None,
+    registry: Optional[SpecRegistry] = None,
+) -> Project:
+    """
+    Takes the path to the top level specification and returns a complete project model.
+    Child specifications are parsed to any depth, and specifications that are children
+    of several parents are only parsed once.
+    :param file_path: The path to the top level specification
+    :param limits: The maximum size of YAML blocks (ignored if a registry is given)
+    :param registry: Specifications parsed earlier, to reuse (and add new ones to)
+    :return: The project
+    """
+    if registry is None:
+        registry = SpecRegistry(limits)
+    return project_from_tree(registry.parse_tree(file_path), registry.limits)
+
+
+def read_and_parse_workspace(
+    file_paths: Iterable[str], limits: Optional[BlockLimits] = None
+) -> List[Project]:
+    """
+    Takes the paths to several top level specifications and returns a project for each.
+    Specifications shared by several projects are only parsed once.
+    :param file_paths: The paths to the top level specifications
+    :param limits: The maximum size of YAML blocks
+    :return: The projects, in the order of the paths
+    """
+    registry = SpecRegistry(limits)
+    return [read_and_parse_project(path, registry=registry) for path in file_paths]
@@ -6,3 +6,4 @@ TITLE = "Title"
 TEXT = "Text"
 PARENT = "Parent"
 CHILD = "Child"
+TAGS = "Tags"
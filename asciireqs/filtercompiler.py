@@ -0,0 +1,272 @@
+"""filtercompiler - compiles filter expressions to Python functions"""
+
+import ast
+import functools
+import re
+import sys
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Tuple,
+    Type,
+)
+
+# Prefix for names generated by the compiler (which can not clash with attribute variables):
+_GENERATED = "__asciireq_"
+
+# The syntax permitted in filter expressions:
+_ALLOWED_NODES: Tuple[Type[ast.AST], ...] = (
+    ast.Expression,
+    ast.BoolOp,
+    ast.And,
+    ast.Or,
+    ast.UnaryOp,
+    ast.Not,
+    ast.USub,
+    ast.Compare,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.In,
+    ast.NotIn,
+    ast.Is,
+    ast.IsNot,
+    ast.IfExp,
+    ast.Call,
+    ast.keyword,
+    ast.Attribute,
+    ast.Subscript,
+    ast.Slice,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.List,
+    ast.Tuple,
+    ast.Set,
+)
+if sys.version_info < (3, 9):
+    # Python 3.8 wraps the subscript of x[...] in an Index or ExtSlice node:
+    _ALLOWED_NODES += (ast.Index, ast.ExtSlice)
+
+_REGEX_FUNCTIONS = ("search", "match", "fullmatch")
+
+
+@functools.lru_cache(maxsize=512)
+def cached_regex(pattern: str, flags: int = 0) -> Pattern[str]:
+    """Compiles a regular expression, reusing the compiled pattern on later calls"""
+    return re.compile(pattern, flags)
+
+
+def search(pattern: str, string: str, flags: int = 0) -> Optional["re.Match[str]"]:
+    """re.search with a cache of compiled patterns"""
+    return cached_regex(pattern, flags).search(string)
+
+
+def match(pattern: str, string: str, flags: int = 0) -> Optional["re.Match[str]"]:
+    """re.match with a cache of compiled patterns"""
+    return cached_regex(pattern, flags).match(string)
+
+
+def fullmatch(pattern: str, string: str, flags: int = 0) -> Optional["re.Match[str]"]:
+    """re.fullmatch with a cache of compiled patterns"""
+    return cached_regex(pattern, flags).fullmatch(string)
+
+
+class RegexFunctions:  # pylint: disable=R0903
+    """The regular expression functions available as the "re" namespace in filters"""
+
+    search = staticmethod(search)
+    match = staticmethod(match)
+    fullmatch = staticmethod(fullmatch)
+
+
+@dataclass
+class CompiledFilter:
+    """
+    A filter expression compiled to a function. The function takes the values of
+    the per-requirement names used by the expression as positional arguments.
+    """
+
+    function: Callable[..., Any]
+    # The per-requirement names used by the expression, in argument order:
+    arguments: Tuple[str, ...]
+    # Arguments that take pre-split list values, and the variable they were made from:
+    list_arguments: Dict[str, str]
+
+
+class _Validator(ast.NodeVisitor):
+    """Checks that an expression only uses permitted syntax and names"""
+
+    def __init__(self, allowed_names: Collection[str]) -> None:
+        self.allowed_names = allowed_names
+
+    def generic_visit(self, node: ast.AST) -> None:
+        if not isinstance(node, _ALLOWED_NODES):
+            raise NameError(f"Use of {type(node).__name__} not allowed")
+        super().generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> None:  # pylint: disable=C0103
+        """Only names of attributes and helper functions are permitted"""
+        if node.id not in self.allowed_names:
+            raise NameError(f"Use of {node.id} not allowed")
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:  # pylint: disable=C0103
+        """Only attributes with the name of a helper function are permitted"""
+        if node.attr not in self.allowed_names or node.attr.startswith("_"):
+            raise NameError(f"Use of {node.attr} not allowed")
+        self.generic_visit(node)
+
+
+class _Optimizer(ast.NodeTransformer):
+    """
+    Rewrites an expression to do less work per requirement:
+    Regex helper calls with a constant pattern use a pattern that is compiled once,
+    and "x in elements(Attribute)" uses the pre-split value of list attributes.
+    """
+
+    def __init__(self, list_variables: Collection[str]) -> None:
+        self.list_variables = list_variables
+        self.patterns: Dict[str, Pattern[str]] = {}
+        self.list_arguments: Dict[str, str] = {}
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:  # pylint: disable=C0103
+        """Replaces calls like search("constant", Text) with a precompiled pattern"""
+        self.generic_visit(node)
+        function = regex_function(node.func)
+        if (
+            function
+            and len(node.args) == 2
+            and not node.keywords
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+        ):
+            name = f"{_GENERATED}pattern_{len(self.patterns)}"
+            self.patterns[name] = cached_regex(node.args[0].value)
+            return ast.copy_location(
+                ast.Call(
+                    func=ast.Attribute(
+                        value=ast.Name(id=name, ctx=ast.Load()),
+                        attr=function,
+                        ctx=ast.Load(),
+                    ),
+                    args=node.args[1:],
+                    keywords=[],
+                ),
+                node,
+            )
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:  # pylint: disable=C0103
+        """Replaces elements(Attribute) with the pre-split value on the right of 'in'"""
+        self.generic_visit(node)
+        node.comparators = [
+            self._list_argument(comparator)
+            if isinstance(operator, (ast.In, ast.NotIn))
+            else comparator
+            for operator, comparator in zip(node.ops, node.comparators)
+        ]
+        return node
+
+    def _list_argument(self, node: ast.expr) -> ast.expr:
+        variable = _elements_argument(node)
+        if variable is not None and variable in self.list_variables:
+            name = f"{_GENERATED}list_{variable}"
+            self.list_arguments[name] = variable
+            return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+        return node
+
+
+def _elements_argument(node: ast.expr) -> Optional[str]:
+    """Returns the name of the variable X if the expression is elements(X)"""
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "elements"
+        and len(node.args) == 1
+        and not node.keywords
+    ):
+        argument = node.args[0]
+        if isinstance(argument, ast.Name):
+            return argument.id
+    return None
+
+
+def regex_function(node: ast.expr) -> Optional[str]:
+    """Returns the name of the regex helper called by a function expression, if any"""
+    if isinstance(node, ast.Name) and node.id in _REGEX_FUNCTIONS:
+        return node.id
+    if (
+        isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "re"
+        and node.attr in _REGEX_FUNCTIONS
+    ):
+        return node.attr
+    return None
+
+
+def _used_names(tree: ast.AST) -> List[str]:
+    names: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id not in names:
+            names.append(node.id)
+    return names
+
+
+def compile_expression(
+    expression: str,
+    helpers: Mapping[str, Any],
+    row_names: Collection[str],
+    list_variables: Collection[str] = (),
+) -> CompiledFilter:
+    """
+    Validates a filter expression and compiles it to a function.
+    The expression is parsed and checked once, so it is cheap to evaluate for many requirements.
+    :param expression: The Python expression
+    :param helpers: Names with the same value for all requirements (like helper functions)
+    :param row_names: Names with a value per requirement (like attribute values)
+    :param list_variables: Row names that are the values of list attributes
+    :return: The compiled filter
+    """
+    tree = ast.parse(expression.strip(), "<filter>", "eval")
+    _Validator(set(helpers) | set(row_names)).visit(tree)
+    optimizer = _Optimizer(list_variables)
+    tree = optimizer.visit(tree)
+    arguments = tuple(
+        name
+        for name in _used_names(tree)
+        if name in row_names or name in optimizer.list_arguments
+    )
+    function_tree = ast.Expression(
+        body=ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=name) for name in arguments],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            body=tree.body,
+        )
+    )
+    ast.fix_missing_locations(function_tree)
+    code = compile(function_tree, "<filter>", "eval")
+    global_names: Dict[str, Any] = {
+        "__builtins__": {},
+        **helpers,
+        **optimizer.patterns,
+    }
+    # pylint: disable=W0123
+    function = eval(code, global_names)
+    return CompiledFilter(function, arguments, optimizer.list_arguments)
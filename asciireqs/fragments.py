@@ -0,0 +1,136 @@
+"""fragments - a cache of rendered AsciiDoc fragments (table rows and requirement terms)"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from asciireqs.docparser import Project
+from asciireqs.reqdocument import walk_documents
+
+_CACHE_KEY = "fragments"
+_LINK_CONTEXT_KEY = "link_context"
+
+# Change this when the rendering of fragments changes, so that old cache files are not used:
+_FORMAT_VERSION = 1
+
+_CACHE_FILE_NAME = "fragments.json"
+
+FragmentKey = Tuple[Hashable, ...]
+
+
+def _digest(key: FragmentKey) -> str:
+    return hashlib.sha256(
+        json.dumps(key, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+class FragmentCache:
+    """
+    This class holds rendered fragments by a key made from the content they were
+    rendered from, so that a requirement that appears in many tables (or is unchanged
+    since the last run) is only rendered once. The least recently used fragments are
+    evicted when the cache is full. If a cache folder is given, the fragments used in
+    a run are saved there, and loaded by the next run.
+    """
+
+    def __init__(self, max_entries: int = 50000, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[FragmentKey, str]" = OrderedDict()
+        # Fragments from the cache file, by the digest of their key:
+        self._stored: Dict[str, str] = self._load() if cache_dir else {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: FragmentKey) -> Optional[str]:
+        """Returns the fragment for a key, or None if it is not in the cache"""
+        text = self._entries.get(key)
+        if text is None and self._stored:
+            text = self._stored.pop(_digest(key), None)
+            if text is not None:
+                self.put(key, text)
+        if text is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return text
+
+    def put(self, key: FragmentKey, text: str) -> None:
+        """Adds a fragment to the cache, evicting the least recently used if full"""
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _cache_path(self) -> str:
+        assert self.cache_dir
+        return os.path.join(self.cache_dir, _CACHE_FILE_NAME)
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            with open(self._cache_path(), "r", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+            if data.get("version") != _FORMAT_VERSION:
+                return {}
+            fragments: Dict[str, str] = data["fragments"]
+            return fragments
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # A missing or damaged cache file just means that fragments must be rendered:
+            return {}
+
+    def save(self) -> None:
+        """Saves the fragments in the cache (if there is a cache folder)"""
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data: Dict[str, Any] = {
+            "version": _FORMAT_VERSION,
+            "fragments": {_digest(key): text for key, text in self._entries.items()},
+        }
+        # Write to a temporary file and rename, so that concurrent runs never see partial files:
+        file_handle, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_handle, "w", encoding="utf-8") as cache_file:
+                json.dump(data, cache_file, ensure_ascii=False)
+            os.replace(temp_path, self._cache_path())
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def link_context(project: Project) -> str:
+    """
+    Returns a hash of what requirement links depend on: the name and requirement
+    ID pattern of each document (computed once per project)
+    """
+    context: Optional[str] = project.cache.get(_LINK_CONTEXT_KEY)
+    if context is None:
+        context = _digest(
+            tuple(
+                (doc.name, doc.req_regex)
+                for doc in walk_documents(project.root_document)
+            )
+        )
+        project.cache[_LINK_CONTEXT_KEY] = context
+    return context
+
+
+def set_fragment_cache(project: Project, cache: FragmentCache) -> None:
+    """Makes a project use a fragment cache (which can be shared by several projects)"""
+    project.cache[_CACHE_KEY] = cache
+
+
+def get_fragment_cache(project: Project) -> FragmentCache:
+    """Returns the fragment cache of a project (an in-memory cache if none was set)"""
+    cache: Optional[FragmentCache] = project.cache.get(_CACHE_KEY)
+    if cache is None:
+        cache = FragmentCache()
+        set_fragment_cache(project, cache)
+    return cache
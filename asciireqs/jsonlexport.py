@@ -0,0 +1,81 @@
+"""jsonlexport - Export requirements as JSON Lines (one JSON object per requirement)"""
+
+import gzip
+import io
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from asciireqs.docparser import Project
+from asciireqs.fields import LINE_NO
+from asciireqs.reqdocument import ReqDocument, Requirement
+
+# The size of the write buffer:
+_BUFFER_SIZE = 1 << 20
+
+
+def requirement_object(
+    project: Project,
+    doc: ReqDocument,
+    req: Requirement,
+    attributes: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Returns the JSON object for a requirement: The document name and line number,
+    and the attributes (with list attributes like Parent, Child and Tags as lists)
+    :param project: The project
+    :param doc: The document the requirement is defined in
+    :param req: The requirement
+    :param attributes: The attributes to include (default: all)
+    :return: The JSON object
+    """
+    line = req.get(LINE_NO)
+    req_object: Dict[str, Any] = {
+        "document": doc.name,
+        "line": int(line) if line else None,
+    }
+    names = attributes if attributes is not None else req.keys()
+    for name in names:
+        if name == LINE_NO or name not in req:
+            continue
+        if name in project.schema.list_attributes:
+            req_object[name] = list(project.schema.list_value(req, name))
+        else:
+            req_object[name] = req[name]
+    return req_object
+
+
+def export_to_jsonl(
+    outputpath: str,
+    project: Project,
+    documents: Iterable[ReqDocument],
+    req_filter: Callable[[Requirement], bool],
+    attributes: Optional[List[str]] = None,
+) -> None:
+    """
+    Exports requirements as JSON Lines. Each requirement is written as soon as it has
+    been converted, through a large write buffer, so the export needs no memory in
+    addition to the project however many requirements are exported.
+    :param outputpath: The path of the output file (compressed with gzip if it ends
+                       with .gz)
+    :param project: The project
+    :param documents: The documents to export the requirements of
+    :param req_filter: Returns True for the requirements to export
+    :param attributes: The attributes to export (default: all)
+    """
+    with open(outputpath, "wb", buffering=_BUFFER_SIZE) as binary_file:
+        stream: Any = (
+            gzip.GzipFile(fileobj=binary_file, mode="wb", mtime=0)
+            if outputpath.endswith(".gz")
+            else binary_file
+        )
+        with io.TextIOWrapper(stream, encoding="utf-8", newline="\n") as text_file:
+            for doc in documents:
+                for req in doc.reqs.values():
+                    if req_filter(req):
+                        text_file.write(
+                            json.dumps(
+                                requirement_object(project, doc, req, attributes),
+                                ensure_ascii=False,
+                            )
+                        )
+                        text_file.write("\n")
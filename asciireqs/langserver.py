@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""langserver - a Language Server Protocol server for requirement IDs (over stdio)"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+)
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+from asciireqs.diagnostics import Diagnostic, collect_diagnostics
+from asciireqs.docparser import parse_doc
+from asciireqs.fields import CHILD, ID, LINE_NO, PARENT, TEXT, TITLE
+from asciireqs.reqdocument import ReqDocument, Requirement
+from asciireqs.schema import split_list_value
+
+# Where a requirement ID is mentioned: line, first column and end column (zero-based):
+Span = Tuple[int, int, int]
+
+_SPEC_EXTENSION = ".adoc"
+
+# LSP error codes:
+_METHOD_NOT_FOUND = -32601
+_INTERNAL_ERROR = -32603
+
+# LSP message type for errors:
+_ERROR_MESSAGE = 1
+
+
+@dataclass
+class IndexedDocument:
+    """A parsed specification, with the requirement IDs mentioned in it"""
+
+    path: str
+    lines: List[str]
+    doc: ReqDocument
+    # Errors found when parsing the document:
+    parse_diagnostics: List[Diagnostic]
+    mentions: Dict[str, List[Span]] = field(default_factory=dict)
+    # The mentions on each line, as (first column, end column, ID):
+    mentions_by_line: Dict[int, List[Tuple[int, int, str]]] = field(
+        default_factory=dict
+    )
+
+
+def _without_line(req: Optional[Requirement]) -> Optional[Requirement]:
+    if req is None:
+        return None
+    return {name: value for name, value in req.items() if name != LINE_NO}
+
+
+def _requirement_line(req: Requirement) -> int:
+    """Returns the zero-based line number of a requirement"""
+    return max(int(req.get(LINE_NO, "1")) - 1, 0)
+
+
+class RequirementIndex:
+    """
+    This class holds an index of the requirement definitions and mentions (in links
+    and text) in a set of specifications. When a specification changes, only that
+    specification is parsed again. Link checks are done against the index, for the
+    specifications that mention the requirements that changed.
+    """
+
+    def __init__(self) -> None:
+        self.documents: Dict[str, IndexedDocument] = {}
+        # The requirements with each ID, by path (several if the ID is not unique):
+        self.definitions: Dict[str, Dict[str, Requirement]] = {}
+        # The paths of the documents that mention each ID:
+        self.mentioned_in: Dict[str, Set[str]] = {}
+        # The number of documents using each req_regex:
+        self._regex_counts: Dict[str, int] = {}
+        self._pattern_text = ""
+        self._pattern: Optional[Pattern[str]] = None
+
+    def update(self, path: str, text: str) -> Set[str]:
+        """
+        Parses a specification (again) and updates the index
+        :param path: The path of the specification
+        :param text: The text of the specification
+        :return: The paths of the documents whose diagnostics may have changed
+        """
+        # pylint: disable=C0415
+        from yaml import YAMLError
+
+        lines = text.splitlines()
+        with collect_diagnostics() as diagnostics:
+            # The text is often incomplete while it is being edited, so no parse error
+            # may stop the server:
+            try:
+                doc = parse_doc(enumerate(lines, start=1))
+            except re.error as exception:
+                doc = ReqDocument()
+                diagnostics.append(Diagnostic(f"Error: Invalid req_regex: {exception}"))
+            except (YAMLError, AttributeError, TypeError) as exception:
+                doc = ReqDocument()
+                diagnostics.append(Diagnostic(f"Error: Failed to parse: {exception}"))
+        doc.name = path
+        old = self.documents.get(path)
+        old_reqs = old.doc.reqs if old else {}
+        self._remove(path)
+        indexed = IndexedDocument(path, lines, doc, diagnostics)
+        self.documents[path] = indexed
+        for req_id, req in doc.reqs.items():
+            self.definitions.setdefault(req_id, {})[path] = req
+        # Other documents are only affected by requirements that were added, removed or
+        # had their attributes changed (and not by requirements that just moved):
+        changed = {
+            req_id
+            for req_id in old_reqs.keys() | doc.reqs.keys()
+            if _without_line(old_reqs.get(req_id))
+            != _without_line(doc.reqs.get(req_id))
+        }
+        if doc.req_regex:
+            self._regex_counts[doc.req_regex] = (
+                self._regex_counts.get(doc.req_regex, 0) + 1
+            )
+        if self._update_pattern():
+            return set(self.documents)
+        self._find_mentions(indexed)
+        return self._affected_documents(changed) | {path}
+
+    def remove(self, path: str) -> Set[str]:
+        """
+        Removes a specification from the index
+        :param path: The path of the specification
+        :return: The paths of the documents whose diagnostics may have changed
+        """
+        changed = self._remove(path)
+        if self._update_pattern():
+            return set(self.documents)
+        return self._affected_documents(changed)
+
+    def _remove(self, path: str) -> Set[str]:
+        """Removes a document, and returns the IDs it defined"""
+        indexed = self.documents.pop(path, None)
+        if not indexed:
+            return set()
+        for req_id in indexed.doc.reqs:
+            definitions = self.definitions[req_id]
+            definitions.pop(path, None)
+            if not definitions:
+                del self.definitions[req_id]
+        for req_id in indexed.mentions:
+            self.mentioned_in[req_id].discard(path)
+        regex = indexed.doc.req_regex
+        if regex:
+            self._regex_counts[regex] -= 1
+            if not self._regex_counts[regex]:
+                del self._regex_counts[regex]
+        return set(indexed.doc.reqs)
+
+    def _affected_documents(self, req_ids: Iterable[str]) -> Set[str]:
+        paths: Set[str] = set()
+        for req_id in req_ids:
+            paths.update(self.mentioned_in.get(req_id, ()))
+            paths.update(self.definitions.get(req_id, ()))
+        return paths
+
+    def _update_pattern(self) -> bool:
+        """
+        Updates the pattern used to find requirement IDs in the text.
+        If it changes, the mentions are found again in all documents.
+        :return: True if the pattern changed
+        """
+        pattern_text = "|".join(f"(?:{regex})" for regex in sorted(self._regex_counts))
+        if pattern_text == self._pattern_text:
+            return False
+        self._pattern_text = pattern_text
+        try:
+            self._pattern = re.compile(pattern_text) if pattern_text else None
+        except re.error:
+            # One of the documents has an invalid req_regex. Use the valid ones:
+            valid = [regex for regex in self._regex_counts if _is_valid_regex(regex)]
+            self._pattern = (
+                re.compile("|".join(f"(?:{regex})" for regex in sorted(valid)))
+                if valid
+                else None
+            )
+        self.mentioned_in.clear()
+        for indexed in self.documents.values():
+            self._find_mentions(indexed)
+        return True
+
+    def _find_mentions(self, indexed: IndexedDocument) -> None:
+        indexed.mentions.clear()
+        indexed.mentions_by_line.clear()
+        if not self._pattern:
+            return
+        for line_no, line in enumerate(indexed.lines):
+            for match in self._pattern.finditer(line):
+                req_id = match.group(0)
+                if not req_id:
+                    continue
+                indexed.mentions.setdefault(req_id, []).append(
+                    (line_no, match.start(), match.end())
+                )
+                indexed.mentions_by_line.setdefault(line_no, []).append(
+                    (match.start(), match.end(), req_id)
+                )
+        for req_id in indexed.mentions:
+            self.mentioned_in.setdefault(req_id, set()).add(indexed.path)
+
+    def id_at(self, path: str, line: int, column: int) -> Optional[str]:
+        """Returns the requirement ID at a (zero-based) position, if any"""
+        indexed = self.documents.get(path)
+        if not indexed:
+            return None
+        for start, end, req_id in indexed.mentions_by_line.get(line, ()):
+            if start <= column <= end:
+                return req_id
+        return None
+
+    def definition_spans(self, req_id: str) -> List[Tuple[str, Span]]:
+        """Returns the path and position of each definition of a requirement"""
+        spans: List[Tuple[str, Span]] = []
+        for path, req in self.definitions.get(req_id, {}).items():
+            line = _requirement_line(req)
+            lines = self.documents[path].lines
+            column = max(lines[line].find(req_id), 0) if line < len(lines) else 0
+            spans.append((path, (line, column, column + len(req_id))))
+        return spans
+
+    def references(
+        self, req_id: str, include_definitions: bool = True
+    ) -> List[Tuple[str, Span]]:
+        """Returns the path and position of each mention of a requirement"""
+        definitions = set(self.definition_spans(req_id))
+        references: List[Tuple[str, Span]] = []
+        for path in sorted(self.mentioned_in.get(req_id, ())):
+            for span in self.documents[path].mentions[req_id]:
+                if include_definitions or (path, span) not in definitions:
+                    references.append((path, span))
+        return references
+
+    def hover_text(self, req_id: str) -> Optional[str]:
+        """Returns a Markdown description of a requirement, or None if it is unknown"""
+        definitions = self.definitions.get(req_id)
+        if not definitions:
+            return None
+        path, req = next(iter(definitions.items()))
+        heading = f"**{req_id}**"
+        if TITLE in req:
+            heading += f": {req[TITLE]}"
+        parts = [heading, req.get(TEXT, "").strip()]
+        attributes = [
+            f"{name}: {value}"
+            for name, value in req.items()
+            if name not in (ID, TEXT, TITLE, LINE_NO)
+        ]
+        if attributes:
+            parts.append("; ".join(attributes))
+        parts.append(f"_{os.path.basename(path)}, line {req.get(LINE_NO, '?')}_")
+        return "\n\n".join(part for part in parts if part)
+
+    def diagnostics(self, path: str) -> List[Diagnostic]:
+        """
+        Returns the errors in a document: parse errors, duplicate definitions,
+        links to unknown requirements and parents without a link back to the child
+        """
+        indexed = self.documents.get(path)
+        if not indexed:
+            return []
+        diagnostics = list(indexed.parse_diagnostics)
+        for req_id, req in indexed.doc.reqs.items():
+            line = int(req.get(LINE_NO, "0"))
+            others = [other for other in self.definitions[req_id] if other != path]
+            if others:
+                diagnostics.append(
+                    Diagnostic(
+                        f"Error: Requirement {req_id} is also defined in {others[0]}",
+                        line,
+                    )
+                )
+            for attribute in (PARENT, CHILD):
+                for link_id in split_list_value(req.get(attribute, "")):
+                    link_definitions = self.definitions.get(link_id)
+                    if not link_definitions:
+                        diagnostics.append(
+                            Diagnostic(
+                                f"Error: Unknown requirement {link_id} in {attribute}",
+                                line,
+                            )
+                        )
+                        continue
+                    parent = next(iter(link_definitions.values()))
+                    if attribute == PARENT and req_id not in split_list_value(
+                        parent.get(CHILD, "")
+                    ):
+                        diagnostics.append(
+                            Diagnostic(
+                                f"Error: Parent {link_id} has no Child link "
+                                f"to {req_id}",
+                                line,
+                            )
+                        )
+        return diagnostics
+
+
+def _is_valid_regex(regex: str) -> bool:
+    try:
+        re.compile(regex)
+        return True
+    except re.error:
+        return False
+
+
+def path_to_uri(path: str) -> str:
+    """Converts a file path to a file URI"""
+    return Path(os.path.abspath(path)).as_uri()
+
+
+def uri_to_path(uri: str) -> str:
+    """Converts a file URI to a file path"""
+    return os.path.abspath(url2pathname(unquote(urlparse(uri).path)))
+
+
+def _range(span: Span) -> Dict[str, Any]:
+    line, start, end = span
+    return {
+        "start": {"line": line, "character": start},
+        "end": {"line": line, "character": end},
+    }
+
+
+def _location(path: str, span: Span) -> Dict[str, Any]:
+    return {"uri": path_to_uri(path), "range": _range(span)}
+
+
+def find_specifications(folder: str) -> Iterable[str]:
+    """Finds the AsciiDoc files in a folder and its sub-folders (except hidden ones)"""
+    for directory, sub_directories, file_names in os.walk(folder):
+        sub_directories[:] = sorted(
+            name for name in sub_directories if not name.startswith(".")
+        )
+        for file_name in sorted(file_names):
+            if file_name.endswith(_SPEC_EXTENSION):
+                yield os.path.join(directory, file_name)
+
+
+class LanguageServer:
+    """
+    This class reads LSP messages from a stream, answers requests for go-to-definition,
+    find-references and hover for requirement IDs, and publishes diagnostics.
+    """
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO) -> None:
+        self.index = RequirementIndex()
+        self._reader = reader
+        self._writer = writer
+        self._shut_down = False
+        self._running = True
+        # The diagnostics last published for each document:
+        self._published: Dict[str, List[Diagnostic]] = {}
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "initialize": self._initialize,
+            "initialized": self._initialized,
+            "shutdown": self._shutdown,
+            "exit": self._exit,
+            "textDocument/didOpen": self._did_open,
+            "textDocument/didChange": self._did_change,
+            "textDocument/didClose": self._did_close,
+            "textDocument/definition": self._definition,
+            "textDocument/references": self._references,
+            "textDocument/hover": self._hover,
+        }
+
+    def read_message(self) -> Optional[Dict[str, Any]]:
+        """Reads a message, or returns None at the end of the input"""
+        content_length = 0
+        while True:
+            header = self._reader.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.decode("ascii").partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value.strip())
+        message: Dict[str, Any] = json.loads(self._reader.read(content_length))
+        return message
+
+    def send(self, message: Dict[str, Any]) -> None:
+        """Writes a message"""
+        body = json.dumps({"jsonrpc": "2.0", **message}).encode("utf-8")
+        self._writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii"))
+        self._writer.write(body)
+        self._writer.flush()
+
+    def run(self) -> int:
+        """
+        Handles messages until the client asks the server to exit
+        :return: The exit code (0 if the client shut the server down first)
+        """
+        while self._running:
+            message = self.read_message()
+            if message is None:
+                break
+            self.handle(message)
+        return 0 if self._shut_down else 1
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        """Handles a request or notification"""
+        method = message.get("method", "")
+        params = message.get("params") or {}
+        handler = self._handlers.get(method)
+        if "id" not in message:
+            # A notification (unknown notifications are ignored). There is no response
+            # to report a failure in, so it is logged instead of ending the session:
+            if handler:
+                try:
+                    handler(params)
+                except Exception as exception:  # pylint: disable=W0703
+                    self.send(
+                        {
+                            "method": "window/logMessage",
+                            "params": {
+                                "type": _ERROR_MESSAGE,
+                                "message": f"{method} failed: {exception}",
+                            },
+                        }
+                    )
+            return
+        if not handler:
+            self.send(
+                {
+                    "id": message["id"],
+                    "error": {
+                        "code": _METHOD_NOT_FOUND,
+                        "message": f"Unknown method {method}",
+                    },
+                }
+            )
+            return
+        try:
+            result = handler(params)
+        except Exception as exception:  # pylint: disable=W0703
+            self.send(
+                {
+                    "id": message["id"],
+                    "error": {"code": _INTERNAL_ERROR, "message": str(exception)},
+                }
+            )
+            return
+        self.send({"id": message["id"], "result": result})
+
+    def _publish(self, paths: Iterable[str]) -> None:
+        for path in sorted(paths):
+            diagnostics = self.index.diagnostics(path)
+            if self._published.get(path, []) == diagnostics:
+                continue
+            self._published[path] = diagnostics
+            self.send(
+                {
+                    "method": "textDocument/publishDiagnostics",
+                    "params": {
+                        "uri": path_to_uri(path),
+                        "diagnostics": [
+                            {
+                                "range": _range((max(diagnostic.line - 1, 0), 0, 0)),
+                                "severity": 1,
+                                "source": "asciireq",
+                                "message": diagnostic.message,
+                            }
+                            for diagnostic in diagnostics
+                        ],
+                    },
+                }
+            )
+
+    def _load(self, path: str) -> Set[str]:
+        try:
+            with open(path, "r", encoding="utf-8") as spec:
+                return self.index.update(path, spec.read())
+        except (OSError, UnicodeDecodeError):
+            return self.index.remove(path)
+
+    # Requests and notifications:
+
+    def _initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        folders = [
+            uri_to_path(folder["uri"])
+            for folder in params.get("workspaceFolders") or []
+        ]
+        if not folders and params.get("rootUri"):
+            folders = [uri_to_path(params["rootUri"])]
+        for folder in folders:
+            for path in find_specifications(folder):
+                self._load(path)
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": 1},
+                "definitionProvider": True,
+                "referencesProvider": True,
+                "hoverProvider": True,
+            },
+            "serverInfo": {"name": "asciireq"},
+        }
+
+    def _initialized(self, _: Dict[str, Any]) -> None:
+        self._publish(self.index.documents)
+
+    def _shutdown(self, _: Dict[str, Any]) -> None:
+        self._shut_down = True
+
+    def _exit(self, _: Dict[str, Any]) -> None:
+        self._running = False
+
+    def _did_open(self, params: Dict[str, Any]) -> None:
+        document = params["textDocument"]
+        path = uri_to_path(document["uri"])
+        self._publish(self.index.update(path, document["text"]))
+
+    def _did_change(self, params: Dict[str, Any]) -> None:
+        changes = params["contentChanges"]
+        if changes:
+            # Full document synchronisation, so the last change has the complete text:
+            path = uri_to_path(params["textDocument"]["uri"])
+            self._publish(self.index.update(path, changes[-1]["text"]))
+
+    def _did_close(self, params: Dict[str, Any]) -> None:
+        # The saved file is what counts when the document is no longer edited:
+        self._publish(self._load(uri_to_path(params["textDocument"]["uri"])))
+
+    def _position(self, params: Dict[str, Any]) -> Optional[str]:
+        position = params["position"]
+        return self.index.id_at(
+            uri_to_path(params["textDocument"]["uri"]),
+            position["line"],
+            position["character"],
+        )
+
+    def _definition(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        req_id = self._position(params)
+        if not req_id:
+            return []
+        return [
+            _location(path, span) for path, span in self.index.definition_spans(req_id)
+        ]
+
+    def _references(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        req_id = self._position(params)
+        if not req_id:
+            return []
+        include = bool(params.get("context", {}).get("includeDeclaration", True))
+        return [
+            _location(path, span)
+            for path, span in self.index.references(req_id, include)
+        ]
+
+    def _hover(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        req_id = self._position(params)
+        text = self.index.hover_text(req_id) if req_id else None
+        if not text:
+            return None
+        return {"contents": {"kind": "markdown", "value": text}}
+
+
+def main(
+    argv: Optional[Sequence[str]] = None, prog: Optional[str] = None
+) -> None:
+    """Runs the language server on stdin and stdout"""
+    argparse.ArgumentParser(
+        prog=prog,
+        description="Language server for requirement IDs, communicating over "
+        "stdin and stdout",
+    ).parse_args(argv)
+    server = LanguageServer(sys.stdin.buffer, sys.stdout.buffer)
+    # Anything printed by mistake must not end up in the protocol stream:
+    sys.stdout = sys.stderr
+    sys.exit(server.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""linkgraph - the graph of Parent/Child links between requirements, and traversals of it"""
+
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from asciireqs.docparser import Project
+from asciireqs.fields import CHILD, ID, PARENT
+
+_CACHE_KEY = "link_graph"
+_PROBLEMS_CACHE_KEY = "link_problems"
+
+# A link from a requirement: the requirement ID, the attribute and the linked ID:
+Link = Tuple[str, str, str]
+
+
+@dataclass
+class _Links:
+    """The Parent/Child links between the requirements (rows) of a project"""
+
+    # The children and the parents of each row (a link given in either direction):
+    children: List[List[int]]
+    parents: List[List[int]]
+    # The links given as Child attributes and as Parent attributes, as (parent, child):
+    child_links: Set[Tuple[int, int]]
+    parent_links: Set[Tuple[int, int]]
+    # Links to requirements that do not exist:
+    dangling: List[Link]
+
+
+def _find_links(project: Project, row_of: Dict[str, int]) -> _Links:
+    """Returns the Parent/Child links between the requirements of a project"""
+    # Dicts are used as ordered sets, to remove duplicate links:
+    children: List[Dict[int, None]] = [{} for _ in row_of]
+    parents: List[Dict[int, None]] = [{} for _ in row_of]
+    links = _Links([], [], set(), set(), [])
+    for row, req in enumerate(project.requirements.values()):
+        for child_id in project.schema.list_value(req, CHILD):
+            child = row_of.get(child_id)
+            if child is None:
+                links.dangling.append((req[ID], CHILD, child_id))
+                continue
+            children[row][child] = None
+            parents[child][row] = None
+            links.child_links.add((row, child))
+        for parent_id in project.schema.list_value(req, PARENT):
+            parent = row_of.get(parent_id)
+            if parent is None:
+                links.dangling.append((req[ID], PARENT, parent_id))
+                continue
+            children[parent][row] = None
+            parents[row][parent] = None
+            links.parent_links.add((parent, row))
+    links.children = [list(linked) for linked in children]
+    links.parents = [list(linked) for linked in parents]
+    return links
+
+
+@dataclass
+class _Closure:
+    """The links between components in one direction, and the rows reachable from each"""
+
+    links: List[List[int]]
+    # The rows reachable from each component (memoised on first use):
+    memo: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+
+
+class LinkGraph:
+    """
+    This class holds the Parent/Child links between the requirements of a project as a
+    directed graph from parents to children. A link counts if it is given in either
+    direction (as a Child of the parent or as a Parent of the child).
+    Links to unknown requirements are not part of the graph.
+
+    The strongly connected components (sets of requirements linked in a cycle) are
+    found when the graph is built. Transitive descendants and ancestors are computed
+    per component and memoised, so shared sub-trees are only traversed once.
+    """
+
+    def __init__(self, project: Project) -> None:
+        self.ids: List[str] = list(project.requirements)
+        self.row_of: Dict[str, int] = {req_id: row for row, req_id in enumerate(self.ids)}
+        self.links = _find_links(project, self.row_of)
+        self.components: List[List[int]] = _strongly_connected_components(
+            self.links.children
+        )
+        self.component_of: List[int] = [0] * len(self.ids)
+        for component, rows in enumerate(self.components):
+            for row in rows:
+                self.component_of[row] = component
+        self._descendants = _Closure(self._condensed(self.links.children))
+        self._ancestors = _Closure(self._condensed(self.links.parents))
+
+    def _condensed(self, links: List[List[int]]) -> List[List[int]]:
+        """Returns the links between components (the graph with each component as a node)"""
+        condensed: List[Dict[int, None]] = [{} for _ in self.components]
+        for row, linked_rows in enumerate(links):
+            component = self.component_of[row]
+            for linked_row in linked_rows:
+                linked_component = self.component_of[linked_row]
+                if linked_component != component:
+                    condensed[component][linked_component] = None
+        return [list(linked) for linked in condensed]
+
+    def in_cycle(self, req_id: str) -> bool:
+        """Returns True if a requirement is (directly or indirectly) its own descendant"""
+        row = self.row_of[req_id]
+        return (
+            len(self.components[self.component_of[row]]) > 1
+            or row in self.links.children[row]
+        )
+
+    def _reachable(self, component: int, closure: _Closure) -> FrozenSet[int]:
+        """Returns the rows reachable from a component (memoised, without recursion)"""
+        links, memo = closure.links, closure.memo
+        stack = [component]
+        while stack:
+            current = stack[-1]
+            if current in memo:
+                stack.pop()
+                continue
+            pending = [linked for linked in links[current] if linked not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            reachable: Set[int] = set()
+            for linked in links[current]:
+                reachable.update(self.components[linked])
+                reachable.update(memo[linked])
+            memo[current] = frozenset(reachable)
+            stack.pop()
+        return memo[component]
+
+    def _related(self, req_id: str, closure: _Closure) -> List[str]:
+        row = self.row_of.get(req_id)
+        if row is None:
+            return []
+        component = self.component_of[row]
+        rows = set(self._reachable(component, closure))
+        if self.in_cycle(req_id):
+            rows.update(self.components[component])
+        return [self.ids[related] for related in sorted(rows)]
+
+    def descendants(self, req_id: str) -> List[str]:
+        """Returns the children of a requirement, their children and so on (in project order)"""
+        return self._related(req_id, self._descendants)
+
+    def ancestors(self, req_id: str) -> List[str]:
+        """Returns the parents of a requirement, their parents and so on (in project order)"""
+        return self._related(req_id, self._ancestors)
+
+
+@dataclass
+class LinkProblems:
+    """The problems found by checking all the Parent/Child links of a project"""
+
+    # Requirements linked in a cycle (each is its own ancestor), in project order:
+    cycles: List[List[str]] = field(default_factory=list)
+    # Requirements outside the top level document that have no parent:
+    orphans: List[str] = field(default_factory=list)
+    # Links to requirements that do not exist:
+    dangling: List[Link] = field(default_factory=list)
+    # Links that are only given in one direction (the linked requirement has no link back):
+    asymmetric: List[Link] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return (
+            len(self.cycles)
+            + len(self.orphans)
+            + len(self.dangling)
+            + len(self.asymmetric)
+        )
+
+    def lines(self) -> List[str]:
+        """Returns a line of text describing each problem"""
+        lines = [f"Cycle: {', '.join(cycle)}" for cycle in self.cycles]
+        lines += [f"Orphan: {req_id} has no parent" for req_id in self.orphans]
+        lines += [
+            f"Dangling link: {req_id} {attribute} {linked_id} does not exist"
+            for req_id, attribute, linked_id in self.dangling
+        ]
+        lines += [
+            f"Asymmetric link: {req_id} {attribute} {linked_id} "
+            f"has no {CHILD if attribute == PARENT else PARENT} link back"
+            for req_id, attribute, linked_id in self.asymmetric
+        ]
+        return lines
+
+
+def check_links(project: Project) -> LinkProblems:
+    """
+    Checks all the Parent/Child links of a project for cycles, orphans, dangling links
+    and asymmetric links. This takes time proportional to the number of requirements
+    and links (using the link graph of the project).
+    :param project: The project data model
+    :return: The problems found
+    """
+    graph = get_link_graph(project)
+    links = graph.links
+    problems = LinkProblems(dangling=list(links.dangling))
+    problems.cycles = [
+        [graph.ids[row] for row in component]
+        for component in graph.components
+        if len(component) > 1 or component[0] in links.children[component[0]]
+    ]
+    problems.cycles.sort(key=lambda cycle: graph.row_of[cycle[0]])
+    top_level = project.root_document.reqs
+    problems.orphans = [
+        req_id
+        for row, req_id in enumerate(graph.ids)
+        if not links.parents[row] and req_id not in top_level
+    ]
+    # Links given only as Child (the child has no Parent link back), and vice versa:
+    asymmetric = [
+        (graph.ids[parent], CHILD, graph.ids[child])
+        for parent, child in links.child_links - links.parent_links
+    ] + [
+        (graph.ids[child], PARENT, graph.ids[parent])
+        for parent, child in links.parent_links - links.child_links
+    ]
+    problems.asymmetric = sorted(
+        asymmetric, key=lambda link: (graph.row_of[link[0]], graph.row_of[link[2]])
+    )
+    return problems
+
+
+def get_link_problems(project: Project) -> LinkProblems:
+    """Returns the link problems of a project (checked on first use, then shared for the run)"""
+    problems: Optional[LinkProblems] = project.cache.get(_PROBLEMS_CACHE_KEY)
+    if problems is None:
+        problems = check_links(project)
+        project.cache[_PROBLEMS_CACHE_KEY] = problems
+    return problems
+
+
+def _strongly_connected_components(links: List[List[int]]) -> List[List[int]]:
+    """
+    Finds the strongly connected components of a graph with Tarjan's algorithm
+    (without recursion, so deep graphs do not exceed the recursion limit).
+    Components are returned in reverse topological order (a component comes after
+    all the components it links to).
+    :param links: The rows each row links to
+    :return: The rows in each component
+    """
+    index_of: List[Optional[int]] = [None] * len(links)
+    low_link: List[int] = [0] * len(links)
+    on_stack: List[bool] = [False] * len(links)
+    stack: List[int] = []
+    components: List[List[int]] = []
+    next_index = 0
+    for start in range(len(links)):
+        if index_of[start] is not None:
+            continue
+        # Each entry is a row and the position of the next link to follow from it:
+        work = [(start, 0)]
+        while work:
+            row, position = work.pop()
+            if position == 0:
+                index_of[row] = low_link[row] = next_index
+                next_index += 1
+                stack.append(row)
+                on_stack[row] = True
+            elif position <= len(links[row]):
+                # Returned from the previous link:
+                linked = links[row][position - 1]
+                low_link[row] = min(low_link[row], low_link[linked])
+            for next_position in range(position, len(links[row])):
+                linked = links[row][next_position]
+                linked_index = index_of[linked]
+                if linked_index is None:
+                    work.append((row, next_position + 1))
+                    work.append((linked, 0))
+                    break
+                if on_stack[linked]:
+                    low_link[row] = min(low_link[row], linked_index)
+            else:
+                if low_link[row] == index_of[row]:
+                    components.append(_pop_component(stack, on_stack, row))
+    return components
+
+
+def _pop_component(stack: List[int], on_stack: List[bool], root: int) -> List[int]:
+    """
+    Pops a strongly connected component (the rows down to its root) off the stack
+    :return: The rows in the component, in project order
+    """
+    component: List[int] = []
+    while True:
+        member = stack.pop()
+        on_stack[member] = False
+        component.append(member)
+        if member == root:
+            return sorted(component)
+
+
+def get_link_graph(project: Project) -> LinkGraph:
+    """Returns the link graph of a project (built on first use, then shared for the run)"""
+    graph: Optional[LinkGraph] = project.cache.get(_CACHE_KEY)
+    if graph is None:
+        graph = LinkGraph(project)
+        project.cache[_CACHE_KEY] = graph
+    return graph
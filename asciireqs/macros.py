@@ -0,0 +1,117 @@
+"""macros - detection and parsing of the report generating macros"""
+
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple, Union
+
+
+@dataclass
+class HierarchyMacro:
+    """`asciireq-hierarchy`: The document hierarchy"""
+
+
+@dataclass
+class TableMacro:
+    """`asciireq-table: columns; filter`: A table of requirements"""
+
+    field_names: List[str] = field(default_factory=list)
+    filter_expression: str = ""
+
+
+@dataclass
+class CountMacro:
+    """`asciireq-count: filter`: The number of requirements"""
+
+    filter_expression: str = ""
+
+
+@dataclass
+class CoverageMacro:
+    """`asciireq-coverage`: The child coverage of each document"""
+
+
+@dataclass
+class BreakdownMacro:
+    """`asciireq-breakdown: attribute`: The number of requirements per attribute value"""
+
+    attribute: str = ""
+
+
+@dataclass
+class TraceMacro:
+    """`asciireq-trace: filter`: All ancestors and descendants of each requirement"""
+
+    filter_expression: str = ""
+
+
+@dataclass
+class LinkCheckMacro:
+    """`asciireq-link-check: problem`: Link problems (cycles, orphans, dangling, asymmetric)"""
+
+    problem: str = ""
+
+
+Macro = Union[
+    HierarchyMacro,
+    TableMacro,
+    CountMacro,
+    CoverageMacro,
+    BreakdownMacro,
+    TraceMacro,
+    LinkCheckMacro,
+]
+
+
+def macro_parameters(stripped_line: str, macro: str) -> Optional[str]:
+    """
+    Checks if a stripped line is a macro with optional parameters, like `macro` or
+    `macro: parameters`, and returns the parameters (an empty string if there are none).
+    Returns None if the line is not the macro.
+    """
+    if not stripped_line.startswith("`" + macro) or not stripped_line.endswith("`"):
+        return None
+    rest = stripped_line[len(macro) + 1 : -1]
+    if not rest:
+        return ""
+    if rest.startswith(":"):
+        return rest[1:].strip()
+    return None
+
+
+def _table_macro(parameters: str) -> TableMacro:
+    field_name_list, _, filter_expression = parameters.partition(";")
+    return TableMacro(
+        [name.strip() for name in field_name_list.strip().split(",")],
+        filter_expression.strip(),
+    )
+
+
+# Each macro: its name, the function that makes it from its parameters, and whether
+# it takes no parameters (None), optional parameters (False) or required ones (True):
+_MACRO_SYNTAX: List[Tuple[str, Callable[[str], Macro], Optional[bool]]] = [
+    ("asciireq-hierarchy", lambda _: HierarchyMacro(), None),
+    ("asciireq-coverage", lambda _: CoverageMacro(), None),
+    ("asciireq-count", CountMacro, False),
+    ("asciireq-trace", TraceMacro, False),
+    ("asciireq-link-check", LinkCheckMacro, False),
+    ("asciireq-breakdown", BreakdownMacro, True),
+    ("asciireq-table", _table_macro, True),
+]
+
+
+def parse_macro(line: str) -> Optional[Macro]:
+    """
+    Takes a line of AsciiDoc text and returns the macro on it, if any
+    :param line: The line
+    :return: The macro, or None if the line is not a macro
+    """
+    stripped_line = line.strip()
+    if not stripped_line.startswith("`asciireq-"):
+        return None
+    for name, make_macro, required in _MACRO_SYNTAX:
+        if required is None:
+            parameters: Optional[str] = "" if stripped_line == f"`{name}`" else None
+        else:
+            parameters = macro_parameters(stripped_line, name)
+        if parameters is not None and (parameters or not required):
+            return make_macro(parameters)
+    return None
@@ -0,0 +1,63 @@
+"""output - writing of output files, skipping files whose content has not changed"""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+@dataclass
+class WriteStatistics:
+    """The number of output files written, and skipped because they had not changed"""
+
+    written: int = 0
+    skipped: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.written} files written, {self.skipped} unchanged"
+
+
+def _file_digest(path: str) -> Optional[str]:
+    """Returns the hash of the text in a file, or None if it can not be read"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                digest.update(line.encode("utf-8"))
+    except (OSError, UnicodeDecodeError):
+        return None
+    return digest.hexdigest()
+
+
+def write_if_changed(
+    path: str, chunks: Iterable[str], statistics: Optional[WriteStatistics] = None
+) -> bool:
+    """
+    Writes text to a file, unless the file already has exactly that content.
+    Unchanged files keep their modification time, so tools that depend on them
+    do not rebuild anything. The file is replaced atomically, so readers never see
+    a partially written file.
+    :param path: The path of the output file
+    :param chunks: The text to write
+    :param statistics: Updated with the number of files written and skipped
+    :return: True if the file was written
+    """
+    text = "".join(chunks)
+    if _file_digest(path) == hashlib.sha256(text.encode("utf-8")).hexdigest():
+        if statistics is not None:
+            statistics.skipped += 1
+        return False
+    # The temporary file is opened normally (and not with tempfile) to get normal permissions:
+    temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_path, "x", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if statistics is not None:
+        statistics.written += 1
+    return True
@@ -1,12 +1,44 @@
 """reporting - functions to output tables etc. to asciidoc reports"""
 
+import ast
+import functools
 import os
 import re
-from typing import Dict, Iterable, List, Optional, Tuple, Any
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from asciireqs.fields import ID, LINE_NO, TEXT, CHILD, PARENT, TITLE
+from asciireqs.columnar import get_column_store
+from asciireqs.diagnostics import report
 from asciireqs.docparser import Project, req_from_yaml_block
-from asciireqs.reqdocument import ReqDocument, Requirement, Requirements
+from asciireqs.filtercompiler import (
+    RegexFunctions,
+    compile_expression,
+    fullmatch,
+    match,
+    search,
+)
+from asciireqs.fragments import get_fragment_cache, link_context
+from asciireqs.linkgraph import get_link_graph, get_link_problems
+from asciireqs.macros import (
+    BreakdownMacro,
+    CountMacro,
+    CoverageMacro,
+    HierarchyMacro,
+    LinkCheckMacro,
+    Macro,
+    TableMacro,
+    TraceMacro,
+    parse_macro,
+)
+from asciireqs.output import WriteStatistics, write_if_changed
+from asciireqs.reqdocument import (
+    ReqDocument,
+    Requirement,
+    Requirements,
+    walk_documents,
+)
+from asciireqs.statistics import get_statistics
+from asciireqs.textindex import contains_words
 
 
 def get_spec_hierarchy(doc: ReqDocument, preamble: str) -> Iterable[str]:
@@ -42,7 +74,7 @@ def invalid_link_in_attribute(
     return any(
         (
             req_id not in project.requirements
-            for req_id in split_req_list(requirement[attribute])
+            for req_id in project.schema.list_value(requirement, attribute)
         )
     )
 
@@ -71,11 +103,11 @@ def missing_link_from_parent(requirement: Requirement, project: Project) -> bool
     """
     if PARENT not in requirement.keys():
         return False
-    for parent_id in split_req_list(requirement[PARENT]):
+    for parent_id in project.schema.list_value(requirement, PARENT):
         parent_req = project.requirements[parent_id]
         if CHILD not in parent_req:
             return True
-        parent_children_id = split_req_list(parent_req[CHILD])
+        parent_children_id = project.schema.list_value(parent_req, CHILD)
         if not requirement[ID] in parent_children_id:
             return True
     return False
@@ -94,14 +126,93 @@ def _to_variable(attribute_name: str) -> Optional[str]:
     )
 
 
+# The names (other than attribute values) that filter expressions can use,
+# with the same value for all requirements:
+_FILTER_HELPERS: Dict[str, Any] = {
+    "elements": elements,
+    "startswith": str.startswith,
+    "re": RegexFunctions,
+    "fullmatch": fullmatch,
+    "search": search,
+    "match": match,
+}
+
+# Names that filter expressions can use, with a value for each requirement:
+_FILTER_ROW_NAMES = ("req", "has_invalid_link", "link_error", "contains_words")
+
+
 def add_req_fields(req: Requirement, names: Dict[str, Any], project: Project) -> None:
     """Adds requirement attributes as variables available for use in an expression."""
-    for name in project.root_document.get_attribute_names_recursive():
+    for name in project.schema.attribute_names:
         as_variable = _to_variable(name)
         if as_variable and as_variable not in names:
             names[as_variable] = req[name] if name in req else ""
 
 
+def filter_variables(project: Project) -> Dict[str, str]:
+    """Returns the attribute names that are available as variables in filters, by variable name"""
+    variables: Dict[str, str] = {}
+    for name in project.schema.attribute_names:
+        as_variable = _to_variable(name)
+        if (
+            as_variable
+            and as_variable not in _FILTER_HELPERS
+            and as_variable not in _FILTER_ROW_NAMES
+            and as_variable not in variables
+        ):
+            variables[as_variable] = name
+    return variables
+
+
+def compile_filter(
+    filter_expression: str, project: Project
+) -> Callable[[Requirement], bool]:
+    """
+    Compiles a (very limited) Python expression to a function that evaluates it for a
+    requirement. The expression is validated and compiled only once, so the
+    function can be applied to many requirements.
+    :param filter_expression: The Python expression to evaluate (empty to accept all)
+    :param project: The project data model
+    :return: A function that takes a requirement and returns the result of the expression
+    """
+    if not filter_expression.strip():
+        return lambda req: True
+    variables = filter_variables(project)
+    compiled = compile_expression(
+        filter_expression,
+        _FILTER_HELPERS,
+        set(_FILTER_ROW_NAMES) | set(variables),
+        [
+            variable
+            for variable, name in variables.items()
+            if name in project.schema.list_attributes
+        ],
+    )
+
+    def argument_getter(argument: str) -> Callable[[Requirement], Any]:
+        if argument == "req":
+            return lambda req: req
+        if argument == "link_error":
+            return lambda req: lambda: missing_link_from_parent(req, project)
+        if argument == "has_invalid_link":
+            return lambda req: lambda: one_or_more_req_links_is_invalid(req, project)
+        if argument == "contains_words":
+            return lambda req: lambda *query: contains_words(project, req[ID], query)
+        if argument in compiled.list_arguments:
+            list_name = variables[compiled.list_arguments[argument]]
+            return lambda req: project.schema.list_value(req, list_name)
+        name = variables[argument]
+        return lambda req: req.get(name, "")
+
+    getters = [argument_getter(argument) for argument in compiled.arguments]
+    function = compiled.function
+
+    def evaluate(req: Requirement) -> bool:
+        return bool(function(*[getter(req) for getter in getters]))
+
+    return evaluate
+
+
 def evaluate_requirement_against_filter(
     req: Requirement, project: Project, filter_expression: str
 ) -> bool:
@@ -112,31 +223,65 @@ def evaluate_requirement_against_filter(
     :param filter_expression: The Python expression to evaluate
     :return: The result of the expression
     """
+    return compile_filter(filter_expression, project)(req)
+
+
+_FILTER_RESULTS_KEY = "filter_results"
+
+
+@functools.lru_cache(maxsize=1024)
+def normalised_filter(filter_expression: str) -> str:
+    """
+    Returns a filter expression in a form that does not depend on spacing or redundant
+    parentheses (the expression itself if it is not valid Python)
+    """
+    try:
+        return ast.dump(ast.parse(filter_expression.strip(), mode="eval"))
+    except SyntaxError:
+        return filter_expression
 
-    def link_error() -> bool:
-        return missing_link_from_parent(req, project)
-
-    def has_invalid_link() -> bool:
-        return one_or_more_req_links_is_invalid(req, project)
-
-    allowed_names = {
-        "req": req,
-        "elements": elements,
-        "has_invalid_link": has_invalid_link,
-        "link_error": link_error,
-        "startswith": str.startswith,
-        "re": re,
-        "fullmatch": re.fullmatch,
-        "search": re.search,
-        "match": re.match,
-    }
-    add_req_fields(req, allowed_names, project)
-    code = compile(filter_expression, "<string>", "eval")
-    for name in code.co_names:
-        if name not in allowed_names:
-            raise NameError(f"Use of {name} not allowed")
-    # pylint: disable=W0123
-    return bool(eval(filter_expression, {"__builtins__": {}}, allowed_names))
+
+def select_requirements(
+    project: Project, requirements: Requirements, filter_expression: str
+) -> List[Requirement]:
+    """
+    Returns the requirements that match a filter expression. If the project has a column
+    store, simple filters are evaluated column-wise for all requirements at once.
+    The result is reused if the same filter is used on the same requirements again
+    (in another table or template, for instance).
+    :param project: The project data model
+    :param requirements: The requirements to select from
+    :param filter_expression: The Python expression to evaluate
+    :return: The matching requirements, in the order of 'requirements'
+    """
+    results: Dict[Tuple[int, str], Tuple[Requirements, List[Requirement]]] = (
+        project.cache.setdefault(_FILTER_RESULTS_KEY, {})
+    )
+    key = (id(requirements), normalised_filter(filter_expression))
+    entry = results.get(key)
+    if entry is None:
+        # The requirements are kept with the result, so that they can not be discarded
+        # and their ID reused by other requirements while the result is cached:
+        entry = (requirements, _select(project, requirements, filter_expression))
+        results[key] = entry
+    return list(entry[1])
+
+
+def _select(
+    project: Project, requirements: Requirements, filter_expression: str
+) -> List[Requirement]:
+    store = get_column_store(project)
+    if store:
+        rows = store.select(
+            requirements,
+            filter_expression,
+            filter_variables(project),
+            lambda: compile_filter(filter_expression, project),
+        )
+        if rows is not None:
+            return [store.requirements[row] for row in rows]
+    req_filter = compile_filter(filter_expression, project)
+    return [req for req in requirements.values() if req_filter(req)]
 
 
 def table_line(req: Requirement, attribute_names: List[str]) -> Optional[str]:
@@ -157,6 +302,25 @@ def table_line(req: Requirement, attribute_names: List[str]) -> Optional[str]:
     return line
 
 
+def rendered_table_line(
+    project: Project, req: Requirement, attribute_names: List[str]
+) -> str:
+    """
+    Returns the table row for a requirement with requirement links inserted.
+    Rows are cached by their content and the link context (see fragments).
+    """
+    values = tuple(req.get(name) for name in attribute_names)
+    key = ("row", tuple(attribute_names), values, link_context(project))
+    cache = get_fragment_cache(project)
+    line = cache.get(key)
+    if line is None:
+        line = insert_requirement_links(
+            table_line(req, attribute_names) or "", project.root_document
+        )
+        cache.put(key, line)
+    return line
+
+
 def get_table(
     project: Project,
     requirements: Requirements,
@@ -176,19 +340,202 @@ def get_table(
         table.append(f"|{field} ")
     table.append("\n\n")
     try:
-        for req in requirements.values():
-            if evaluate_requirement_against_filter(req, project, filter_expression):
-                line = table_line(req, attribute_names)
-                if line:
-                    table.append(insert_requirement_links(line, project.root_document))
+        for req in select_requirements(project, requirements, filter_expression):
+            line = rendered_table_line(project, req, attribute_names)
+            if line:
+                table.append(line)
         table.append("|===\n")
         return table
     except NameError as exception:
-        print(f"Name error in expression evaluation: {exception}")
+        report(f"Name error in expression evaluation: {exception}")
+        return []
+    except KeyError as exception:
+        report(f"Property lookup error in expression evaluation: {exception}")
+        return []
+
+
+def get_count(
+    project: Project, requirements: Requirements, filter_expression: str
+) -> List[str]:
+    """
+    Counts the requirements that match a filter. The selection is memoised (see
+    select_requirements), so repeating a count in several places evaluates the filter
+    only once.
+    :param project: The project data model
+    :param requirements: The requirements to count
+    :param filter_expression: The Python expression to evaluate (empty to count all)
+    :return: AsciiDoc text for the count
+    """
+    if not filter_expression:
+        return [f"{len(requirements)}\n"]
+    try:
+        count = len(select_requirements(project, requirements, filter_expression))
+    except NameError as exception:
+        report(f"Name error in expression evaluation: {exception}")
+        return []
+    except KeyError as exception:
+        report(f"Property lookup error in expression evaluation: {exception}")
+        return []
+    return [f"{count}\n"]
+
+
+def get_coverage_table(project: Project) -> List[str]:
+    """
+    Generates an AsciiDoc table with the number of requirements in each document,
+    and the number and percentage of them that have child requirements
+    :param project: The project data model
+    :return: AsciiDoc text for the table
+    """
+    table: List[str] = ["|===\n", "|Document |Requirements |With children |Coverage \n\n"]
+    for doc_statistics in get_statistics(project).documents:
+        table.append(
+            f"|{doc_statistics.name}\n"
+            f"|{doc_statistics.requirements}\n"
+            f"|{doc_statistics.with_children}\n"
+            f"|{doc_statistics.coverage:.1f}%\n\n"
+        )
+    table.append("|===\n")
+    return table
+
+
+def get_breakdown_table(
+    project: Project, doc: Optional[ReqDocument], attribute: str
+) -> List[str]:
+    """
+    Generates an AsciiDoc table with the number of requirements for each value of an attribute
+    :param project: The project data model
+    :param doc: The current document. None if the document is a template (counts all documents)
+    :param attribute: The attribute to break down by
+    :return: AsciiDoc text for the table
+    """
+    statistics = get_statistics(project)
+    value_counts = (
+        statistics.document(doc.name).value_counts if doc else statistics.value_counts
+    )
+    table: List[str] = ["|===\n", f"|{attribute} |Requirements \n\n"]
+    for value, count in sorted(value_counts.get(attribute, {}).items()):
+        table.append(f"|{value}\n|{count}\n\n")
+    table.append("|===\n")
+    return table
+
+
+def get_trace_table(
+    project: Project, requirements: Requirements, filter_expression: str
+) -> List[str]:
+    """
+    Generates an AsciiDoc traceability table with all the ancestors and descendants
+    (through Parent and Child links, at any depth) of each requirement matching a filter
+    :param project: The project data model
+    :param requirements: The requirements to put in the table
+    :param filter_expression: The Python expression to evaluate (empty for all)
+    :return: AsciiDoc text for the table
+    """
+    graph = get_link_graph(project)
+    table: List[str] = ["|===\n", "|ID |Ancestors |Descendants \n\n"]
+    try:
+        for req in select_requirements(project, requirements, filter_expression):
+            row = (
+                f"|{req[ID]}\n"
+                f"|{', '.join(graph.ancestors(req[ID]))}\n"
+                f"|{', '.join(graph.descendants(req[ID]))}\n\n"
+            )
+            table.append(insert_requirement_links(row, project.root_document))
+    except NameError as exception:
+        report(f"Name error in expression evaluation: {exception}")
         return []
     except KeyError as exception:
-        print(f"Property lookup error in expression evaluation: {exception}")
+        report(f"Property lookup error in expression evaluation: {exception}")
         return []
+    table.append("|===\n")
+    return table
+
+
+LINK_PROBLEMS = ("cycles", "orphans", "dangling", "asymmetric")
+
+
+def get_link_check_table(project: Project, problem: str) -> List[str]:
+    """
+    Generates an AsciiDoc table with the link problems of the project: Cycles, orphans
+    (requirements outside the top level document without a parent), dangling links and
+    asymmetric links (links without a link back)
+    :param project: The project data model
+    :param problem: The kind of problem to list (one of LINK_PROBLEMS), empty for all
+    :return: AsciiDoc text for the table
+    """
+    if problem and problem not in LINK_PROBLEMS:
+        report(
+            f"Error: Unknown link problem {problem}, expected one of {LINK_PROBLEMS}"
+        )
+        return []
+    problems = get_link_problems(project)
+    rows: List[Tuple[str, str, str]] = []
+    if problem in ("", "cycles"):
+        rows += [("Cycle", cycle[0], ", ".join(cycle)) for cycle in problems.cycles]
+    if problem in ("", "orphans"):
+        rows += [("Orphan", req_id, "No parent") for req_id in problems.orphans]
+    if problem in ("", "dangling"):
+        rows += [
+            ("Dangling link", req_id, f"{attribute} {linked_id} does not exist")
+            for req_id, attribute, linked_id in problems.dangling
+        ]
+    if problem in ("", "asymmetric"):
+        rows += [
+            ("Asymmetric link", req_id, f"{attribute} {linked_id} has no link back")
+            for req_id, attribute, linked_id in problems.asymmetric
+        ]
+    table: List[str] = ["|===\n", "|Problem |ID |Details \n\n"]
+    for kind, req_id, details in rows:
+        table.append(
+            insert_requirement_links(
+                f"|{kind}\n|{req_id}\n|{details}\n\n", project.root_document
+            )
+        )
+    table.append("|===\n")
+    return table
+
+
+# Generates the text of a macro from the macro, the project, the requirements of the
+# current document and the document:
+_Expander = Callable[[Any, Project, Requirements, Optional[ReqDocument]], Iterable[str]]
+
+_MACRO_EXPANDERS: Dict[type, _Expander] = {
+    HierarchyMacro: lambda macro, project, reqs, doc: get_spec_hierarchy(
+        project.root_document, ""
+    ),
+    CountMacro: lambda macro, project, reqs, doc: get_count(
+        project, reqs, macro.filter_expression
+    ),
+    CoverageMacro: lambda macro, project, reqs, doc: get_coverage_table(project),
+    BreakdownMacro: lambda macro, project, reqs, doc: get_breakdown_table(
+        project, doc, macro.attribute
+    ),
+    TraceMacro: lambda macro, project, reqs, doc: get_trace_table(
+        project, reqs, macro.filter_expression
+    ),
+    LinkCheckMacro: lambda macro, project, reqs, doc: get_link_check_table(
+        project, macro.problem
+    ),
+    TableMacro: lambda macro, project, reqs, doc: get_table(
+        project, reqs, macro.field_names, macro.filter_expression
+    ),
+}
+
+
+def expand_macro(
+    macro: Macro,
+    project: Project,
+    requirements: Requirements,
+    doc: Optional[ReqDocument],
+) -> Iterable[str]:
+    """
+    Generates the AsciiDoc text for a report generating macro
+    :param macro: The macro
+    :param project: The project data model
+    :param requirements: The requirements of the current document
+    :param doc: The current document. None if the document is a template (not a specification)
+    :return: The generated AsciiDoc text
+    """
+    return _MACRO_EXPANDERS[type(macro)](macro, project, requirements, doc)
 
 
 def line_numbers_for_requirements(requirements: Requirements) -> Dict[int, str]:
@@ -201,10 +548,11 @@ def line_numbers_for_requirements(requirements: Requirements) -> Dict[int, str]:
 
 def insert_requirement_links(line: str, doc: ReqDocument) -> str:
     """Takes a line of AsciiDoc text and adds cross-links to requirement IDs"""
-    if doc.req_regex:
-        line = re.sub(f"({doc.req_regex})", f"xref:{doc.name}#\\1[\\1]", line)
-    for child_doc in doc.child_docs:
-        line = insert_requirement_links(line, child_doc)
+    for link_doc in walk_documents(doc):
+        if link_doc.req_regex:
+            line = re.sub(
+                f"({link_doc.req_regex})", f"xref:{link_doc.name}#\\1[\\1]", line
+            )
     return line
 
 
@@ -242,6 +590,21 @@ def requirement_as_term(req: Requirement, doc: ReqDocument) -> Iterable[str]:
     ) + "\n"
 
 
+def rendered_requirement_term(project: Project, req: Requirement) -> str:
+    """
+    Returns a requirement as AsciiDoc using the 'term' style (see requirement_as_term).
+    Terms are cached by their content and the link context (see fragments).
+    """
+    items = tuple(item for item in req.items() if item[0] != LINE_NO)
+    key = ("term", items, link_context(project))
+    cache = get_fragment_cache(project)
+    text = cache.get(key)
+    if text is None:
+        text = "".join(requirement_as_term(req, project.root_document))
+        cache.put(key, text)
+    return text
+
+
 def generate_report_line(
     input_lines: Iterable[Tuple[int, str]],
     project: Project,
@@ -262,25 +625,17 @@ def generate_report_line(
     """
     for line_no, input_line in input_lines:
         stripped_line: str = input_line.strip()
-        if stripped_line == "`asciireq-hierarchy`":
-            yield from get_spec_hierarchy(project.root_document, "")
-        elif stripped_line.startswith("`asciireq-table:") and stripped_line.endswith(
-            "`"
-        ):
-            field_name_list, filter_expression = [
-                param.strip() for param in stripped_line[16:-1].strip().split(";")
-            ]
-            field_names = [name.strip() for name in field_name_list.strip().split(",")]
-            yield from get_table(
-                project, requirements, field_names, filter_expression
-            )
+        macro = parse_macro(stripped_line)
+        if macro:
+            yield from expand_macro(macro, project, requirements, doc)
         elif stripped_line.startswith("[.reqy]") and doc:
             # Consume the listing block of YAML:
-            for yaml_req in req_from_yaml_block(input_lines, doc):
+            for yaml_req in req_from_yaml_block(
+                input_lines, doc, project.block_limits
+            ):
                 if ID in yaml_req and yaml_req[ID] in doc.reqs:
                     # Replace with formatting using "Term":
-                    doc_req = doc.reqs[yaml_req[ID]]
-                    yield from requirement_as_term(doc_req, project.root_document)
+                    yield rendered_requirement_term(project, doc.reqs[yaml_req[ID]])
         else:
             if line_no in req_lines:
                 # This line contains a requirement definition which we want to make into an anchor:
@@ -291,30 +646,57 @@ def generate_report_line(
                 yield insert_requirement_links(input_line, project.root_document)
 
 
-def post_process_hierarchically(
-    project: Project, document: ReqDocument, output_dir: str
+def post_process_document(
+    project: Project,
+    document: ReqDocument,
+    output_dir: str,
+    statistics: Optional[WriteStatistics] = None,
 ) -> None:
     """
-    Performs post-processing of all the project requirement files, by post processing
-    the specified document, then all its children hierarchically.
+    Performs post-processing of a single requirement file.
     The parsing will insert cross-links and expand report generating macros,
-    like document hierarchy and tables to generate
+    like document hierarchy and tables to generate.
+    The output is rendered in memory, and the output file is only written if it changed.
     :param project: The project data model
     :param document: The document to process
-    :param output_dir: The folder to write output files to
+    :param output_dir: The folder to write the output file to
+    :param statistics: Updated with the number of files written and skipped
     """
     requirement_lines = line_numbers_for_requirements(document.reqs)
     _, output_file_name = os.path.split(document.name)
     output_path = os.path.join(output_dir, output_file_name)
     with open(document.name, "r", encoding="utf-8") as input_file:
-        with open(output_path, "w", encoding="utf-8") as output_file:
-            for line in generate_report_line(
+        write_if_changed(
+            output_path,
+            generate_report_line(
                 enumerate(input_file, start=1),
                 project,
                 document.reqs,
                 document,
                 requirement_lines,
-            ):
-                output_file.write(line)
-    for sub_doc in document.child_docs:
-        post_process_hierarchically(project, sub_doc, output_dir)
+            ),
+            statistics,
+        )
+
+
+def post_process_hierarchically(
+    project: Project,
+    document: ReqDocument,
+    output_dir: str,
+    statistics: Optional[WriteStatistics] = None,
+) -> WriteStatistics:
+    """
+    Performs post-processing of all the project requirement files, by post processing
+    the specified document, then all its children hierarchically.
+    Documents that are children of several parents are only processed once.
+    :param project: The project data model
+    :param document: The document to process
+    :param output_dir: The folder to write output files to
+    :param statistics: Updated with the number of files written and skipped
+    :return: The number of files written and skipped
+    """
+    if statistics is None:
+        statistics = WriteStatistics()
+    for sub_doc in walk_documents(document):
+        post_process_document(project, sub_doc, output_dir, statistics)
+    return statistics
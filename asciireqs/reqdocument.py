@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, Iterator, Optional, Set
 from typing import Iterable
 from typing import List
 
-from asciireqs.fields import ID
+from asciireqs.diagnostics import report
+from asciireqs.fields import ID, LINE_NO
 
 Requirement = Dict[str, str]
 Requirements = Dict[str, Requirement]
@@ -34,11 +35,13 @@ class ReqDocument:
         self.child_doc_files: List[str] = []
         self.child_docs: List[ReqDocument] = []
         self.req_regex: str = ""
+        self._attribute_name_set: Set[str] = set()
 
-    def _add_keys(self, keys: List[str]) -> None:
-        """Takes a list of requirement attribute names, and adds new ones to 'attribute_names'"""
+    def _add_keys(self, keys: Iterable[str]) -> None:
+        """Takes requirement attribute names, and adds new ones to 'attribute_names'"""
         for key in keys:
-            if key not in self.attribute_names:
+            if key not in self._attribute_name_set:
+                self._attribute_name_set.add(key)
                 self.attribute_names.append(key)
 
     def add_req(self, requirement: Optional[Requirement]) -> None:
@@ -48,10 +51,13 @@ class ReqDocument:
         req_id = requirement[ID]
         assert req_id
         if req_id in self.reqs:
-            print(f"ERROR: Duplicate requirement {req_id}")
+            report(
+                f"ERROR: Duplicate requirement {req_id}",
+                int(requirement.get(LINE_NO, 0)),
+            )
         else:
             self.reqs[req_id] = requirement
-            self._add_keys(list(requirement.keys()))
+            self._add_keys(requirement.keys())
 
     def add_reqs(self, requirements: Iterable[Requirement]) -> None:
         """Adds several new requirement to 'reqs'"""
@@ -64,17 +70,27 @@ class ReqDocument:
 
     def get_attribute_names_recursive(self) -> List[str]:
         """Finds all attribute names used in this and all child/sub specifications"""
-        names: List[str] = []
-        _add_attribute_names(self, names)
-        for child_doc in self.child_docs:
-            _add_attribute_names(child_doc, names)
-        return names
-
-
-def _add_attribute_names(doc: ReqDocument, names: List[str]) -> None:
-    for name in doc.attribute_names:
-        if name not in names:
-            names.append(name)
+        # A dict is used as an ordered set:
+        names: Dict[str, None] = {}
+        for doc in walk_documents(self):
+            names.update(dict.fromkeys(doc.attribute_names))
+        return list(names)
+
+
+def walk_documents(doc: ReqDocument) -> Iterator[ReqDocument]:
+    """
+    Iterates over a document and all its child documents (at any depth) in hierarchical order.
+    A document that is a child of several parents is only returned once.
+    """
+    visited: Set[int] = set()
+    stack = [doc]
+    while stack:
+        current = stack.pop()
+        if id(current) in visited:
+            continue
+        visited.add(id(current))
+        yield current
+        stack.extend(reversed(current.child_docs))
 
 
 def add_attribute(req: Requirement, name: str, value: str) -> None:
@@ -0,0 +1,81 @@
+"""schema - project-level registry of requirement attribute names and list values"""
+
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from asciireqs.fields import PARENT, CHILD, TAGS
+from asciireqs.reqdocument import ReqDocument, Requirement, walk_documents
+
+# Attributes with comma separated lists as values:
+LIST_ATTRIBUTES = (PARENT, CHILD, TAGS)
+
+ListValue = Tuple[str, ...]
+
+
+def split_list_value(value: str) -> ListValue:
+    """Takes a comma separated list and returns the (stripped, non-empty) elements"""
+    elements = (element.strip() for element in value.split(","))
+    return tuple(element for element in elements if element)
+
+
+class AttributeSchema:
+    """
+    This class holds the attribute names used by all requirements in a project (in the order
+    they were first used), and the values of list-valued attributes split into tuples.
+    Values are split once when requirements are added, so that link checks, filters and
+    exporters do not need to split them again.
+    """
+
+    def __init__(self, list_attributes: Iterable[str] = LIST_ATTRIBUTES) -> None:
+        self.list_attributes: FrozenSet[str] = frozenset(list_attributes)
+        # A dict is used as an ordered set:
+        self._names: Dict[str, None] = {}
+        self._names_list: Optional[List[str]] = None
+        # Split list values, by the identity of the requirement they belong to:
+        self._list_values: Dict[int, Tuple[Requirement, Dict[str, ListValue]]] = {}
+
+    @property
+    def attribute_names(self) -> List[str]:
+        """All attribute names, in the order they were first used"""
+        if self._names_list is None:
+            self._names_list = list(self._names)
+        return self._names_list
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def add_requirement(self, req: Requirement) -> None:
+        """Registers the attribute names of a requirement and splits its list values"""
+        for name in req:
+            if name not in self._names:
+                self._names[name] = None
+                self._names_list = None
+        if id(req) not in self._list_values:
+            self._list_values[id(req)] = (
+                req,
+                {
+                    name: split_list_value(value)
+                    for name, value in req.items()
+                    if name in self.list_attributes
+                },
+            )
+
+    def add_requirements(self, reqs: Iterable[Requirement]) -> None:
+        """Registers several requirements"""
+        for req in reqs:
+            self.add_requirement(req)
+
+    def add_documents(self, doc: ReqDocument) -> None:
+        """Registers the requirements of a document and all its child documents"""
+        for sub_doc in walk_documents(doc):
+            self.add_requirements(sub_doc.reqs.values())
+
+    def list_value(self, req: Requirement, name: str) -> ListValue:
+        """
+        Returns the value of a list attribute of a requirement, split into its elements.
+        Returns an empty tuple if the requirement does not have the attribute.
+        """
+        entry = self._list_values.get(id(req))
+        if entry is not None and entry[0] is req and name in self.list_attributes:
+            return entry[1].get(name, ())
+        # Not registered (or not declared as a list attribute), so it must be split now:
+        return split_list_value(req.get(name, ""))
@@ -0,0 +1,139 @@
+"""sqliteexport - Export requirements to an indexed SQLite database"""
+
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, LINE_NO, TITLE, TEXT, PARENT, CHILD
+from asciireqs.reqdocument import Requirement, walk_documents
+
+_SCHEMA = """
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    req_regex TEXT NOT NULL
+);
+CREATE TABLE document_children (
+    parent_id INTEGER NOT NULL REFERENCES documents(id),
+    child_id INTEGER NOT NULL REFERENCES documents(id)
+);
+CREATE TABLE requirements (
+    id TEXT PRIMARY KEY,
+    document_id INTEGER REFERENCES documents(id),
+    line INTEGER,
+    title TEXT,
+    text TEXT
+);
+CREATE TABLE attributes (
+    req_id TEXT NOT NULL REFERENCES requirements(id),
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE parent_links (
+    req_id TEXT NOT NULL REFERENCES requirements(id),
+    parent_id TEXT NOT NULL
+);
+CREATE TABLE child_links (
+    req_id TEXT NOT NULL REFERENCES requirements(id),
+    child_id TEXT NOT NULL
+);
+"""
+
+# Indexes are created after the data is loaded, which is faster than updating them per row:
+_INDEXES = """
+CREATE INDEX attributes_req_id ON attributes(req_id);
+CREATE INDEX attributes_name_value ON attributes(name, value);
+CREATE INDEX parent_links_req_id ON parent_links(req_id);
+CREATE INDEX parent_links_parent_id ON parent_links(parent_id);
+CREATE INDEX child_links_req_id ON child_links(req_id);
+CREATE INDEX child_links_child_id ON child_links(child_id);
+CREATE INDEX requirements_document_id ON requirements(document_id);
+"""
+
+
+def _attribute_rows(reqs: Iterable[Requirement]) -> Iterator[Tuple[str, str, str]]:
+    for req in reqs:
+        for name, value in req.items():
+            if name != ID:
+                yield req[ID], name, value
+
+
+def _link_rows(
+    project: Project, reqs: Iterable[Requirement], attribute: str
+) -> Iterator[Tuple[str, str]]:
+    for req in reqs:
+        for link in project.schema.list_value(req, attribute):
+            yield req[ID], link
+
+
+def export_to_sqlite(
+    outputpath: str, project: Project, reqs: Iterable[Requirement]
+) -> None:
+    """
+    Exports the requirements to an SQLite database, replacing the file if it exists.
+    All documents in the project are exported, with the specified requirements.
+    The data is loaded in bulk in a single transaction.
+    :param outputpath: The path to the database file
+    :param project: The project data model
+    :param reqs: The requirements to export
+    """
+    if os.path.exists(outputpath):
+        os.remove(outputpath)
+    documents = list(walk_documents(project.root_document))
+    document_ids: Dict[int, int] = {
+        id(doc): doc_id for doc_id, doc in enumerate(documents, start=1)
+    }
+    req_list: List[Requirement] = list(reqs)
+    req_documents: Dict[str, int] = {
+        req_id: document_ids[id(doc)] for doc in documents for req_id in doc.reqs
+    }
+
+    connection = sqlite3.connect(outputpath)
+    try:
+        connection.executescript(_SCHEMA)
+        with connection:
+            connection.executemany(
+                "INSERT INTO documents VALUES (?, ?, ?)",
+                (
+                    (document_ids[id(doc)], doc.name, doc.req_regex)
+                    for doc in documents
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO document_children VALUES (?, ?)",
+                (
+                    (document_ids[id(doc)], document_ids[id(child_doc)])
+                    for doc in documents
+                    for child_doc in doc.child_docs
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO requirements VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        req[ID],
+                        req_documents.get(req[ID]),
+                        int(req[LINE_NO]) if LINE_NO in req else None,
+                        req.get(TITLE),
+                        req.get(TEXT),
+                    )
+                    for req in req_list
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO attributes VALUES (?, ?, ?)", _attribute_rows(req_list)
+            )
+            connection.executemany(
+                "INSERT INTO parent_links VALUES (?, ?)",
+                _link_rows(project, req_list, PARENT),
+            )
+            connection.executemany(
+                "INSERT INTO child_links VALUES (?, ?)",
+                _link_rows(project, req_list, CHILD),
+            )
+            for statement in _INDEXES.strip().split(";"):
+                if statement.strip():
+                    connection.execute(statement)
+    finally:
+        connection.close()
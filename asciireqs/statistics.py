@@ -0,0 +1,90 @@
+"""statistics - aggregate numbers (counts, coverage, breakdowns) for a project"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, LINE_NO, TEXT, TITLE, CHILD
+from asciireqs.reqdocument import walk_documents
+
+# Attributes that are free text or unique per requirement, and not worth breaking down:
+_NOT_COUNTED = (ID, LINE_NO, TEXT, TITLE)
+
+_CACHE_KEY = "statistics"
+
+ValueCounts = Dict[str, Dict[str, int]]
+
+
+@dataclass
+class DocumentStatistics:
+    """Aggregate numbers for a single requirement document"""
+
+    name: str
+    requirements: int = 0
+    with_children: int = 0
+    value_counts: ValueCounts = field(default_factory=dict)
+
+    @property
+    def coverage(self) -> float:
+        """The percentage of the document's requirements that have child requirements"""
+        if not self.requirements:
+            return 0.0
+        return 100.0 * self.with_children / self.requirements
+
+
+@dataclass
+class ProjectStatistics:
+    """Aggregate numbers for all documents in a project"""
+
+    documents: List[DocumentStatistics] = field(default_factory=list)
+    value_counts: ValueCounts = field(default_factory=dict)
+
+    @property
+    def requirements(self) -> int:
+        """The total number of requirements in the project"""
+        return sum(doc.requirements for doc in self.documents)
+
+    def document(self, name: str) -> DocumentStatistics:
+        """Returns the statistics for the document with the specified name"""
+        for doc in self.documents:
+            if doc.name == name:
+                return doc
+        raise KeyError(name)
+
+
+def _count_value(counts: ValueCounts, attribute: str, value: str) -> None:
+    attribute_counts = counts.setdefault(attribute, {})
+    attribute_counts[value] = attribute_counts.get(value, 0) + 1
+
+
+def compute_statistics(project: Project) -> ProjectStatistics:
+    """
+    Computes the aggregate numbers for all documents in a single pass over the requirements.
+    Attribute values are split as comma separated lists, so that a requirement tagged
+    "Rel-1, Rel-2" is counted once for each release.
+    :param project: The project data model
+    :return: The statistics
+    """
+    statistics = ProjectStatistics()
+    for doc in walk_documents(project.root_document):
+        doc_statistics = DocumentStatistics(doc.name)
+        for req in doc.reqs.values():
+            doc_statistics.requirements += 1
+            if req.get(CHILD, "").strip():
+                doc_statistics.with_children += 1
+            for attribute in req:
+                if attribute in _NOT_COUNTED:
+                    continue
+                for element in project.schema.list_value(req, attribute):
+                    _count_value(doc_statistics.value_counts, attribute, element)
+                    _count_value(statistics.value_counts, attribute, element)
+        statistics.documents.append(doc_statistics)
+    return statistics
+
+
+def get_statistics(project: Project) -> ProjectStatistics:
+    """Returns the statistics for a project, computing them on first use"""
+    if _CACHE_KEY not in project.cache:
+        project.cache[_CACHE_KEY] = compute_statistics(project)
+    statistics: ProjectStatistics = project.cache[_CACHE_KEY]
+    return statistics
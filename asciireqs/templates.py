@@ -0,0 +1,189 @@
+"""templates - report templates compiled to literal text and macros, with a disk cache"""
+
+import dataclasses
+import functools
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from asciireqs.docparser import Project
+from asciireqs.macros import (
+    BreakdownMacro,
+    CountMacro,
+    CoverageMacro,
+    HierarchyMacro,
+    LinkCheckMacro,
+    Macro,
+    TableMacro,
+    TraceMacro,
+    parse_macro,
+)
+from asciireqs.reporting import expand_macro, insert_requirement_links
+
+# Change this when the compiled format changes, so that old cache files are not used:
+_FORMAT_VERSION = 3
+
+_MACRO_TYPES = {
+    "hierarchy": HierarchyMacro,
+    "table": TableMacro,
+    "count": CountMacro,
+    "coverage": CoverageMacro,
+    "breakdown": BreakdownMacro,
+    "trace": TraceMacro,
+    "link-check": LinkCheckMacro,
+}
+
+
+@dataclass
+class LiteralChunk:
+    """Consecutive lines of template text without macros"""
+
+    text: str
+
+
+TemplateNode = Union[LiteralChunk, Macro]
+
+
+@dataclass
+class CompiledTemplate:
+    """A report template split into literal text chunks and macros"""
+
+    digest: str
+    nodes: List[TemplateNode] = field(default_factory=list)
+
+
+# The number of compiled templates kept in memory by the process:
+_MAX_COMPILED_TEMPLATES = 64
+
+
+def template_digest(text: str) -> str:
+    """Returns the hash used to identify a template"""
+    return hashlib.sha256(f"{_FORMAT_VERSION}\n{text}".encode("utf-8")).hexdigest()
+
+
+def compile_template(text: str) -> CompiledTemplate:
+    """
+    Compiles a report template to chunks of literal text and macros
+    :param text: The template text
+    :return: The compiled template
+    """
+    template = CompiledTemplate(template_digest(text))
+    literal: List[str] = []
+    for line in text.splitlines(keepends=True):
+        macro = parse_macro(line)
+        if macro:
+            if literal:
+                template.nodes.append(LiteralChunk("".join(literal)))
+                literal = []
+            template.nodes.append(macro)
+        else:
+            literal.append(line)
+    if literal:
+        template.nodes.append(LiteralChunk("".join(literal)))
+    return template
+
+
+def _to_json(template: CompiledTemplate) -> Dict[str, Any]:
+    nodes: List[Dict[str, Any]] = []
+    for node in template.nodes:
+        if isinstance(node, LiteralChunk):
+            nodes.append({"type": "literal", "text": node.text})
+        else:
+            node_type = next(
+                name for name, cls in _MACRO_TYPES.items() if isinstance(node, cls)
+            )
+            nodes.append({"type": node_type, **dataclasses.asdict(node)})
+    return {"version": _FORMAT_VERSION, "digest": template.digest, "nodes": nodes}
+
+
+def _from_json(data: Dict[str, Any]) -> CompiledTemplate:
+    template = CompiledTemplate(data["digest"])
+    for node in data["nodes"]:
+        node_type = node.pop("type")
+        if node_type == "literal":
+            template.nodes.append(LiteralChunk(node["text"]))
+        else:
+            template.nodes.append(_MACRO_TYPES[node_type](**node))
+    return template
+
+
+def _read_cache(cache_path: str) -> Optional[CompiledTemplate]:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as cache_file:
+            data = json.load(cache_file)
+        if data.get("version") != _FORMAT_VERSION:
+            return None
+        return _from_json(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        # A missing or damaged cache file just means that the template must be compiled:
+        return None
+
+
+def _write_cache(cache_path: str, template: CompiledTemplate) -> None:
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file and rename, so that concurrent runs never see partial files:
+    file_handle, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(file_handle, "w", encoding="utf-8") as cache_file:
+            json.dump(_to_json(template), cache_file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_template(text: str, cache_dir: Optional[str] = None) -> CompiledTemplate:
+    """
+    Returns a compiled template, compiling it only if it is not found in the cache.
+    The most recently used templates are cached in memory for the process, and all
+    templates are cached on disk if a cache folder is given.
+    :param text: The template text
+    :param cache_dir: The folder for cached compiled templates (None for no disk cache)
+    :return: The compiled template
+    """
+    return _load_template(text, cache_dir)
+
+
+@functools.lru_cache(maxsize=_MAX_COMPILED_TEMPLATES)
+def _load_template(text: str, cache_dir: Optional[str]) -> CompiledTemplate:
+    digest = template_digest(text)
+    cache_path = os.path.join(cache_dir, digest + ".json") if cache_dir else None
+    template = _read_cache(cache_path) if cache_path else None
+    if not template:
+        template = compile_template(text)
+        if cache_path:
+            _write_cache(cache_path, template)
+    return template
+
+
+def load_template_file(
+    template_path: str, cache_dir: Optional[str] = None
+) -> CompiledTemplate:
+    """Reads and compiles a report template file (see load_template)"""
+    with open(template_path, "r", encoding="utf-8") as template_file:
+        return load_template(template_file.read(), cache_dir)
+
+
+def render_template(template: CompiledTemplate, project: Project) -> Iterator[str]:
+    """
+    Generates the report for a compiled template. Macros are expanded for all the
+    requirements of the project, and links are inserted in each line of literal text.
+    :param template: The compiled template
+    :param project: The project data model
+    :return: The generated AsciiDoc text
+    """
+    for node in template.nodes:
+        if isinstance(node, LiteralChunk):
+            # Line by line, as for templates that are not compiled, so that patterns
+            # anchored to the start or end of a line match the same way:
+            for line in node.text.splitlines(keepends=True):
+                yield insert_requirement_links(line, project.root_document)
+        else:
+            chunks: Iterable[str] = expand_macro(
+                node, project, project.requirements, None
+            )
+            yield from chunks
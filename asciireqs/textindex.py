@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""textindex - an inverted index of the words in requirements, for full-text search"""
+
+import argparse
+import heapq
+import math
+import re
+import sys
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from asciireqs.docparser import (
+    BlockLimits,
+    Project,
+    SpecRegistry,
+    project_from_tree,
+    read_file,
+)
+from asciireqs.fields import ID, TEXT, TITLE
+
+_CACHE_KEY = "text_index"
+
+DEFAULT_ATTRIBUTES = (TITLE, TEXT)
+
+_WORD = re.compile(r"\w+")
+
+
+def words(text: str) -> List[str]:
+    """Splits text into words (in lower case), as they are indexed and searched for"""
+    return _WORD.findall(text.lower())
+
+
+class TextIndex:
+    """
+    This class holds an inverted index of the words in some attributes (by default
+    Title and Text) of all the requirements of a project: For each word, the
+    requirements it is used in and how many times. Finding the requirements with
+    a set of words only looks at the requirements with the least common of the words,
+    so searches do not get slower with the number of requirements that do not match.
+    """
+
+    def __init__(
+        self, project: Project, attributes: Sequence[str] = DEFAULT_ATTRIBUTES
+    ) -> None:
+        self.attributes = tuple(attributes)
+        self.ids: List[str] = list(project.requirements)
+        # The number of times each word is used in each requirement, by row:
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: List[int] = []
+        for row, req in enumerate(project.requirements.values()):
+            req_words = [
+                word for name in self.attributes for word in words(req.get(name, ""))
+            ]
+            self.lengths.append(len(req_words))
+            for word in req_words:
+                counts = self.postings.setdefault(word, {})
+                counts[row] = counts.get(row, 0) + 1
+        self._matches: Dict[Tuple[str, ...], FrozenSet[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def _rows(self, query_words: Sequence[str]) -> List[int]:
+        """Returns the rows of the requirements with all of the words"""
+        if not query_words:
+            return []
+        postings = sorted(
+            (self.postings.get(word, {}) for word in set(query_words)), key=len
+        )
+        rows = set(postings[0])
+        for counts in postings[1:]:
+            rows.intersection_update(counts)
+            if not rows:
+                break
+        return sorted(rows)
+
+    def matching_ids(self, query: Iterable[str]) -> FrozenSet[str]:
+        """
+        Returns the IDs of the requirements that have all the words in a query
+        (computed once for each query, then reused)
+        :param query: Strings with one or more words each
+        :return: The IDs of the requirements
+        """
+        query_words = tuple(sorted({word for text in query for word in words(text)}))
+        matches = self._matches.get(query_words)
+        if matches is None:
+            matches = frozenset(self.ids[row] for row in self._rows(query_words))
+            self._matches[query_words] = matches
+        return matches
+
+    def search(
+        self, query: str, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Finds the requirements that have all the words in a query, ranked by how often
+        they use the words (rare words count more, and long requirements count less)
+        :param query: The words to search for
+        :param limit: The maximum number of results (default: all)
+        :return: The requirement IDs and their scores, best match first
+        """
+        query_words = set(words(query))
+        weights = {
+            word: math.log(1 + len(self.ids) / len(self.postings[word]))
+            for word in query_words
+            if word in self.postings
+        }
+        scored = [
+            (
+                sum(
+                    weight * self.postings[word][row]
+                    for word, weight in weights.items()
+                )
+                / math.sqrt(self.lengths[row]),
+                # Ties are listed in project order:
+                -row,
+            )
+            for row in self._rows(list(query_words))
+        ]
+        best = (
+            heapq.nlargest(limit, scored) if limit is not None else sorted(scored)[::-1]
+        )
+        return [(self.ids[-negative_row], score) for score, negative_row in best]
+
+
+def get_text_index(
+    project: Project, attributes: Sequence[str] = DEFAULT_ATTRIBUTES
+) -> TextIndex:
+    """Returns the text index of a project (built on first use, then shared for the run)"""
+    indexes: Dict[Tuple[str, ...], TextIndex] = project.cache.setdefault(
+        _CACHE_KEY, {}
+    )
+    index = indexes.get(tuple(attributes))
+    if index is None:
+        index = TextIndex(project, attributes)
+        indexes[tuple(attributes)] = index
+    return index
+
+
+def contains_words(project: Project, req_id: str, query: Iterable[str]) -> bool:
+    """Returns True if a requirement has all the words in a query, in its Title or Text"""
+    return req_id in get_text_index(project).matching_ids(query)
+
+
+def main(
+    argv: Optional[Sequence[str]] = None, prog: Optional[str] = None
+) -> None:
+    """Searches for requirements with all the given words, and lists the best matches"""
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Find the requirements that have all the given words "
+        "(in their Title or Text, by default)",
+    )
+    parser.add_argument("query", help="The words to search for")
+    parser.add_argument("reqdoc", help="The top level specification")
+    parser.add_argument(
+        "-n",
+        "--limit",
+        dest="limit",
+        type=int,
+        default=20,
+        help="Maximum number of requirements to list",
+    )
+    parser.add_argument(
+        "-a",
+        "--attribute",
+        dest="attributes",
+        action="append",
+        help="Attribute to search (can be given several times, default: Title and Text)",
+    )
+    args = parser.parse_args(argv)
+
+    # Parsed without printing the requirements, so only the results are printed:
+    registry = SpecRegistry(BlockLimits(), read_file)
+    project = project_from_tree(registry.parse_tree(args.reqdoc), registry.limits)
+    index = get_text_index(project, args.attributes or DEFAULT_ATTRIBUTES)
+    results = index.search(args.query, args.limit)
+    for req_id, score in results:
+        req = project.requirements[req_id]
+        summary = (req.get(TITLE) or req.get(TEXT, "")).strip().split("\n")[0]
+        print(f"{req[ID]:<24} {score:7.3f}  {summary}")
+    if not results:
+        sys.exit(f"No requirements found with {args.query}")
+
+
+if __name__ == "__main__":
+    main()
@@ -33,7 +33,6 @@ setup(
         # Specify the Python versions you support here. In particular, ensure
         # that you indicate you support Python 3. These classifiers are *not*
         # checked by 'pip install'. See instead 'python_requires' below.
-        "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
@@ -41,12 +40,15 @@ setup(
     ],
     keywords='Requirement Management, version control, git, text-based, AsciiDoc',
     packages=find_packages(),
-    python_requires=">=3.7, <4",
+    python_requires=">=3.8, <4",
     install_requires=["PyYAML", "openpyxl"],
+    extras_require={"numpy": ["numpy"]},
     entry_points={  # Optional
         "console_scripts": [
-            "asciireq=asciireqs.asciireq:main",
+            "asciireq=asciireqs.cli:main",
             "asciireqexport=asciireqs.asciireqexport:main",
+            "asciireqbench=asciireqs.benchmark:main",
+            "asciireqls=asciireqs.langserver:main",
         ],
     },
 )
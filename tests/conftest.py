@@ -0,0 +1,41 @@
+"""conftest: Fixtures shared by the tests"""
+
+from typing import Callable, List, Tuple
+
+import pytest
+
+from asciireqs.docparser import Project
+from asciireqs.reqdocument import ReqDocument, Requirement
+
+# A document of a test project: Its name and its requirements:
+Document = Tuple[str, List[Requirement]]
+
+
+def build_project(*documents: Document, req_regex: str = "") -> Project:
+    """
+    Builds a project from documents. The first is the top level document, and the
+    others are its child documents.
+    :param documents: The name and the requirements of each document
+    :param req_regex: The requirement ID pattern of the top level document
+    :return: The project
+    """
+    docs: List[ReqDocument] = []
+    for name, reqs in documents:
+        doc = ReqDocument()
+        doc.name = name
+        # Copied, so that projects built from the same data do not share requirements:
+        doc.add_reqs([dict(req) for req in reqs])
+        docs.append(doc)
+    root = docs[0]
+    root.req_regex = req_regex
+    requirements = dict(root.reqs)
+    for child in docs[1:]:
+        root.add_child_doc(child)
+        requirements.update(child.reqs)
+    return Project(root, requirements)
+
+
+@pytest.fixture(name="make_project")
+def fixture_make_project() -> Callable[..., Project]:
+    """Returns a function that builds a project from documents (see build_project)"""
+    return build_project
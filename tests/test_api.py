@@ -0,0 +1,107 @@
+"""test_api: Tests for the api module"""
+
+import io
+
+import pytest
+
+from asciireqs.api import (
+    parse_project,
+    parse_projects,
+    parse_stream,
+    parse_text,
+    render_document,
+    render_template_text,
+)
+
+USER_SPEC = """= User requirements
+:req_regex: UR-\\d+
+:req-children: sr.adoc
+
+UR-1::
+The first user requirement.
++
+Child: SR-1
+"""
+
+SW_SPEC = """= Software requirements
+:req_regex: SR-\\d+
+
+SR-1::
+The first software requirement, see UR-1.
++
+Parent: UR-1
+
+`asciireq-count`
+"""
+
+SOURCES = {"ur.adoc": USER_SPEC, "sr.adoc": SW_SPEC}
+
+
+def test_parse_project_from_sources(capsys: pytest.CaptureFixture[str]) -> None:
+    result = parse_project("ur.adoc", SOURCES)
+    assert list(result.project.requirements) == ["UR-1", "SR-1"]
+    assert not result.diagnostics
+    assert set(result.texts) == {"ur.adoc", "sr.adoc"}
+    # Nothing is printed:
+    assert not capsys.readouterr().out
+
+
+def test_diagnostics_are_returned(capsys: pytest.CaptureFixture[str]) -> None:
+    result = parse_text(USER_SPEC + "\n[.reqy]\n----\nID: UR-2\n----\n", "ur.adoc")
+    assert [diagnostic.message for diagnostic in result.diagnostics] == [
+        "Error: Missing Text attribute on line 12",
+        "ERROR: Cannot read sr.adoc",
+    ]
+    assert not capsys.readouterr().out
+
+
+def test_parse_project_with_pattern() -> None:
+    sources = {
+        "ur.adoc": USER_SPEC.replace("sr.adoc", "specs/*.adoc"),
+        "specs/sr.adoc": SW_SPEC,
+        "specs/tr.adoc": SW_SPEC.replace("SR", "TR"),
+    }
+    result = parse_project("ur.adoc", sources)
+    assert list(result.project.requirements) == ["UR-1", "SR-1", "TR-1"]
+
+
+def test_parse_errors_are_returned() -> None:
+    result = parse_text(USER_SPEC + "\n[.reqy]\n----\nUR-2: [1, 2\n----\n", "ur.adoc")
+    assert list(result.project.requirements) == ["UR-1"]
+    assert "Error: Failed to parse YAML on line 12" in [
+        diagnostic.message for diagnostic in result.diagnostics
+    ]
+
+
+def test_parse_stream() -> None:
+    result = parse_stream(io.StringIO(SW_SPEC), "sr.adoc")
+    assert list(result.project.requirements) == ["SR-1"]
+
+
+def test_render_document() -> None:
+    result = parse_project("ur.adoc", SOURCES)
+    rendering = render_document(result, "sr.adoc")
+    text = rendering.text()
+    assert "[[SR-1]]SR-1::" in text
+    assert "xref:ur.adoc#UR-1[UR-1]" in text
+    assert text.endswith("\n1\n")
+    assert not rendering.diagnostics
+    assert render_document(result, "unknown.adoc").diagnostics
+
+
+def test_render_template_collects_errors(capsys: pytest.CaptureFixture[str]) -> None:
+    result = parse_project("ur.adoc", SOURCES)
+    rendering = render_template_text(result, "`asciireq-count: unknown_name`\n")
+    assert list(rendering) == []
+    assert [diagnostic.message for diagnostic in rendering.diagnostics] == [
+        "Name error in expression evaluation: Use of unknown_name not allowed"
+    ]
+    assert not capsys.readouterr().out
+
+
+def test_parse_projects_in_threads() -> None:
+    results = parse_projects(
+        [("ur.adoc", SOURCES), ("sr.adoc", SOURCES)] * 4, max_workers=4
+    )
+    assert [len(result.project.requirements) for result in results] == [2, 1] * 4
+    assert all(not result.diagnostics for result in results)
@@ -0,0 +1,103 @@
+"""test_asciireqexport: Tests for the asciireqexport module"""
+
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+import openpyxl
+import pytest
+
+from asciireqs.asciireqexport import (
+    ExportOptions,
+    export_documents_to_excel,
+    export_project,
+    export_to_excel,
+    sheet_name,
+)
+from asciireqs.docparser import Project
+from asciireqs.fields import CHILD, ID, PARENT, TEXT
+from asciireqs.reqdocument import walk_documents
+
+DOCUMENTS = [
+    (
+        "specs/user-reqs.adoc",
+        [{ID: "UR-1", TEXT: "User requirement", CHILD: "SR-1, SR-2"}],
+    ),
+    (
+        "specs/sw-reqs.adoc",
+        [
+            {ID: "SR-1", TEXT: "Software requirement", PARENT: "UR-1"},
+            {ID: "SR-2", TEXT: "Another one", PARENT: "UR-1"},
+        ],
+    ),
+]
+
+
+def test_sheet_name() -> None:
+    used = {"links"}
+    assert sheet_name("specs/user-reqs.adoc", used) == "user-reqs"
+    assert sheet_name("other/user-reqs.adoc", used) == "user-reqs (2)"
+    assert sheet_name("links.adoc", used) == "links (2)"
+    assert sheet_name("a[b]:c.adoc", used) == "a_b__c"
+    assert len(sheet_name("x" * 40 + ".adoc", used)) == 31
+
+
+def test_export_to_excel(tmp_path: Path, make_project: Callable[..., Project]) -> None:
+    path = str(tmp_path / "reqs.xlsx")
+    project = make_project(*DOCUMENTS)
+    export_to_excel(path, [ID, TEXT], project.requirements.values())
+    rows: List[Tuple[Any, ...]] = list(openpyxl.load_workbook(path).active.values)
+    assert rows[0] == (ID, TEXT)
+    assert rows[1] == ("UR-1", "User requirement")
+    assert len(rows) == 4
+
+
+def test_export_documents_to_excel(
+    tmp_path: Path, make_project: Callable[..., Project]
+) -> None:
+    path = str(tmp_path / "reqs.xlsx")
+    project = make_project(*DOCUMENTS)
+    export_documents_to_excel(
+        path,
+        project,
+        walk_documents(project.root_document),
+        lambda req: req[ID] != "SR-2",
+    )
+    workbook = openpyxl.load_workbook(path)
+    assert workbook.sheetnames == ["user-reqs", "sw-reqs", "Links"]
+    assert list(workbook["sw-reqs"].values) == [
+        (ID, TEXT, PARENT),
+        ("SR-1", "Software requirement", "UR-1"),
+    ]
+    assert list(workbook["Links"].values) == [
+        (ID, "Link", "Linked ID"),
+        ("UR-1", CHILD, "SR-1"),
+        ("UR-1", CHILD, "SR-2"),
+        ("SR-1", PARENT, "UR-1"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "file_name", ["reqs.cvs", "reqs.xlsx", "reqs.sqlite", "reqs.jsonl"]
+)
+@pytest.mark.parametrize(
+    "options",
+    [
+        ExportOptions(recursive=True, filter_expression="link_error()"),
+        ExportOptions(True, "link_error()", columnar=True),
+        ExportOptions(True, "link_error()", sheet_per_document=True),
+    ],
+)
+def test_filter_errors_leave_no_output(
+    tmp_path: Path,
+    file_name: str,
+    options: ExportOptions,
+    make_project: Callable[..., Project],
+) -> None:
+    path = tmp_path / file_name
+    # SR-3 links to a parent that does not exist, which link_error() looks up:
+    project = make_project(
+        *DOCUMENTS, ("specs/tests.adoc", [{ID: "SR-3", PARENT: "UR-9"}])
+    )
+    with pytest.raises(ValueError, match="Error in filter expression: 'UR-9'"):
+        export_project(project, str(path), options)
+    assert not path.exists()
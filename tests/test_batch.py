@@ -0,0 +1,115 @@
+"""test_batch: Tests for the batch module"""
+
+from pathlib import Path
+
+import pytest
+
+from asciireqs.batch import ExportJob, main, parse_manifest, read_manifest, run_batch
+
+SHARED_SPEC = """= Shared requirements
+:req_regex: SH-\\d+
+
+SH-1::
+A shared requirement.
+"""
+
+
+def product_spec(prefix: str) -> str:
+    return (
+        f"= Product {prefix}\n:req_regex: {prefix}-\\d+\n:req-children: shared.adoc\n\n"
+        f"{prefix}-1::\nA product requirement.\n"
+    )
+
+
+def write_manifest(tmp_path: Path, workers: int = 2) -> Path:
+    (tmp_path / "shared.adoc").write_text(SHARED_SPEC, encoding="utf-8")
+    (tmp_path / "a.adoc").write_text(product_spec("A"), encoding="utf-8")
+    (tmp_path / "b.adoc").write_text(product_spec("B"), encoding="utf-8")
+    (tmp_path / "report.adoc").write_text("`asciireq-count`\n", encoding="utf-8")
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text(
+        f"workers: {workers}\n"
+        "projects:\n"
+        "  - spec: a.adoc\n"
+        "    output: out/a\n"
+        "    templates: report.adoc\n"
+        "    exports:\n"
+        "      - out/a.jsonl\n"
+        "      - path: out/a.cvs\n"
+        "        recursive: true\n"
+        "        columns: [ID]\n"
+        "  - name: product-b\n"
+        "    spec: b.adoc\n"
+        "    output: out/b\n",
+        encoding="utf-8",
+    )
+    return manifest
+
+
+def test_parse_manifest() -> None:
+    manifest = parse_manifest(
+        {
+            "projects": [
+                {
+                    "spec": "a.adoc",
+                    "exports": [{"path": "a.db", "filter": "True"}],
+                }
+            ]
+        },
+        "base",
+    )
+    assert manifest.workers == 1
+    assert manifest.projects[0].name == "a"
+    assert manifest.projects[0].spec == "base/a.adoc"
+    assert manifest.projects[0].exports == [ExportJob("base/a.db", False, "True")]
+    with pytest.raises(ValueError):
+        parse_manifest({"projects": [{"name": "no spec"}]})
+    with pytest.raises(ValueError):
+        parse_manifest({"projects": [{"spec": "a.adoc", "exports": ["a.txt"]}]})
+
+
+def test_run_batch(tmp_path: Path) -> None:
+    timings = run_batch(read_manifest(str(write_manifest(tmp_path))))
+    assert [(timing.name, timing.requirements) for timing in timings] == [
+        ("a", 2),
+        ("product-b", 2),
+    ]
+    assert all(timing.error is None and not timing.diagnostics for timing in timings)
+    assert (tmp_path / "out" / "a" / "report.adoc").read_text(encoding="utf-8") == "2\n"
+    assert (tmp_path / "out" / "b" / "shared.adoc").exists()
+    assert (tmp_path / "out" / "a.cvs").read_text(encoding="utf-8") == "ID\nA-1\nSH-1\n"
+    assert (tmp_path / "out" / "a.jsonl").exists()
+
+
+def test_main_prints_summary_and_fails_for_missing_specs(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    manifest = write_manifest(tmp_path, workers=1)
+    main([str(manifest)])
+    output = capsys.readouterr().out
+    assert "product-b" in output and "2 projects in" in output
+    (tmp_path / "b.adoc").unlink()
+    with pytest.raises(SystemExit, match="Failed: product-b"):
+        main([str(manifest)])
+
+
+def test_run_batch_continues_after_a_parse_failure(tmp_path: Path) -> None:
+    manifest = read_manifest(str(write_manifest(tmp_path)))
+    (tmp_path / "a.adoc").write_bytes(b"= Not UTF-8 \xff\xfe\n")
+    timings = run_batch(manifest)
+    assert timings[0].error and "Cannot parse" in timings[0].error
+    assert timings[1].error is None and timings[1].requirements == 2
+    assert (tmp_path / "out" / "b" / "shared.adoc").exists()
+
+
+def test_run_batch_continues_after_an_export_failure(tmp_path: Path) -> None:
+    manifest = read_manifest(str(write_manifest(tmp_path)))
+    (tmp_path / "a.adoc").write_text(
+        product_spec("A") + "+\nParent: UR-9\n", encoding="utf-8"
+    )
+    export = ExportJob(str(tmp_path / "out" / "a.cvs"), False, "link_error()")
+    manifest.projects[0].exports = [export]
+    timings = run_batch(manifest)
+    assert timings[0].error
+    assert timings[1].error is None
+    assert (tmp_path / "out" / "b" / "shared.adoc").exists()
@@ -0,0 +1,117 @@
+"""test_benchmark: Tests for the benchmark module"""
+
+from pathlib import Path
+
+import pytest
+
+from asciireqs.benchmark import (
+    STARTUP_MODULES,
+    PhaseMemory,
+    PhaseTiming,
+    baseline_data,
+    compare_to_baseline,
+    exceeded_thresholds,
+    generate_project,
+    measure_import,
+    main,
+    parse_threshold,
+    read_baseline,
+    run_benchmark,
+    run_timing,
+)
+from asciireqs.docparser import read_and_parse_project
+from asciireqs.fields import PARENT
+
+
+def test_generate_project(tmp_path: Path) -> None:
+    project = read_and_parse_project(generate_project(str(tmp_path), 40))
+    assert len(project.requirements) == 40
+    assert len(project.root_document.reqs) == 10
+    assert project.requirements["SW-1"][PARENT] == "UR-2"
+    assert "SW-1" in project.requirements["UR-2"]["Child"]
+
+
+def test_run_benchmark(tmp_path: Path) -> None:
+    results = run_benchmark(20, str(tmp_path), ["parse", "render", "export-sqlite"])
+    assert [result.phase for result in results] == ["parse", "render", "export-sqlite"]
+    assert all(result.peak_bytes >= result.retained_bytes for result in results)
+    # The parsed project is retained:
+    assert results[0].retained_bytes > 0
+    assert (tmp_path / "output" / "report.adoc").exists()
+    assert (tmp_path / "export.sqlite").exists()
+
+
+def test_run_timing(tmp_path: Path) -> None:
+    timings = run_timing(20, str(tmp_path), ["parse", "export-jsonl"], repeats=2)
+    assert [timing.phase for timing in timings] == ["parse", "export-jsonl"]
+    assert all(timing.seconds > 0 for timing in timings)
+    assert timings[0].requirements_per_second == 20 / timings[0].seconds
+
+
+def test_compare_to_baseline() -> None:
+    baseline = baseline_data(
+        [PhaseTiming("parse", 10, 1.0), PhaseTiming("render", 10, 2.0)],
+        [PhaseMemory("parse", 10, 5000, 2000)],
+    )
+    assert baseline["phases"]["parse"]["requirements_per_second"] == 10
+    assert baseline["phases"]["parse"]["peak_bytes"] == 5000
+    # Values are compared per requirement, within the tolerances:
+    current = baseline_data(
+        [PhaseTiming("parse", 20, 2.4), PhaseTiming("render", 20, 6.0)],
+        [PhaseMemory("parse", 20, 12000, 4000)],
+    )
+    assert compare_to_baseline(baseline, current, 0.25, 0.25) == [
+        "render: seconds 300,000.0 us/req is 50% more than the baseline "
+        "200,000.0 us/req (tolerance 25%)"
+    ]
+    assert len(compare_to_baseline(baseline, current, 0.1, 0.1)) == 3
+    # Phases that were not measured are not compared:
+    assert not compare_to_baseline(baseline, baseline_data([], []))
+
+
+def test_record_and_compare_baseline(tmp_path: Path) -> None:
+    baseline_path = str(tmp_path / "baseline.json")
+    arguments = ["-n", "10", "-p", "parse", "--repeats", "1"]
+    main(arguments + ["--work-dir", str(tmp_path), "--record", baseline_path])
+    baseline = read_baseline(baseline_path)
+    assert set(baseline["phases"]["parse"]) == {
+        "requirements",
+        "seconds",
+        "requirements_per_second",
+        "peak_bytes",
+        "retained_bytes",
+    }
+    main(
+        arguments
+        + ["--compare", baseline_path]
+        + ["--time-tolerance", "1000", "--memory-tolerance", "1000"]
+    )
+    (tmp_path / "baseline.json").write_text('{"version": 0}')
+    with pytest.raises(SystemExit):
+        main(arguments + ["--compare", baseline_path])
+
+
+def test_parse_threshold() -> None:
+    assert parse_threshold("1000") == (None, 1000)
+    assert parse_threshold("render=2.5") == ("render", 2.5)
+    with pytest.raises(ValueError):
+        parse_threshold("rendering=1000")
+
+
+def test_exceeded_thresholds() -> None:
+    results = [PhaseMemory("parse", 10, 5000, 2000), PhaseMemory("render", 10, 800, 0)]
+    assert not exceeded_thresholds(results, [(None, 500)], [(None, 200)])
+    assert exceeded_thresholds(results, [(None, 400)]) == [
+        "parse: peak memory 500 B/req exceeds 400 B/req"
+    ]
+    assert exceeded_thresholds(results, [], [("render", 100), ("parse", 100)]) == [
+        "parse: retained memory 200 B/req exceeds 100 B/req"
+    ]
+
+
+@pytest.mark.parametrize("module", STARTUP_MODULES)
+def test_startup_does_not_import_slow_packages(module: str) -> None:
+    import_time = measure_import(module)
+    assert import_time.microseconds > 0
+    assert module in import_time.imported
+    assert not import_time.deferred_imports
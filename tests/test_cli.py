@@ -0,0 +1,49 @@
+"""test_cli: Tests for the cli module"""
+
+from pathlib import Path
+
+import pytest
+
+from asciireqs.cli import main
+
+SPEC = """= Requirements
+:req_regex: UR-\\d+
+
+UR-1::
+The first requirement.
+"""
+
+
+def test_export_command(tmp_path: Path) -> None:
+    spec = tmp_path / "spec.adoc"
+    spec.write_text(SPEC, encoding="utf-8")
+    main(["export", "-c", "ID, Line", str(spec), str(tmp_path / "export.cvs")])
+    assert (tmp_path / "export.cvs").read_text(encoding="utf-8") == "ID,Line\nUR-1,4\n"
+
+
+def test_render_is_the_default_command(tmp_path: Path) -> None:
+    spec = tmp_path / "spec.adoc"
+    spec.write_text(SPEC, encoding="utf-8")
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    main(["-o", str(output_dir), str(spec)])
+    assert "[[UR-1]]UR-1::" in (output_dir / "spec.adoc").read_text(encoding="utf-8")
+
+
+def test_help(capsys: pytest.CaptureFixture[str]) -> None:
+    main(["--help"])
+    assert "export" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(["export", "--help"])
+    assert capsys.readouterr().out.startswith("usage: asciireq export")
+
+
+def test_projects_with_the_same_name_are_rejected(tmp_path: Path) -> None:
+    specs = [tmp_path / "a" / "spec.adoc", tmp_path / "b" / "Spec.adoc"]
+    for spec in specs:
+        spec.parent.mkdir()
+        spec.write_text(SPEC, encoding="utf-8")
+    output_dir = tmp_path / "output"
+    with pytest.raises(SystemExit, match="sub-folder Spec"):
+        main(["-o", str(output_dir), *map(str, specs)])
+    assert not output_dir.exists()
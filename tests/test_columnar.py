@@ -0,0 +1,120 @@
+"""test_columnar: Tests for the columnar module"""
+from typing import Callable
+
+import pytest
+
+from asciireqs.columnar import ColumnStore, build_column_store, get_column_store
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, TEXT, PARENT, CHILD
+from asciireqs.reporting import (
+    compile_filter,
+    filter_variables,
+    select_requirements,
+)
+
+DOCUMENTS = [
+    (
+        "",
+        [
+            {ID: "UR-1", TEXT: "First", CHILD: "SR-1", "Tags": "Rel-1"},
+            {ID: "UR-2", TEXT: "Second", "Tags": "Rel-1, Rel-2"},
+        ],
+    ),
+    (
+        "",
+        [
+            {ID: "SR-1", TEXT: "Third", PARENT: "UR-1", "Tags": "Rel-2"},
+            {ID: "SR-2", TEXT: "Fourth", PARENT: "UR-9", "Priority": "High"},
+        ],
+    ),
+]
+
+FILTERS = [
+    "",
+    '"Rel-1" in elements(Tags)',
+    '"Rel-1" not in elements(Tags)',
+    'Priority == "High"',
+    '"High" != Priority',
+    'Tags == "Rel-2" or Priority == "High"',
+    'not ("Rel-2" in elements(Tags) and Parent.startswith("UR"))',
+    'search("ir", Text)',
+    're.fullmatch("UR-\\\\d+", Parent)',
+    'Priority in ["High", "Low"]',
+    '"ou" in Text',
+    "Child",
+    "has_invalid_link() or Priority",
+]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+@pytest.mark.parametrize("filter_expression", FILTERS)
+def test_select_matches_row_wise_evaluation(
+    filter_expression: str, use_numpy: bool, make_project: Callable[..., Project]
+) -> None:
+    project = make_project(*DOCUMENTS)
+    expected = [
+        req[ID]
+        for req in project.requirements.values()
+        if compile_filter(filter_expression, project)(req)
+    ]
+    store = ColumnStore(project, use_numpy)
+    rows = store.select(
+        project.requirements,
+        filter_expression,
+        filter_variables(project),
+        lambda: compile_filter(filter_expression, project),
+    )
+    assert rows is not None
+    assert [store.ids[row] for row in rows] == expected
+
+
+def test_simple_filter_is_vectorised(make_project: Callable[..., Project]) -> None:
+    project = make_project(*DOCUMENTS)
+    store = ColumnStore(project, use_numpy=False)
+    assert store.evaluate('"Rel-1" in elements(Tags)', filter_variables(project)) == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert store.evaluate("link_error()", filter_variables(project)) is None
+
+
+def test_select_from_subset_of_requirements(
+    make_project: Callable[..., Project],
+) -> None:
+    project = make_project(*DOCUMENTS)
+    build_column_store(project, use_numpy=False)
+    sr = project.root_document.child_docs[0]
+    selected = select_requirements(project, sr.reqs, '"Rel-2" in elements(Tags)')
+    assert [req[ID] for req in selected] == ["SR-1"]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+@pytest.mark.parametrize(
+    "filter_expression", ['req["Tags"] == "Rel-1"', 'link_error() or Tags == "Rel-1"']
+)
+def test_fallback_only_evaluates_selected_requirements(
+    filter_expression: str,
+    use_numpy: bool,
+    capsys: pytest.CaptureFixture[str],
+    make_project: Callable[..., Project],
+) -> None:
+    project = make_project(*DOCUMENTS)
+    build_column_store(project, use_numpy)
+    # SR-2 has no Tags and a link to an unknown requirement, but is not selected from:
+    selected = select_requirements(
+        project, project.root_document.reqs, filter_expression
+    )
+    assert [req[ID] for req in selected] == ["UR-1"]
+    assert not capsys.readouterr().out
+
+
+def test_values(make_project: Callable[..., Project]) -> None:
+    project = make_project(*DOCUMENTS)
+    store = build_column_store(project, use_numpy=False)
+    assert get_column_store(project) is store
+    assert list(store.values([ID, "Priority", "Unknown"], [0, 3])) == [
+        ["UR-1", "", ""],
+        ["SR-2", "High", ""],
+    ]
@@ -0,0 +1,94 @@
+"""test_discovery: Tests for the discovery module"""
+
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from asciireqs import discovery
+from asciireqs.discovery import find_files, is_pattern, match_paths
+
+
+def make_files(directory: Path, *names: str) -> None:
+    for name in names:
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name, encoding="utf-8")
+
+
+def native(*names: str) -> List[str]:
+    return [os.path.join(*name.split("/")) for name in names]
+
+
+def test_is_pattern() -> None:
+    assert is_pattern("specs/*.adoc")
+    assert is_pattern("sr?.adoc")
+    assert is_pattern("sr[12].adoc")
+    assert not is_pattern("specs/sr.adoc")
+
+
+def test_find_files(tmp_path: Path) -> None:
+    make_files(
+        tmp_path,
+        "specs/b.adoc",
+        "specs/a.adoc",
+        "specs/notes.txt",
+        "specs/sub/c.adoc",
+        "specs/sub/deeper/d.adoc",
+        "specs/.hidden/e.adoc",
+        "other/f.adoc",
+    )
+    assert find_files(str(tmp_path), "specs/*.adoc") == native(
+        "specs/a.adoc", "specs/b.adoc"
+    )
+    assert find_files(str(tmp_path), "specs/**/*.adoc") == native(
+        "specs/a.adoc",
+        "specs/b.adoc",
+        "specs/sub/c.adoc",
+        "specs/sub/deeper/d.adoc",
+    )
+    assert find_files(str(tmp_path), "*/sub/*.adoc") == native("specs/sub/c.adoc")
+    assert find_files(str(tmp_path), "specs/**") == native(
+        "specs/a.adoc",
+        "specs/b.adoc",
+        "specs/notes.txt",
+        "specs/sub/c.adoc",
+        "specs/sub/deeper/d.adoc",
+    )
+    assert not find_files(str(tmp_path), "missing/**/*.adoc")
+
+
+def test_find_files_sees_changes(tmp_path: Path) -> None:
+    make_files(tmp_path, "specs/a.adoc")
+    assert find_files(str(tmp_path), "specs/*.adoc") == native("specs/a.adoc")
+    make_files(tmp_path, "specs/b.adoc")
+    # The folder is modified, so it is scanned again:
+    assert find_files(str(tmp_path), "specs/*.adoc") == native(
+        "specs/a.adoc", "specs/b.adoc"
+    )
+
+
+def test_find_files_reuses_results(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    make_files(tmp_path, "specs/sub/a.adoc")
+    assert find_files(str(tmp_path), "**/*.adoc") == native("specs/sub/a.adoc")
+    scanned = []
+    monkeypatch.setattr(
+        discovery,
+        "_scan",
+        lambda folder: scanned.append(folder) or ([], []),  # type: ignore
+    )
+    # The tree is unchanged, so it is not scanned:
+    assert find_files(str(tmp_path), "**/*.adoc") == native("specs/sub/a.adoc")
+    assert not scanned
+
+
+def test_match_paths() -> None:
+    paths = ["ur.adoc", "specs/b.adoc", "specs/a.adoc", "specs/x/c.adoc", "d.adoc"]
+    assert match_paths(paths, "", "specs/**/*.adoc") == native(
+        "specs/a.adoc", "specs/b.adoc", "specs/x/c.adoc"
+    )
+    assert match_paths(paths, "specs", "*.adoc") == ["a.adoc", "b.adoc"]
+    assert match_paths(paths, "", "*.adoc") == ["d.adoc", "ur.adoc"]
@@ -1,7 +1,15 @@
 """test_docparser: Tests for the docparser modele"""
 
-from typing import Tuple
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
 from asciireqs.docparser import (
+    BlockLimits,
+    parse_doc,
+    read_and_parse_project,
+    read_and_parse_workspace,
     get_source_block,
     req_from_yaml_lines,
     req_from_yaml_block,
@@ -89,6 +97,21 @@ def test_req_from_invalid_yaml_block() -> None:
     )
 
 
+@pytest.mark.parametrize(
+    "lines",
+    [["SR-001: [1, 2"], ["SR-001: {Text: a"], ["- SR-001"], ["SR-001: Some text"]],
+)
+def test_req_from_yaml_lines_that_are_not_requirements(lines: List[str]) -> None:
+    # Reported as errors (and not raised), so the rest of the document is parsed:
+    assert not req_from_yaml_lines(lines, doc_with_req_prefix(), 13)
+
+
+def test_parse_doc_with_invalid_req_regex(capsys: pytest.CaptureFixture[str]) -> None:
+    doc = parse_doc(enumerate([":req_regex: SR-(", "", "SR-1::", "Text"], start=1))
+    assert not doc.req_regex and not doc.reqs
+    assert "Invalid req_regex" in capsys.readouterr().out
+
+
 def test_req_from_yaml_block_with_id_on_second_line() -> None:
     req = req_from_yaml_lines(
         ["ID: |", "  SR-001", "Text: Some requirement"], doc_with_req_prefix(), 13
@@ -249,3 +272,100 @@ def test_req_from_term_empty_lines() -> None:
     assert not req_from_term(
         "SR-001::", 2, enumerate([], start=3), doc_with_req_prefix()
     )
+
+
+def write_spec(directory: Path, name: str, prefix: str, children: str = "") -> None:
+    lines = [f"= {name}", f":req_regex: {prefix}-\\d+"]
+    if children:
+        lines.append(f":req-children: {children}")
+    lines += ["", f"{prefix}-1::", f"Requirement in {name}", ""]
+    (directory / name).write_text("\n".join(lines), encoding="utf-8")
+
+
+def test_read_and_parse_project_with_grandchildren(tmp_path: Path) -> None:
+    write_spec(tmp_path, "ur.adoc", "UR", "sr.adoc")
+    write_spec(tmp_path, "sr.adoc", "SR", "cr.adoc")
+    write_spec(tmp_path, "cr.adoc", "CR")
+    project = read_and_parse_project(str(tmp_path / "ur.adoc"))
+    assert list(project.requirements) == ["UR-1", "SR-1", "CR-1"]
+    assert project.root_document.child_docs[0].child_docs[0].reqs.keys() == {"CR-1"}
+
+
+def test_read_and_parse_project_parses_shared_spec_once(tmp_path: Path) -> None:
+    write_spec(tmp_path, "ur.adoc", "UR", "sr1.adoc, sr2.adoc")
+    write_spec(tmp_path, "sr1.adoc", "SRA", "shared.adoc")
+    write_spec(tmp_path, "sr2.adoc", "SRB", "./shared.adoc")
+    write_spec(tmp_path, "shared.adoc", "CR")
+    project = read_and_parse_project(str(tmp_path / "ur.adoc"))
+    sr1, sr2 = project.root_document.child_docs
+    assert sr1.child_docs[0] is sr2.child_docs[0]
+    assert list(project.requirements) == ["UR-1", "SRA-1", "CR-1", "SRB-1"]
+
+
+def test_read_and_parse_project_with_cycle(tmp_path: Path) -> None:
+    write_spec(tmp_path, "ur.adoc", "UR", "sr.adoc")
+    write_spec(tmp_path, "sr.adoc", "SR", "ur.adoc")
+    project = read_and_parse_project(str(tmp_path / "ur.adoc"))
+    assert list(project.requirements) == ["UR-1", "SR-1"]
+    assert not project.root_document.child_docs[0].child_docs
+
+
+def test_read_and_parse_project_with_pattern(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    (tmp_path / "specs" / "sub").mkdir(parents=True)
+    write_spec(tmp_path, "ur.adoc", "UR", "*.adoc, specs/**/*.adoc, none/*.adoc")
+    write_spec(tmp_path, "sr.adoc", "SR")
+    write_spec(tmp_path / "specs", "b.adoc", "B")
+    write_spec(tmp_path / "specs", "a.adoc", "A")
+    write_spec(tmp_path / "specs" / "sub", "c.adoc", "C")
+    project = read_and_parse_project(str(tmp_path / "ur.adoc"))
+    # The specification itself matches *.adoc, but is not its own child:
+    assert list(project.requirements) == ["UR-1", "SR-1", "A-1", "B-1", "C-1"]
+    assert "No files match req-children none/*.adoc" in capsys.readouterr().out
+
+
+def test_read_and_parse_workspace_shares_specs(tmp_path: Path) -> None:
+    write_spec(tmp_path, "a.adoc", "A", "shared.adoc")
+    write_spec(tmp_path, "b.adoc", "B", "shared.adoc")
+    write_spec(tmp_path, "shared.adoc", "CR")
+    project_a, project_b = read_and_parse_workspace(
+        [str(tmp_path / "a.adoc"), str(tmp_path / "b.adoc")]
+    )
+    assert list(project_a.requirements) == ["A-1", "CR-1"]
+    assert list(project_b.requirements) == ["B-1", "CR-1"]
+    assert project_a.root_document.child_docs[0] is project_b.root_document.child_docs[0]
+    assert project_b.schema.attribute_names == project_a.schema.attribute_names
+
+
+def test_get_source_block_unterminated(capsys: pytest.CaptureFixture[str]) -> None:
+    lines = enumerate(["----", "ID: SR-001", "Text: Some text"], start=1)
+    assert get_source_block(lines) == ([], 0)
+    assert "no terminating" in capsys.readouterr().out
+
+
+def test_get_source_block_too_many_lines(capsys: pytest.CaptureFixture[str]) -> None:
+    lines = enumerate(["----", "a: 1", "b: 2", "c: 3", "----", "After"], start=1)
+    assert get_source_block(lines, BlockLimits(max_lines=2)) == ([], 0)
+    assert "larger than" in capsys.readouterr().out
+    # The rest of the block is skipped:
+    assert next(lines) == (6, "After")
+
+
+def test_get_source_block_too_many_bytes() -> None:
+    lines = enumerate(["----", "a: 1234567890", "----"], start=1)
+    assert get_source_block(lines, BlockLimits(max_bytes=10)) == ([], 0)
+    lines = enumerate(["----", "a: 1234567890", "----"], start=1)
+    assert get_source_block(lines, BlockLimits(max_bytes=100)) == (["a: 1234567890"], 2)
+
+
+def test_req_from_yaml_lines_line_numbers_with_references() -> None:
+    source_input = [
+        "SR-001:",
+        "  Text: Some requirement",
+        "SR-002:",
+        "  Text: Some other requirement",
+        "  Parent: SR-001",
+    ]
+    reqs = req_from_yaml_lines(source_input, doc_with_req_prefix(), 2)
+    assert [req[LINE_NO] for req in reqs] == ["2", "4"]
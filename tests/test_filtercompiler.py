@@ -0,0 +1,55 @@
+"""test_filtercompiler: Tests for the filtercompiler module"""
+import pytest
+
+from asciireqs.filtercompiler import compile_expression, cached_regex, search
+
+HELPERS = {"search": search, "elements": lambda text: text.split(",")}
+
+
+def test_compile_expression_arguments() -> None:
+    compiled = compile_expression(
+        'Tags == "a" or Text == Tags', HELPERS, ["Tags", "Text", "ID"]
+    )
+    assert compiled.arguments == ("Tags", "Text")
+    assert compiled.function("a", "b")
+    assert not compiled.function("b", "c")
+
+
+def test_compile_expression_precompiles_constant_patterns() -> None:
+    compiled = compile_expression('search("R-\\\\d+", Text)', HELPERS, ["Text"])
+    assert compiled.function("See R-12")
+    assert not compiled.function("See R-")
+    assert cached_regex("R-\\d+") is cached_regex("R-\\d+")
+
+
+def test_compile_expression_uses_pre_split_lists() -> None:
+    compiled = compile_expression(
+        '"x" in elements(Tags)', HELPERS, ["Tags"], ["Tags"]
+    )
+    assert compiled.list_arguments == {"__asciireq_list_Tags": "Tags"}
+    assert compiled.function(("x", "y"))
+    assert not compiled.function(())
+
+
+def test_compile_expression_with_subscripts() -> None:
+    compiled = compile_expression(
+        'req["Tags"] == "a" and req["Text"][:2] == "bc"', HELPERS, ["req"]
+    )
+    assert compiled.function({"Tags": "a", "Text": "bcd"})
+    assert not compiled.function({"Tags": "a", "Text": "cd"})
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "open('file')",
+        "Tags.__class__",
+        "Tags.endswith('x')",
+        "[x for x in Tags]",
+        "lambda: 1",
+        "Tags + Tags",
+    ],
+)
+def test_compile_expression_rejects_unpermitted_syntax(expression: str) -> None:
+    with pytest.raises(NameError):
+        compile_expression(expression, HELPERS, ["Tags"])
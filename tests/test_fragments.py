@@ -0,0 +1,67 @@
+"""test_fragments: Tests for the fragments module"""
+
+from pathlib import Path
+from typing import Callable
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, TEXT, PARENT
+from asciireqs.fragments import FragmentCache, get_fragment_cache, link_context
+from asciireqs.reporting import get_table
+
+DOCUMENTS = [
+    (
+        "ur.adoc",
+        [
+            {ID: "UR-1", TEXT: "One"},
+            {ID: "UR-2", TEXT: "Two", PARENT: "UR-1"},
+        ],
+    )
+]
+
+
+def test_lru_eviction() -> None:
+    cache = FragmentCache(max_entries=2)
+    cache.put(("a",), "A")
+    cache.put(("b",), "B")
+    assert cache.get(("a",)) == "A"
+    cache.put(("c",), "C")
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == "A"
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_saved_fragments_are_loaded(tmp_path: Path) -> None:
+    cache = FragmentCache(cache_dir=str(tmp_path))
+    cache.put(("row", ("ID",), ("UR-1",)), "|UR-1\n")
+    cache.save()
+    loaded = FragmentCache(cache_dir=str(tmp_path))
+    assert loaded.get(("row", ("ID",), ("UR-1",))) == "|UR-1\n"
+    assert loaded.get(("row", ("ID",), ("UR-2",))) is None
+
+
+def test_damaged_cache_file_is_ignored(tmp_path: Path) -> None:
+    (tmp_path / "fragments.json").write_text("{not json", encoding="utf-8")
+    assert FragmentCache(cache_dir=str(tmp_path)).get(("a",)) is None
+
+
+def test_table_rows_are_rendered_once(make_project: Callable[..., Project]) -> None:
+    project = make_project(*DOCUMENTS, req_regex=r"UR-\d+")
+    table = get_table(project, project.requirements, [ID, PARENT], "")
+    cache = get_fragment_cache(project)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert get_table(project, project.requirements, [ID, PARENT], "") == table
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert table[-2] == "|xref:ur.adoc#UR-2[UR-2]\n|xref:ur.adoc#UR-1[UR-1]\n\n"
+
+
+def test_link_context_depends_on_documents(
+    make_project: Callable[..., Project],
+) -> None:
+    project = make_project(*DOCUMENTS, req_regex=r"UR-\d+")
+    other = make_project(*DOCUMENTS, req_regex=r"UR-\d+")
+    other.root_document.name = "other.adoc"
+    assert link_context(project) == link_context(
+        make_project(*DOCUMENTS, req_regex=r"UR-\d+")
+    )
+    assert link_context(project) != link_context(other)
@@ -0,0 +1,74 @@
+"""test_jsonlexport: Tests for the jsonlexport module"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Callable
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, TEXT, PARENT, CHILD, LINE_NO
+from asciireqs.jsonlexport import export_to_jsonl
+from asciireqs.reqdocument import walk_documents
+
+DOCUMENTS = [
+    ("ur.adoc", [{ID: "UR-1", TEXT: "One", CHILD: "SR-1, SR-2", LINE_NO: "3"}]),
+    (
+        "sr.adoc",
+        [
+            {ID: "SR-1", TEXT: "Två", PARENT: "UR-1", "Tags": "Rel-1, Rel-2"},
+            {ID: "SR-2", TEXT: "Three", PARENT: "UR-1"},
+        ],
+    ),
+]
+
+
+def test_export_to_jsonl(tmp_path: Path, make_project: Callable[..., Project]) -> None:
+    project = make_project(*DOCUMENTS)
+    path = tmp_path / "reqs.jsonl"
+    export_to_jsonl(
+        str(path),
+        project,
+        walk_documents(project.root_document),
+        lambda req: req[ID] != "SR-2",
+    )
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {
+            "document": "ur.adoc",
+            "line": 3,
+            ID: "UR-1",
+            TEXT: "One",
+            CHILD: ["SR-1", "SR-2"],
+        },
+        {
+            "document": "sr.adoc",
+            "line": None,
+            ID: "SR-1",
+            TEXT: "Två",
+            PARENT: ["UR-1"],
+            "Tags": ["Rel-1", "Rel-2"],
+        },
+    ]
+
+
+def test_export_to_jsonl_compressed_with_attributes(
+    tmp_path: Path, make_project: Callable[..., Project]
+) -> None:
+    project = make_project(*DOCUMENTS)
+    path = tmp_path / "reqs.jsonl.gz"
+    export_to_jsonl(
+        str(path),
+        project,
+        walk_documents(project.root_document),
+        lambda req: True,
+        [ID, PARENT],
+    )
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        objects = [json.loads(line) for line in file]
+    assert objects[0] == {"document": "ur.adoc", "line": 3, ID: "UR-1"}
+    assert objects[2] == {
+        "document": "sr.adoc",
+        "line": None,
+        ID: "SR-2",
+        PARENT: ["UR-1"],
+    }
@@ -0,0 +1,203 @@
+"""test_langserver: Tests for the langserver module"""
+
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from asciireqs.langserver import (
+    LanguageServer,
+    RequirementIndex,
+    path_to_uri,
+    uri_to_path,
+)
+
+USER_SPEC = """= User requirements
+:req_regex: UR-\\d+
+
+UR-1::
+Title:
++
+The first user requirement.
++
+Child: SR-1, SR-2
+
+UR-2::
+The second user requirement, see UR-1.
+"""
+
+SW_SPEC = """= Software requirements
+:req_regex: SR-\\d+
+
+SR-1::
+The first software requirement.
++
+Parent: UR-1
+
+SR-2::
+The second software requirement.
++
+Parent: UR-2
+"""
+
+
+def make_index() -> RequirementIndex:
+    index = RequirementIndex()
+    index.update("ur.adoc", USER_SPEC)
+    index.update("sr.adoc", SW_SPEC)
+    return index
+
+
+def test_definition() -> None:
+    index = make_index()
+    req_id = index.id_at("sr.adoc", 6, 9)
+    assert req_id == "UR-1"
+    assert index.definition_spans(req_id) == [("ur.adoc", (3, 0, 4))]
+
+
+def test_references() -> None:
+    index = make_index()
+    assert index.references("UR-1", include_definitions=False) == [
+        ("sr.adoc", (6, 8, 12)),
+        ("ur.adoc", (11, 33, 37)),
+    ]
+    assert len(index.references("UR-1")) == 3
+
+
+def test_hover() -> None:
+    hover = make_index().hover_text("UR-1")
+    assert hover and hover.startswith("**UR-1**: Title")
+    assert "Child: SR-1, SR-2" in hover
+    assert make_index().hover_text("UR-9") is None
+
+
+def test_link_diagnostics() -> None:
+    index = make_index()
+    assert not index.diagnostics("ur.adoc")
+    # SR-2 has parent UR-2, which has no child link back:
+    assert [diagnostic.message for diagnostic in index.diagnostics("sr.adoc")] == [
+        "Error: Parent UR-2 has no Child link to SR-2"
+    ]
+
+
+def test_update_only_affects_documents_that_mention_changed_requirements() -> None:
+    index = make_index()
+    index.update("other.adoc", "= Other\n:req_regex: OR-\\d+\n\nOR-1::\nText\n")
+    # Moving requirements does not affect other documents:
+    assert index.update("ur.adoc", "\n" + USER_SPEC) == {"ur.adoc"}
+    affected = index.update("ur.adoc", USER_SPEC.replace("UR-2::", "UR-3::"))
+    assert affected == {"ur.adoc", "sr.adoc"}
+    assert "Error: Unknown requirement UR-2 in Parent" in [
+        diagnostic.message for diagnostic in index.diagnostics("sr.adoc")
+    ]
+
+
+def test_parse_diagnostics_are_collected(capsys: Any) -> None:
+    index = RequirementIndex()
+    index.update("bad.adoc", ":req_regex: UR-\\d+\n\n[.reqy]\n----\nID: UR-1\n----\n")
+    diagnostics = index.diagnostics("bad.adoc")
+    assert [(diagnostic.message, diagnostic.line) for diagnostic in diagnostics] == [
+        ("Error: Missing Text attribute on line 5", 5)
+    ]
+    assert not capsys.readouterr().out
+
+
+def test_broken_yaml_is_a_diagnostic() -> None:
+    index = RequirementIndex()
+    for block in ["UR-1: [1, 2", "UR-1: hello"]:
+        index.update("ur.adoc", f":req_regex: UR-\\d+\n\n[.reqy]\n----\n{block}\n----\n")
+        assert index.diagnostics("ur.adoc")
+
+
+def frame(message: Dict[str, Any]) -> bytes:
+    body = json.dumps({"jsonrpc": "2.0", **message}).encode("utf-8")
+    return f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+
+
+def read_messages(output: bytes) -> List[Dict[str, Any]]:
+    messages = []
+    stream = io.BytesIO(output)
+    while True:
+        header = stream.readline()
+        if not header:
+            return messages
+        length = int(header.split(b":")[1])
+        stream.readline()
+        messages.append(json.loads(stream.read(length)))
+
+
+def test_language_server(tmp_path: Path) -> None:
+    (tmp_path / "ur.adoc").write_text(USER_SPEC, encoding="utf-8")
+    (tmp_path / "sr.adoc").write_text(SW_SPEC, encoding="utf-8")
+    sr_uri = path_to_uri(str(tmp_path / "sr.adoc"))
+    position = {
+        "textDocument": {"uri": sr_uri},
+        "position": {"line": 6, "character": 10},
+    }
+    requests = [
+        {"id": 1, "method": "initialize", "params": {"rootUri": tmp_path.as_uri()}},
+        {"method": "initialized", "params": {}},
+        {"id": 2, "method": "textDocument/definition", "params": position},
+        {"id": 3, "method": "textDocument/hover", "params": position},
+        {"id": 4, "method": "unknown/method", "params": {}},
+        {"id": 5, "method": "shutdown"},
+        {"method": "exit"},
+    ]
+    output = io.BytesIO()
+    server = LanguageServer(
+        io.BytesIO(b"".join(frame(request) for request in requests)), output
+    )
+    assert server.run() == 0
+    messages = read_messages(output.getvalue())
+    responses = {message["id"]: message for message in messages if "id" in message}
+    assert responses[1]["result"]["capabilities"]["definitionProvider"]
+    assert responses[2]["result"][0]["uri"] == path_to_uri(str(tmp_path / "ur.adoc"))
+    assert responses[2]["result"][0]["range"]["start"] == {"line": 3, "character": 0}
+    assert "The first user requirement." in responses[3]["result"]["contents"]["value"]
+    assert responses[4]["error"]["code"] == -32601
+    published = [
+        uri_to_path(message["params"]["uri"])
+        for message in messages
+        if message.get("method") == "textDocument/publishDiagnostics"
+    ]
+    assert published == [str(tmp_path / "sr.adoc")]
+
+
+def test_language_server_survives_broken_yaml(tmp_path: Path) -> None:
+    (tmp_path / "ur.adoc").write_text(USER_SPEC, encoding="utf-8")
+    ur_uri = path_to_uri(str(tmp_path / "ur.adoc"))
+    broken = USER_SPEC + "\n[.reqy]\n----\nUR-3: [1, 2\n----\n"
+    requests = [
+        {"id": 1, "method": "initialize", "params": {"rootUri": tmp_path.as_uri()}},
+        {
+            "method": "textDocument/didChange",
+            "params": {
+                "textDocument": {"uri": ur_uri, "version": 2},
+                "contentChanges": [{"text": broken}],
+            },
+        },
+        {
+            "id": 2,
+            "method": "textDocument/hover",
+            "params": {
+                "textDocument": {"uri": ur_uri},
+                "position": {"line": 11, "character": 35},
+            },
+        },
+        {"id": 3, "method": "shutdown"},
+        {"method": "exit"},
+    ]
+    output = io.BytesIO()
+    server = LanguageServer(
+        io.BytesIO(b"".join(frame(request) for request in requests)), output
+    )
+    assert server.run() == 0
+    messages = read_messages(output.getvalue())
+    responses = {message["id"]: message for message in messages if "id" in message}
+    # The rest of the document is still parsed, and the error is a diagnostic:
+    assert "The first user requirement." in responses[2]["result"]["contents"]["value"]
+    assert any(
+        message.get("method") == "textDocument/publishDiagnostics"
+        and message["params"]["diagnostics"]
+        for message in messages
+    )
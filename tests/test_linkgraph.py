@@ -0,0 +1,81 @@
+"""test_linkgraph: Tests for the linkgraph module"""
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, TEXT, PARENT, CHILD
+from asciireqs.linkgraph import LinkGraph, check_links, get_link_graph
+from asciireqs.reqdocument import ReqDocument
+
+
+def link_project(*reqs: dict) -> Project:
+    doc = ReqDocument()
+    doc.name = "spec.adoc"
+    for req in reqs:
+        doc.add_req({TEXT: "Text", **req})
+    return Project(doc, dict(doc.reqs))
+
+
+def chain_project() -> Project:
+    # UR-1 -> SR-1 -> TC-1, UR-1 -> SR-2 -> TC-1 (shared descendant), links in both styles:
+    return link_project(
+        {ID: "UR-1", CHILD: "SR-1, SR-2"},
+        {ID: "SR-1", PARENT: "UR-1", CHILD: "TC-1"},
+        {ID: "SR-2", PARENT: "UR-1"},
+        {ID: "TC-1", PARENT: "SR-1, SR-2, XX-9"},
+    )
+
+
+def test_descendants_and_ancestors() -> None:
+    graph = LinkGraph(chain_project())
+    assert graph.descendants("UR-1") == ["SR-1", "SR-2", "TC-1"]
+    assert graph.descendants("SR-2") == ["TC-1"]
+    assert graph.descendants("TC-1") == []
+    assert graph.ancestors("TC-1") == ["UR-1", "SR-1", "SR-2"]
+    assert graph.ancestors("XX-9") == []
+
+
+def test_cycles() -> None:
+    graph = LinkGraph(
+        link_project(
+            {ID: "A-1", CHILD: "A-2"},
+            {ID: "A-2", CHILD: "A-3"},
+            {ID: "A-3", CHILD: "A-1, A-4"},
+            {ID: "A-4", CHILD: "A-4"},
+            {ID: "A-5"},
+        )
+    )
+    assert [len(component) for component in graph.components] == [1, 3, 1]
+    assert graph.in_cycle("A-1") and graph.in_cycle("A-4")
+    assert not graph.in_cycle("A-5")
+    assert graph.descendants("A-2") == ["A-1", "A-2", "A-3", "A-4"]
+    assert graph.ancestors("A-4") == ["A-1", "A-2", "A-3", "A-4"]
+
+
+def test_deep_chain() -> None:
+    reqs = [{ID: f"R-{number}", CHILD: f"R-{number + 1}"} for number in range(5000)]
+    graph = LinkGraph(link_project(*reqs))
+    assert len(graph.descendants("R-4990")) == 9
+    assert len(graph.ancestors("R-10")) == 10
+
+
+def test_check_links() -> None:
+    top = ReqDocument()
+    top.add_req({ID: "UR-1", TEXT: "Text", CHILD: "SR-1, SR-9"})
+    top.add_req({ID: "UR-2", TEXT: "Text"})
+    doc = ReqDocument()
+    top.child_docs = [doc]
+    doc.add_req({ID: "SR-1", TEXT: "Text", PARENT: "UR-1", CHILD: "SR-2"})
+    doc.add_req({ID: "SR-2", TEXT: "Text", PARENT: "SR-1, UR-2", CHILD: "SR-1"})
+    doc.add_req({ID: "SR-3", TEXT: "Text"})
+    problems = check_links(Project(top, {**top.reqs, **doc.reqs}))
+    assert problems.cycles == [["SR-1", "SR-2"]]
+    # Top level requirements (UR-2) are not orphans:
+    assert problems.orphans == ["SR-3"]
+    assert problems.dangling == [("UR-1", CHILD, "SR-9")]
+    assert problems.asymmetric == [("SR-2", PARENT, "UR-2"), ("SR-2", CHILD, "SR-1")]
+    assert len(problems) == 5
+    assert problems.lines()[0] == "Cycle: SR-1, SR-2"
+
+
+def test_get_link_graph_is_cached() -> None:
+    project = chain_project()
+    assert get_link_graph(project) is get_link_graph(project)
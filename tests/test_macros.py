@@ -0,0 +1,39 @@
+"""test_macros: Tests for the macros module"""
+
+from asciireqs.macros import (
+    BreakdownMacro,
+    CountMacro,
+    CoverageMacro,
+    HierarchyMacro,
+    LinkCheckMacro,
+    TableMacro,
+    TraceMacro,
+    parse_macro,
+)
+
+
+def test_parse_macro() -> None:
+    assert parse_macro("`asciireq-hierarchy`\n") == HierarchyMacro()
+    assert parse_macro("  `asciireq-coverage`") == CoverageMacro()
+    assert parse_macro("`asciireq-count`") == CountMacro("")
+    assert parse_macro('`asciireq-count: "x" in Tags`') == CountMacro('"x" in Tags')
+    assert parse_macro("`asciireq-breakdown: Tags`") == BreakdownMacro("Tags")
+    assert parse_macro("`asciireq-trace`") == TraceMacro("")
+    assert parse_macro('`asciireq-trace: "x" in Tags`') == TraceMacro('"x" in Tags')
+    assert parse_macro("`asciireq-link-check`") == LinkCheckMacro("")
+    assert parse_macro("`asciireq-link-check: orphans`") == LinkCheckMacro("orphans")
+    assert parse_macro('`asciireq-table: ID, Text; "x" in Tags`') == TableMacro(
+        ["ID", "Text"], '"x" in Tags'
+    )
+
+
+def test_parse_table_macro_without_filter() -> None:
+    assert parse_macro("`asciireq-table: ID,Text`") == TableMacro(["ID", "Text"], "")
+
+
+def test_parse_non_macros() -> None:
+    assert parse_macro("Some text") is None
+    assert parse_macro("`asciireq-table`") is None
+    assert parse_macro("`asciireq-breakdown`") is None
+    assert parse_macro("`asciireq-counted`") is None
+    assert parse_macro("`asciireq-unknown: foo`") is None
@@ -0,0 +1,31 @@
+"""test_output: Tests for the output module"""
+import os
+from pathlib import Path
+
+from asciireqs.output import WriteStatistics, write_if_changed
+
+
+def test_write_new_file(tmp_path: Path) -> None:
+    path = tmp_path / "out.adoc"
+    statistics = WriteStatistics()
+    assert write_if_changed(str(path), ["line 1\n", "line 2\n"], statistics)
+    assert path.read_text(encoding="utf-8") == "line 1\nline 2\n"
+    assert statistics == WriteStatistics(written=1, skipped=0)
+
+
+def test_unchanged_file_is_not_written(tmp_path: Path) -> None:
+    path = tmp_path / "out.adoc"
+    path.write_text("line 1\n", encoding="utf-8")
+    os.utime(path, (1000, 1000))
+    statistics = WriteStatistics()
+    assert not write_if_changed(str(path), ["line 1\n"], statistics)
+    assert path.stat().st_mtime == 1000
+    assert statistics == WriteStatistics(written=0, skipped=1)
+
+
+def test_changed_file_is_replaced(tmp_path: Path) -> None:
+    path = tmp_path / "out.adoc"
+    path.write_text("old\n", encoding="utf-8")
+    assert write_if_changed(str(path), ["new\n"])
+    assert path.read_text(encoding="utf-8") == "new\n"
+    assert os.listdir(tmp_path) == ["out.adoc"]
@@ -13,6 +13,10 @@ from asciireqs.reporting import (
     evaluate_requirement_against_filter,
     requirement_as_term,
     elements,
+    generate_report_line,
+    compile_filter,
+    normalised_filter,
+    select_requirements,
 )
 from asciireqs.reqdocument import ReqDocument, Requirements
 
@@ -141,6 +145,17 @@ def test_filter_referencing_attribute_name_with_spaces() -> None:
     )
 
 
+def test_filter_that_subscripts_the_requirement() -> None:
+    project = get_project_for_filter_tests()
+    sr1 = project.requirements["SR-1"]
+    assert evaluate_requirement_against_filter(
+        sr1, project, 'req["Name with spaces"] == "Value"'
+    )
+    assert evaluate_requirement_against_filter(
+        sr1, project, 'req["Parent"][0:2] == "UR"'
+    )
+
+
 def test_missing_link_from_parent_link_ok() -> None:
     project = get_project_for_filter_tests()
     sr1 = project.requirements["SR-1"]
@@ -255,3 +270,149 @@ def test_requirement_as_term_with_multiline_text() -> None:
         "+\n",
         "Child: SR-1\n",
     ]
+
+
+def test_count_macros() -> None:
+    project = get_project_for_filter_tests()
+    template = [
+        "`asciireq-count`",
+        '`asciireq-count: "Implemented" in elements(Tags)`',
+        '`asciireq-count: "Implemented" in elements(Tags)`',
+    ]
+    lines = list(
+        generate_report_line(
+            enumerate(template, start=1), project, project.requirements, None, {}
+        )
+    )
+    assert lines == ["2\n", "1\n", "1\n"]
+
+
+def test_coverage_macro() -> None:
+    project = get_project_for_filter_tests()
+    lines = list(
+        generate_report_line(
+            enumerate(["`asciireq-coverage`"], start=1),
+            project,
+            project.requirements,
+            None,
+            {},
+        )
+    )
+    assert lines[1] == "|Document |Requirements |With children |Coverage \n\n"
+    assert lines[2] == "|\n|1\n|1\n|100.0%\n\n"
+    assert lines[3] == "|\n|1\n|0\n|0.0%\n\n"
+
+
+def test_trace_macro() -> None:
+    project = get_project_for_filter_tests()
+    lines = list(
+        generate_report_line(
+            enumerate(['`asciireq-trace: ID == "SR-1"`'], start=1),
+            project,
+            project.requirements,
+            None,
+            {},
+        )
+    )
+    assert lines == [
+        "|===\n",
+        "|ID |Ancestors |Descendants \n\n",
+        "|SR-1\n|UR-1\n|\n\n",
+        "|===\n",
+    ]
+
+
+def test_link_check_macro() -> None:
+    ur = ReqDocument()
+    ur.add_req({ID: "UR-1", CHILD: "SR-1"})
+    sr = ReqDocument()
+    ur.child_docs = [sr]
+    sr.add_req({ID: "SR-1", PARENT: "UR-1, UR-9"})
+    project = Project(ur, {**ur.reqs, **sr.reqs})
+    lines = list(
+        generate_report_line(
+            enumerate(["`asciireq-link-check`"], start=1),
+            project,
+            project.requirements,
+            None,
+            {},
+        )
+    )
+    assert lines == [
+        "|===\n",
+        "|Problem |ID |Details \n\n",
+        "|Dangling link\n|SR-1\n|Parent UR-9 does not exist\n\n",
+        "|===\n",
+    ]
+
+
+def test_breakdown_macro() -> None:
+    project = get_project_for_filter_tests()
+    lines = list(
+        generate_report_line(
+            enumerate(["`asciireq-breakdown: Tags`"], start=1),
+            project,
+            project.requirements,
+            None,
+            {},
+        )
+    )
+    assert lines == [
+        "|===\n",
+        "|Tags |Requirements \n\n",
+        "|Implemented\n|1\n\n",
+        "|Version1\n|1\n\n",
+        "|===\n",
+    ]
+
+
+def test_compile_filter() -> None:
+    project = get_project_for_filter_tests()
+    req_filter = compile_filter('"Implemented" in elements(Tags)', project)
+    assert not req_filter(project.requirements["UR-1"])
+    assert req_filter(project.requirements["SR-1"])
+
+
+def test_compile_empty_filter() -> None:
+    project = get_project_for_filter_tests()
+    assert compile_filter("", project)(project.requirements["UR-1"])
+
+
+def test_compile_filter_with_unpermitted_name() -> None:
+    with pytest.raises(NameError):
+        compile_filter("open()", get_project_for_filter_tests())
+
+
+def test_filter_results_are_reused() -> None:
+    project = get_project_for_filter_tests()
+    assert normalised_filter('(Name_with_spaces ==  "Value")') == normalised_filter(
+        'Name_with_spaces == "Value"'
+    )
+    selected = select_requirements(
+        project, project.requirements, 'Name_with_spaces == "Value"'
+    )
+    assert [req[ID] for req in selected] == ["SR-1"]
+    # Changing the requirement shows that the result of the first evaluation is reused:
+    project.requirements["SR-1"]["Name with spaces"] = "Other"
+    again = select_requirements(
+        project, project.requirements, '(Name_with_spaces ==  "Value")'
+    )
+    assert [req[ID] for req in again] == ["SR-1"]
+    # Other requirements are evaluated separately:
+    sr_reqs = project.root_document.child_docs[0].reqs
+    assert not select_requirements(project, sr_reqs, 'Name_with_spaces == "Value"')
+
+
+def test_counts_reuse_filter_results() -> None:
+    project = get_project_for_filter_tests()
+    template = [
+        '`asciireq-count: Name_with_spaces == "Value"`',
+        '`asciireq-count: (Name_with_spaces ==  "Value")`',
+    ]
+    lines = generate_report_line(
+        enumerate(template, start=1), project, project.requirements, None, {}
+    )
+    assert next(lines) == "1\n"
+    # Changing the requirement shows that the result of the first count is reused:
+    project.requirements["SR-1"]["Name with spaces"] = "Other"
+    assert next(lines) == "1\n"
@@ -1,7 +1,12 @@
 """test_reqdocument: Tests for the reqdocument module"""
 import pytest
 
-from asciireqs.reqdocument import ReqDocument, add_attribute, ReqParseError
+from asciireqs.reqdocument import (
+    ReqDocument,
+    add_attribute,
+    ReqParseError,
+    walk_documents,
+)
 from asciireqs.fields import ID, TEXT, CHILD, PARENT
 
 
@@ -77,3 +82,26 @@ def test_add_nameless_attribute() -> None:
     r = {ID: "a", TEXT: "foo", CHILD: "1"}
     with pytest.raises(ReqParseError):
         add_attribute(r, "", "2")
+
+
+def test_walk_documents_visits_shared_child_once() -> None:
+    root = ReqDocument()
+    sub1 = ReqDocument()
+    sub2 = ReqDocument()
+    shared = ReqDocument()
+    root.add_child_doc(sub1)
+    root.add_child_doc(sub2)
+    sub1.add_child_doc(shared)
+    sub2.add_child_doc(shared)
+    assert list(walk_documents(root)) == [root, sub1, shared, sub2]
+
+
+def test_get_attribute_names_recursive_includes_grandchildren() -> None:
+    root = ReqDocument()
+    root.add_req({ID: "a", TEXT: "foo"})
+    child = ReqDocument()
+    grandchild = ReqDocument()
+    grandchild.add_req({ID: "b", TEXT: "bar", PARENT: "a"})
+    root.add_child_doc(child)
+    child.add_child_doc(grandchild)
+    assert root.get_attribute_names_recursive() == [ID, TEXT, PARENT]
@@ -0,0 +1,55 @@
+"""test_schema: Tests for the schema module"""
+
+from asciireqs.fields import ID, TEXT, PARENT, CHILD, TAGS
+from asciireqs.reqdocument import ReqDocument
+from asciireqs.schema import AttributeSchema, split_list_value
+
+
+def test_split_list_value() -> None:
+    assert split_list_value("") == ()
+    assert split_list_value("One , Two,,Three") == ("One", "Two", "Three")
+
+
+def test_attribute_names_in_order_of_first_use() -> None:
+    schema = AttributeSchema()
+    schema.add_requirements(
+        [{ID: "a", TEXT: "foo", CHILD: "b"}, {ID: "b", TEXT: "bar", PARENT: "a"}]
+    )
+    assert schema.attribute_names == [ID, TEXT, CHILD, PARENT]
+    assert PARENT in schema
+    assert TAGS not in schema
+
+
+def test_list_values_are_split_on_registration() -> None:
+    schema = AttributeSchema()
+    req = {ID: "a", TEXT: "foo, bar", TAGS: "Rel-1, Rel-2"}
+    schema.add_requirement(req)
+    assert schema.list_value(req, TAGS) == ("Rel-1", "Rel-2")
+    assert schema.list_value(req, CHILD) == ()
+    # Not a list attribute, so split on demand:
+    assert schema.list_value(req, TEXT) == ("foo", "bar")
+
+
+def test_list_value_of_unregistered_requirement() -> None:
+    schema = AttributeSchema()
+    assert schema.list_value({ID: "a", PARENT: "b,c"}, PARENT) == ("b", "c")
+
+
+def test_custom_list_attributes() -> None:
+    schema = AttributeSchema(["Components"])
+    req = {ID: "a", "Components": "x, y", TAGS: "t"}
+    schema.add_requirement(req)
+    assert schema.list_value(req, "Components") == ("x", "y")
+    assert schema.list_attributes == {"Components"}
+
+
+def test_add_documents() -> None:
+    doc = ReqDocument()
+    doc.add_req({ID: "a", TEXT: "foo"})
+    child_doc = ReqDocument()
+    child_doc.add_req({ID: "b", TEXT: "bar", PARENT: "a"})
+    doc.add_child_doc(child_doc)
+    schema = AttributeSchema()
+    schema.add_documents(doc)
+    assert schema.attribute_names == [ID, TEXT, PARENT]
+    assert schema.list_value(child_doc.reqs["b"], PARENT) == ("a",)
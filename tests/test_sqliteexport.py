@@ -0,0 +1,55 @@
+"""test_sqliteexport: Tests for the sqliteexport module"""
+import sqlite3
+from pathlib import Path
+from typing import Callable
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, TEXT, PARENT, CHILD, LINE_NO
+from asciireqs.sqliteexport import export_to_sqlite
+
+DOCUMENTS = [
+    ("ur.adoc", [{ID: "UR-1", TEXT: "One", CHILD: "SR-1, SR-2", LINE_NO: "3"}]),
+    (
+        "sr.adoc",
+        [
+            {ID: "SR-1", TEXT: "Two", PARENT: "UR-1", "Tags": "Rel-1"},
+            {ID: "SR-2", TEXT: "Three", PARENT: "UR-1"},
+        ],
+    ),
+]
+
+
+def test_export_to_sqlite(tmp_path: Path, make_project: Callable[..., Project]) -> None:
+    project = make_project(*DOCUMENTS, req_regex=r"UR-\d+")
+    path = str(tmp_path / "reqs.sqlite")
+    export_to_sqlite(path, project, project.requirements.values())
+    connection = sqlite3.connect(path)
+    assert connection.execute(
+        "SELECT r.id, r.line, r.text, d.name FROM requirements r "
+        "JOIN documents d ON r.document_id = d.id ORDER BY r.id"
+    ).fetchall() == [
+        ("SR-1", None, "Two", "sr.adoc"),
+        ("SR-2", None, "Three", "sr.adoc"),
+        ("UR-1", 3, "One", "ur.adoc"),
+    ]
+    assert connection.execute(
+        "SELECT req_id FROM attributes WHERE name = 'Tags' AND value = 'Rel-1'"
+    ).fetchall() == [("SR-1",)]
+    assert connection.execute(
+        "SELECT req_id, child_id FROM child_links ORDER BY child_id"
+    ).fetchall() == [("UR-1", "SR-1"), ("UR-1", "SR-2")]
+    assert connection.execute("SELECT COUNT(*) FROM parent_links").fetchone() == (2,)
+    assert connection.execute("SELECT * FROM document_children").fetchall() == [(1, 2)]
+    connection.close()
+
+
+def test_export_to_sqlite_replaces_existing_file(
+    tmp_path: Path, make_project: Callable[..., Project]
+) -> None:
+    project = make_project(*DOCUMENTS, req_regex=r"UR-\d+")
+    path = str(tmp_path / "reqs.sqlite")
+    export_to_sqlite(path, project, project.requirements.values())
+    export_to_sqlite(path, project, project.root_document.reqs.values())
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT id FROM requirements").fetchall() == [("UR-1",)]
+    connection.close()
@@ -0,0 +1,44 @@
+"""test_statistics: Tests for the statistics module"""
+
+from typing import Callable
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, TEXT, PARENT, CHILD
+from asciireqs.statistics import compute_statistics, get_statistics
+
+DOCUMENTS = [
+    (
+        "ur.adoc",
+        [
+            {ID: "UR-1", TEXT: "One", CHILD: "SR-1", "Tags": "Rel-1"},
+            {ID: "UR-2", TEXT: "Two", "Tags": "Rel-1, Rel-2"},
+        ],
+    ),
+    ("sr.adoc", [{ID: "SR-1", TEXT: "Three", PARENT: "UR-1", "Tags": "Rel-2"}]),
+]
+
+
+def test_document_counts_and_coverage(make_project: Callable[..., Project]) -> None:
+    statistics = compute_statistics(make_project(*DOCUMENTS))
+    assert statistics.requirements == 3
+    assert [doc.name for doc in statistics.documents] == ["ur.adoc", "sr.adoc"]
+    ur_statistics = statistics.document("ur.adoc")
+    assert ur_statistics.requirements == 2
+    assert ur_statistics.with_children == 1
+    assert ur_statistics.coverage == 50.0
+    assert statistics.document("sr.adoc").coverage == 0.0
+
+
+def test_value_counts_split_lists(make_project: Callable[..., Project]) -> None:
+    statistics = compute_statistics(make_project(*DOCUMENTS))
+    assert statistics.value_counts["Tags"] == {"Rel-1": 2, "Rel-2": 2}
+    assert statistics.document("ur.adoc").value_counts["Tags"] == {
+        "Rel-1": 2,
+        "Rel-2": 1,
+    }
+    assert TEXT not in statistics.value_counts
+
+
+def test_statistics_are_computed_once(make_project: Callable[..., Project]) -> None:
+    project = make_project(*DOCUMENTS)
+    assert get_statistics(project) is get_statistics(project)
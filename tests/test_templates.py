@@ -0,0 +1,91 @@
+"""test_templates: Tests for the templates module"""
+import json
+from pathlib import Path
+from typing import Callable
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, TEXT
+from asciireqs.macros import CountMacro, TableMacro
+from asciireqs.reporting import generate_report_line
+from asciireqs.templates import (
+    LiteralChunk,
+    compile_template,
+    load_template,
+    render_template,
+    template_digest,
+)
+
+TEMPLATE = """= Report
+
+See UR-1.
+`asciireq-count`
+
+`asciireq-table: ID, Text; ID == "UR-2"`
+"""
+
+
+DOCUMENTS = [("ur.adoc", [{ID: "UR-1", TEXT: "One"}, {ID: "UR-2", TEXT: "Two"}])]
+
+
+def test_compile_template() -> None:
+    template = compile_template(TEMPLATE)
+    assert template.nodes == [
+        LiteralChunk("= Report\n\nSee UR-1.\n"),
+        CountMacro(""),
+        LiteralChunk("\n"),
+        TableMacro(["ID", "Text"], 'ID == "UR-2"'),
+    ]
+
+
+def test_render_template(make_project: Callable[..., Project]) -> None:
+    text = "".join(
+        render_template(
+            compile_template(TEMPLATE), make_project(*DOCUMENTS, req_regex=r"UR-\d+")
+        )
+    )
+    assert text == (
+        "= Report\n\nSee xref:ur.adoc#UR-1[UR-1].\n"
+        "2\n"
+        "\n"
+        "|===\n|ID |Text \n\n|xref:ur.adoc#UR-2[UR-2]\n|Two\n\n|===\n"
+    )
+
+
+def test_links_are_inserted_per_line(make_project: Callable[..., Project]) -> None:
+    project = make_project(*DOCUMENTS, req_regex=r"^UR-\d+")
+    text = "UR-1 is first.\nUR-2 is second.\n"
+    compiled = "".join(render_template(compile_template(text), project))
+    assert compiled == (
+        "xref:ur.adoc#UR-1[UR-1] is first.\nxref:ur.adoc#UR-2[UR-2] is second.\n"
+    )
+    lines = text.splitlines(keepends=True)
+    assert compiled == "".join(
+        generate_report_line(
+            enumerate(lines, start=1), project, project.requirements, None, {}
+        )
+    )
+
+
+def test_load_template_uses_disk_cache(tmp_path: Path) -> None:
+    text = TEMPLATE + "Disk cache test\n"
+    template = load_template(text, str(tmp_path))
+    cache_file = tmp_path / (template_digest(text) + ".json")
+    assert cache_file.exists()
+    assert load_template(text, str(tmp_path)) is template
+
+
+def test_cached_template_is_read_from_disk(tmp_path: Path) -> None:
+    text = "Read from disk test\n"
+    digest = template_digest(text)
+    # A compiled template in the cache folder, as a previous run would have left it:
+    (tmp_path / (digest + ".json")).write_text(
+        json.dumps(
+            {
+                "version": 3,
+                "digest": digest,
+                "nodes": [{"type": "literal", "text": "From cache\n"}],
+            }
+        ),
+        encoding="utf-8",
+    )
+    assert load_template(text, str(tmp_path)).nodes == [LiteralChunk("From cache\n")]
@@ -0,0 +1,43 @@
+"""test_textindex: Tests for the textindex module"""
+
+from asciireqs.docparser import Project
+from asciireqs.fields import ID, TEXT, TITLE
+from asciireqs.reporting import select_requirements
+from asciireqs.reqdocument import ReqDocument
+from asciireqs.textindex import TextIndex, get_text_index, words
+
+
+def indexed_project() -> Project:
+    doc = ReqDocument()
+    doc.add_req({ID: "R-1", TITLE: "Export", TEXT: "Export requirements to Excel."})
+    doc.add_req({ID: "R-2", TEXT: "Export links to Excel, and export tables."})
+    doc.add_req({ID: "R-3", TEXT: "Generate reports from templates.", "Tags": "excel"})
+    return Project(doc, dict(doc.reqs))
+
+
+def test_words() -> None:
+    assert words("Export, to EXCEL-files!") == ["export", "to", "excel", "files"]
+
+
+def test_search_requires_all_words_and_ranks() -> None:
+    index = TextIndex(indexed_project())
+    assert [req_id for req_id, _ in index.search("excel export")] == ["R-1", "R-2"]
+    assert [req_id for req_id, _ in index.search("export tables")] == ["R-2"]
+    assert index.search("export", limit=1)[0][0] == "R-1"
+    assert not index.search("unknown export")
+    assert not index.search("")
+
+
+def test_attributes() -> None:
+    project = indexed_project()
+    assert get_text_index(project, ["Tags"]).matching_ids(["Excel"]) == {"R-3"}
+    assert get_text_index(project).matching_ids(["Excel"]) == {"R-1", "R-2"}
+    assert get_text_index(project) is get_text_index(project)
+
+
+def test_contains_words_filter() -> None:
+    project = indexed_project()
+    selected = select_requirements(
+        project, project.requirements, 'contains_words("export", "excel") and ID != "R-1"'
+    )
+    assert [req[ID] for req in selected] == ["R-2"]